@@ -1,22 +1,50 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt
 from jose.exceptions import JWTError
 from passlib.context import CryptContext
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from .database import get_session
 from .models import User
+from .services.cache import TTLCache
 
 # Security settings
 SECRET_KEY = "your-secret-key-change-in-production"  # TODO: Move to env
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Argon2 cost (defaults match passlib's). Changing them rehashes each password at its next login.
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST_KIB", "65536"))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
+
+# Hashing is tens of milliseconds of CPU; async routes run it here instead of
+# on the event loop. argon2 releases the GIL, so the workers hash in parallel,
+# and the pool size caps how many cores a login storm can take.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+password_hash_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
 security = HTTPBearer()
 
+# Authenticated users by token identity, so most requests skip the user lookup.
+# update_user_profile invalidates its entry; other worker processes see a
+# profile change after at most the TTL.
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "60"))
+user_cache = TTLCache(maxsize=int(os.getenv("AUTH_USER_CACHE_SIZE", "10000")), ttl=AUTH_USER_CACHE_TTL)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
     return pwd_context.verify(plain_password, hashed_password)
@@ -28,10 +56,24 @@ def get_password_hash(password: str) -> str:
     truncated_password = password[:72]
     return pwd_context.hash(truncated_password)
 
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash on the hashing pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_hash_pool, get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password on the hashing pool.
+
+    Returns:
+        (whether it matches, a new hash if the stored one uses outdated parameters)
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_hash_pool, pwd_context.verify_and_update, plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    """Create JWT access token."""
+    """Create JWT access token. Include "uid" (the user id) so lookups go by primary key."""
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -41,9 +83,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def authenticate_user(session: Session, username: str, password: str) -> Optional[User]:
-    """Authenticate user with username/email and password."""
-    # Try username first, then email
+def find_login_user(session: Session, username: str) -> Optional[User]:
+    """Look up a user by username, then by email."""
     user = session.exec(
         select(User).where(User.username == username)
     ).first()
@@ -52,13 +93,34 @@ def authenticate_user(session: Session, username: str, password: str) -> Optiona
         user = session.exec(
             select(User).where(User.email == username)
         ).first()
+    return user
 
+def authenticate_user(session: Session, username: str, password: str) -> Optional[User]:
+    """Authenticate user with username/email and password."""
+    user = find_login_user(session, username)
     if not user:
         return None
     if not verify_password(password, user.password_hash):
         return None
     return user
 
+async def authenticate_user_async(session: AsyncSession, username: str, password: str) -> Optional[User]:
+    """
+    authenticate_user for async routes: verification runs on the hashing pool.
+
+    A password hashed with outdated Argon2 parameters is rehashed and committed.
+    """
+    user = await session.run_sync(find_login_user, username)
+    if not user:
+        return None
+    valid, new_hash = await verify_password_async(password, user.password_hash)
+    if not valid:
+        return None
+    if new_hash:
+        user.password_hash = new_hash
+        await session.commit()
+    return user
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     session: Session = Depends(get_session)
@@ -74,13 +136,34 @@ def get_current_user(
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
+        user_id = payload.get("uid")
+        if user_id is not None and not isinstance(user_id, int):
+            raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    user = session.exec(select(User).where(User.username == username)).first()
+    # Tokens issued before "uid" existed are keyed by username
+    key = ("id", user_id) if user_id is not None else ("username", username)
+    user = user_cache.get(key)
     if user is None:
+        if user_id is not None:
+            user = session.get(User, user_id)
+        else:
+            user = session.exec(select(User).where(User.username == username)).first()
+        if user is None:
+            raise credentials_exception
+        session.expunge(user)
+        user_cache.set(key, user)
+    # Checked on cache hits too: a token's uid and sub must name the same user
+    if user.username != username:
         raise credentials_exception
-    return user
+    # Each request gets its own copy of the shared cached instance
+    return User.model_validate(user.model_dump())
+
+def invalidate_cached_user(user: User) -> None:
+    """Drop a user's cached identity after their row changes."""
+    user_cache.delete(("id", user.id))
+    user_cache.delete(("username", user.username))
 
 def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
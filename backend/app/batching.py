@@ -0,0 +1,29 @@
+"""
+Multi-get endpoints: parse an ?ids=1,2,3 list and cap its size.
+
+A batch answers with the items it found and a "missing" list for the ids it
+did not, so one unknown id doesn't fail the whole request.
+"""
+import os
+from typing import List
+
+from fastapi import HTTPException
+
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", "100"))
+
+
+def parse_ids(ids: str, limit: int = BATCH_MAX_IDS) -> List[int]:
+    """
+    Parse comma-separated ids, dropping duplicates but keeping their order.
+
+    Raises:
+        HTTPException: 400 if an id is not an integer or there are more than limit
+    """
+    try:
+        parsed = [int(i) for i in ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    parsed = list(dict.fromkeys(parsed))
+    if len(parsed) > limit:
+        raise HTTPException(status_code=400, detail=f"At most {limit} ids per request")
+    return parsed
@@ -1,44 +1,116 @@
-from sqlmodel import SQLModel, create_engine, Session, text
+from sqlmodel import SQLModel, create_engine, Session, text, inspect
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+import logging
 import os
 from dotenv import load_dotenv
-from app.models import User, Decision, Vote, Follow, Comment
+from app.models import User, Decision, Vote, Follow, Comment, VoteTally
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./doomscroll.db")
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+# SQLite profile: WAL lets readers proceed while a writer commits, and
+# synchronous=NORMAL is durable across app crashes in WAL mode (only an OS
+# crash can lose the last commits). Applied to every new connection.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # negative = KiB, i.e. 64 MiB
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+# Server profile (PostgreSQL etc.): pool sizing per engine, so the sync and
+# async engines together may open up to twice this many connections
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800")),
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+}
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
 
 # Configure engine based on database type
-if DATABASE_URL.startswith("sqlite"):
+if IS_SQLITE:
     # check_same_thread=False is needed only for SQLite
     engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
 else:
     # For PostgreSQL and other databases
-    engine = create_engine(DATABASE_URL)
+    engine = create_engine(DATABASE_URL, **POOL_SETTINGS)
+
+def _async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver (aiosqlite / asyncpg)."""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+# Async engine used by async def routes so DB round trips don't block the event loop
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _async_database_url(DATABASE_URL))
+if IS_SQLITE:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL)
+    event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+else:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **POOL_SETTINGS)
+
+def log_database_settings():
+    """Log the settings the database actually runs with (SQLite may refuse some, e.g. WAL in memory)."""
+    if IS_SQLITE:
+        with engine.connect() as connection:
+            effective = {
+                name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+                for name in SQLITE_PRAGMAS
+            }
+        logger.info(f"SQLite settings: {effective}")
+        if str(effective["journal_mode"]).lower() != str(SQLITE_PRAGMAS["journal_mode"]).lower():
+            logger.warning(
+                f"SQLite journal_mode is {effective['journal_mode']}, requested {SQLITE_PRAGMAS['journal_mode']}"
+            )
+    else:
+        logger.info(f"Database pool settings ({engine.dialect.name}, per engine): {POOL_SETTINGS}")
 
 def create_db_and_tables():
+    log_database_settings()
+    tallies_existed = inspect(engine).has_table(VoteTally.__tablename__)
     SQLModel.metadata.create_all(engine)
-    
-    # Migration: Add new columns to user table if they don't exist
-    with Session(engine) as session:
-        try:
-            # Check if email column exists
-            result = session.exec(text("PRAGMA table_info(user)"))
-            columns = [row[1] for row in result]
-            
-            # Add missing columns
-            if "email" not in columns:
-                session.exec(text("ALTER TABLE user ADD COLUMN email VARCHAR"))
-            if "bio" not in columns:
-                session.exec(text("ALTER TABLE user ADD COLUMN bio VARCHAR"))
-            if "avatar_url" not in columns:
-                session.exec(text("ALTER TABLE user ADD COLUMN avatar_url VARCHAR"))
-            
-            session.commit()
-        except Exception as e:
-            # If table doesn't exist yet, that's fine - it will be created by create_all
-            print(f"Migration check: {e}")
-            session.rollback()
+
+    # create_all skips columns and indexes on tables that already exist;
+    # versioned migrations bring older databases up to date
+    from app.migrations import run_migrations
+    run_migrations(engine)
+
+    # Full-text index over decision content (SQLite FTS5)
+    from app.services.search import setup_search_index
+    setup_search_index(engine)
+
+    # Backfill stored vote counts the first time the tally table appears
+    if not tallies_existed:
+        from app.services.tallies import rebuild_vote_tallies
+        with Session(engine) as session:
+            rebuild_vote_tallies(session)
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+async def get_async_session():
+    # expire_on_commit=False: attribute access after commit must not trigger lazy IO
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,83 @@
+"""
+HTTP conditional GETs: ETag / Last-Modified validators and Cache-Control.
+
+A route computes a validator from something cheap (a row's update timestamp,
+stored vote counts, an in-memory version number) before its enrichment
+queries and returns early with 304 Not Modified when the client's copy is
+still current.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag over the given version parts."""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison: W/"x" and "x" are the same validator
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+def _modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return True
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified > since
+
+
+def not_modified(
+    request: Request,
+    response: Response,
+    etag: Optional[str] = None,
+    last_modified: Optional[datetime] = None,
+    cache_control: str = "no-cache"
+) -> Optional[Response]:
+    """
+    Set validators and Cache-Control on the route's response, and check the request's.
+
+    Args:
+        response: The Response injected into the route; its headers are merged into the reply
+        last_modified: Naive UTC timestamp (as stored in the database)
+        cache_control: The route's caching policy
+
+    Returns:
+        A 304 response to return as-is, or None if the full payload is needed
+    """
+    headers = {"Cache-Control": cache_control}
+    if etag:
+        headers["ETag"] = etag
+    if last_modified:
+        # HTTP dates have one-second resolution
+        last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    response.headers.update(headers)
+
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        matched = etag is not None and _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        matched = (
+            if_modified_since is not None
+            and last_modified is not None
+            and not _modified_since(if_modified_since, last_modified)
+        )
+    return Response(status_code=304, headers=headers) if matched else None
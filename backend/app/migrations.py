@@ -0,0 +1,261 @@
+"""
+Versioned schema migrations for SQLite and PostgreSQL.
+
+create_all only creates missing tables, so changes to existing tables (new
+columns, new indexes) live here as numbered steps. Applied versions are
+recorded in the schema_migration table and each step runs exactly once.
+
+Run from the backend directory:
+    python -m app.migrations            # apply pending migrations
+    python -m app.migrations status     # list applied / pending versions
+    python -m app.migrations check      # report hot-path queries without an index
+"""
+import logging
+import sys
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session
+
+from app.models import Comment, Decision, DecisionScore, Follow, SchemaMigration, TimelineEntry, User, Vote, VoteTally, AnalysisCache
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for pg_advisory_lock so concurrent app instances migrate one at a time
+_PG_LOCK_KEY = 7_291_014
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+    # Online index builds (CREATE INDEX CONCURRENTLY) can't run inside a transaction
+    transactional: bool = True
+
+
+def create_index(connection: Connection, name: str, table: str, columns: Tuple[str, ...], unique: bool = False) -> None:
+    """
+    Create an index if it doesn't exist, without blocking writes where the database allows.
+
+    PostgreSQL builds it CONCURRENTLY (the connection must be in autocommit);
+    SQLite has no online build, but in WAL mode readers keep going meanwhile.
+    """
+    quote = connection.dialect.identifier_preparer.quote
+    concurrently = ""
+    if connection.dialect.name == "postgresql":
+        concurrently = " CONCURRENTLY"
+        # A failed concurrent build leaves an INVALID index that IF NOT EXISTS would keep
+        valid = connection.execute(
+            text("SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"),
+            {"name": name}
+        ).scalar()
+        if valid is False:
+            drop_index(connection, name)
+    connection.exec_driver_sql(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX{concurrently} IF NOT EXISTS {quote(name)} "
+        f"ON {quote(table)} ({', '.join(quote(column) for column in columns)})"
+    )
+
+
+def drop_index(connection: Connection, name: str) -> None:
+    concurrently = " CONCURRENTLY" if connection.dialect.name == "postgresql" else ""
+    connection.exec_driver_sql(f"DROP INDEX{concurrently} IF EXISTS {connection.dialect.identifier_preparer.quote(name)}")
+
+
+def _add_user_profile_columns(connection: Connection) -> None:
+    # Previously a PRAGMA table_info check, which only worked on SQLite
+    existing = {column["name"] for column in inspect(connection).get_columns("user")}
+    table = connection.dialect.identifier_preparer.quote("user")
+    for column in ("email", "bio", "avatar_url"):
+        if column not in existing:
+            connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} VARCHAR")
+
+
+def _add_pagination_indexes(connection: Connection) -> None:
+    create_index(connection, "ix_decision_created_at_id", "decision", ("created_at", "id"))
+    create_index(connection, "ix_decision_user_id_created_at", "decision", ("user_id", "created_at"))
+    create_index(connection, "ix_comment_decision_id_created_at", "comment", ("decision_id", "created_at"))
+
+
+def _add_vote_and_follow_indexes(connection: Connection) -> None:
+    create_index(connection, "ix_vote_decision_id_choice", "vote", ("decision_id", "choice"))
+    create_index(connection, "ix_vote_user_id_decision_id", "vote", ("user_id", "decision_id"))
+    create_index(connection, "ix_follow_follower_id", "follow", ("follower_id",))
+    create_index(connection, "ix_follow_following_id", "follow", ("following_id",))
+
+
+def _enforce_one_vote_per_user(connection: Connection) -> None:
+    # Races in the old check-then-insert path could leave duplicates; keep each
+    # user's latest vote per decision so the unique index can be built
+    deleted = connection.exec_driver_sql(
+        "DELETE FROM vote WHERE id NOT IN (SELECT MAX(id) FROM vote GROUP BY user_id, decision_id)"
+    ).rowcount
+    if deleted:
+        logger.info(f"Removed {deleted} duplicate vote(s); reconciling tallies")
+        from app.services.tallies import rebuild_vote_tallies
+        with Session(bind=connection) as session:
+            rebuild_vote_tallies(session)
+
+    create_index(connection, "uq_vote_user_id_decision_id", "vote", ("user_id", "decision_id"), unique=True)
+    # The unique index serves the same lookups
+    drop_index(connection, "ix_vote_user_id_decision_id")
+
+
+def _add_user_updated_at(connection: Connection) -> None:
+    if "updated_at" not in {column["name"] for column in inspect(connection).get_columns("user")}:
+        connection.exec_driver_sql(f"ALTER TABLE {connection.dialect.identifier_preparer.quote('user')} ADD COLUMN updated_at TIMESTAMP")
+
+
+def _backfill_timelines(connection: Connection) -> None:
+    # Existing follows predate fan-out-on-write; seed each inbox with recent decisions
+    from app.services.timelines import timelines
+    with Session(bind=connection) as session:
+        authors = session.exec(select(Follow.following_id).distinct()).scalars().all()
+        for author_id in authors:
+            timelines.backfill(session, author_id)
+        session.commit()
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "user_profile_columns", _add_user_profile_columns),
+    Migration(2, "pagination_indexes", _add_pagination_indexes, transactional=False),
+    Migration(3, "vote_and_follow_indexes", _add_vote_and_follow_indexes, transactional=False),
+    Migration(4, "unique_vote_per_user", _enforce_one_vote_per_user, transactional=False),
+    Migration(5, "backfill_timelines", _backfill_timelines),
+    Migration(6, "user_updated_at", _add_user_updated_at),
+]
+
+
+def applied_versions(engine: Engine) -> Dict[int, datetime]:
+    if not inspect(engine).has_table(SchemaMigration.__tablename__):
+        return {}
+    with engine.connect() as connection:
+        rows = connection.execute(select(SchemaMigration.version, SchemaMigration.applied_at)).all()
+    return {version: applied_at for version, applied_at in rows}
+
+
+def _record(connection: Connection, migration: Migration) -> None:
+    connection.execute(SchemaMigration.__table__.insert().values(
+        version=migration.version,
+        name=migration.name,
+        applied_at=datetime.utcnow()
+    ))
+
+
+def run_migrations(engine: Engine) -> List[int]:
+    """
+    Apply pending migrations in version order.
+
+    Expects create_all to have run first (it creates schema_migration and, on a
+    fresh database, already-current tables, making each step a no-op).
+
+    Returns:
+        Versions applied by this call
+    """
+    applied: List[int] = []
+    with engine.connect() as lock_connection:
+        is_postgres = engine.dialect.name == "postgresql"
+        if is_postgres:
+            lock_connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _PG_LOCK_KEY})
+            lock_connection.commit()
+        try:
+            done = applied_versions(engine)
+            for migration in MIGRATIONS:
+                if migration.version in done:
+                    continue
+                logger.info(f"Applying migration {migration.version}: {migration.name}")
+                if migration.transactional:
+                    with engine.begin() as connection:
+                        migration.apply(connection)
+                        _record(connection, migration)
+                else:
+                    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                        migration.apply(connection)
+                    with engine.begin() as connection:
+                        _record(connection, migration)
+                applied.append(migration.version)
+        finally:
+            if is_postgres:
+                lock_connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _PG_LOCK_KEY})
+                lock_connection.commit()
+    return applied
+
+
+# Representative lookups the routers issue on every request, checked by check_indexes()
+HOT_QUERIES = {
+    "feed page": select(Decision).order_by(Decision.created_at.desc(), Decision.id.desc()).limit(20),
+    "hot feed page": select(Decision).join(DecisionScore, DecisionScore.decision_id == Decision.id)
+        .order_by(DecisionScore.score.desc(), DecisionScore.decision_id.desc()).limit(20),
+    "user's decisions page": select(Decision).where(Decision.user_id == 1)
+        .order_by(Decision.created_at.desc(), Decision.id.desc()).limit(20),
+    "user's decision count": select(func.count(Decision.id)).where(Decision.user_id == 1),
+    "comments page": select(Comment).where(Comment.decision_id == 1)
+        .order_by(Comment.created_at.desc(), Comment.id.desc()).limit(20),
+    "existing vote check": select(Vote).where(Vote.user_id == 1, Vote.decision_id == 1),
+    "vote counts by choice": select(Vote.choice, func.count(Vote.id)).where(Vote.decision_id == 1).group_by(Vote.choice),
+    "following timeline page": select(Decision).join(TimelineEntry, TimelineEntry.decision_id == Decision.id)
+        .where(TimelineEntry.user_id == 1)
+        .order_by(TimelineEntry.created_at.desc(), TimelineEntry.decision_id.desc()).limit(20),
+    "following list": select(Follow).where(Follow.follower_id == 1),
+    "followers list": select(Follow).where(Follow.following_id == 1),
+    "follow exists": select(Follow).where(Follow.follower_id == 1, Follow.following_id == 2),
+    "bulk tallies": select(VoteTally).where(VoteTally.decision_id.in_([1, 2, 3])),
+    "batch vote counts": select(Decision.id, VoteTally.total)
+        .outerjoin(VoteTally, VoteTally.decision_id == Decision.id).where(Decision.id.in_([1, 2, 3])),
+    "batch users": select(User).where(User.id.in_([1, 2, 3])),
+    "latest analysis": select(AnalysisCache).where(AnalysisCache.user_id == 1, AnalysisCache.kind == "personality")
+        .order_by(AnalysisCache.created_at.desc(), AnalysisCache.id.desc()),
+}
+
+
+def _full_scans(connection: Connection, query) -> List[str]:
+    """Plan steps that read a whole table instead of using an index."""
+    sql = str(query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    if connection.dialect.name == "postgresql":
+        # Tiny tables make seq scans cheapest; disable them so only missing indexes show
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = [row[0] for row in connection.exec_driver_sql(f"EXPLAIN {sql}")]
+        return [line.strip() for line in plan if "Seq Scan" in line]
+    plan = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+    return [step for step in plan if step.startswith("SCAN ") and " USING " not in step]
+
+
+def check_indexes(engine: Engine) -> Dict[str, List[str]]:
+    """
+    EXPLAIN each hot-path query and report the ones that fall back to a full table scan.
+
+    Returns:
+        Query name -> offending plan steps, only for queries missing an index
+    """
+    missing = {}
+    with engine.connect() as connection:
+        for name, query in HOT_QUERIES.items():
+            scans = _full_scans(connection, query)
+            if scans:
+                missing[name] = scans
+        connection.rollback()
+    return missing
+
+
+if __name__ == "__main__":
+    from app.database import engine, create_db_and_tables
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+    if command == "upgrade":
+        create_db_and_tables()
+        print(f"Schema at version {max(applied_versions(engine), default=0)}")
+    elif command == "status":
+        done = applied_versions(engine)
+        for migration in MIGRATIONS:
+            state = f"applied {done[migration.version]:%Y-%m-%d %H:%M}" if migration.version in done else "pending"
+            print(f"{migration.version:>4}  {migration.name:<28} {state}")
+    elif command == "check":
+        missing = check_indexes(engine)
+        for name, scans in missing.items():
+            print(f"MISSING INDEX  {name}: {'; '.join(scans)}")
+        print(f"{len(HOT_QUERIES) - len(missing)}/{len(HOT_QUERIES)} hot-path queries use an index")
+        sys.exit(1 if missing else 0)
+    else:
+        sys.exit(f"Unknown command {command!r} (expected upgrade, status or check)")
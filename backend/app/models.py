@@ -1,4 +1,4 @@
-from sqlmodel import SQLModel, Field, Relationship
+from sqlmodel import SQLModel, Field, Relationship, Index, UniqueConstraint
 from typing import Optional, List
 from datetime import datetime
 
@@ -10,6 +10,8 @@ class User(SQLModel, table=True):
     bio: Optional[str] = None
     avatar_url: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Bumped whenever the profile page changes (edits, new decisions, follows); HTTP validator
+    updated_at: Optional[datetime] = None
     
     # Relationships
     decisions: List["Decision"] = Relationship(back_populates="user")
@@ -19,6 +21,12 @@ class User(SQLModel, table=True):
     # This avoids ambiguity issues with multiple foreign keys
 
 class Follow(SQLModel, table=True):
+    __table_args__ = (
+        # Following / followers lists and the following feed filter
+        Index("ix_follow_follower_id", "follower_id"),
+        Index("ix_follow_following_id", "following_id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     follower_id: int = Field(foreign_key="user.id")
     following_id: int = Field(foreign_key="user.id")
@@ -27,6 +35,12 @@ class Follow(SQLModel, table=True):
     # No relationships here - we'll query Users separately in the routers
 
 class Decision(SQLModel, table=True):
+    __table_args__ = (
+        # Keyset pagination seeks on (created_at, id), optionally per user
+        Index("ix_decision_created_at_id", "created_at", "id"),
+        Index("ix_decision_user_id_created_at", "user_id", "created_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     content: str
@@ -40,6 +54,12 @@ class Decision(SQLModel, table=True):
     comments: List["Comment"] = Relationship(back_populates="decision")
 
 class Vote(SQLModel, table=True):
+    __table_args__ = (
+        # Per-decision counts by choice; one vote per user and decision (upsert target)
+        Index("ix_vote_decision_id_choice", "decision_id", "choice"),
+        Index("uq_vote_user_id_decision_id", "user_id", "decision_id", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     decision_id: int = Field(foreign_key="decision.id")
@@ -51,6 +71,10 @@ class Vote(SQLModel, table=True):
     decision: Optional[Decision] = Relationship(back_populates="votes")
 
 class Comment(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_comment_decision_id_created_at", "decision_id", "created_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     decision_id: int = Field(foreign_key="decision.id")
@@ -60,3 +84,70 @@ class Comment(SQLModel, table=True):
     # Relationships
     user: Optional[User] = Relationship(back_populates="comments")
     decision: Optional[Decision] = Relationship(back_populates="comments")
+
+class VoteTally(SQLModel, table=True):
+    # Materialized vote counts per decision, kept in sync by create_vote
+    decision_id: int = Field(foreign_key="decision.id", primary_key=True)
+    option_a: int = 0
+    option_b: int = 0
+    total: int = 0
+
+class TimelineEntry(SQLModel, table=True):
+    # A decision pushed into a follower's inbox when it was posted (services/timelines.py)
+    __tablename__ = "timeline_entry"
+    __table_args__ = (
+        # The following feed is one range scan over a user's inbox
+        Index("ix_timeline_entry_user_id_created_at", "user_id", "created_at", "decision_id"),
+    )
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True)  # The follower
+    decision_id: int = Field(foreign_key="decision.id", primary_key=True)
+    author_id: int = Field(foreign_key="user.id")
+    created_at: datetime  # Copied from the decision for feed order
+
+class DecisionScore(SQLModel, table=True):
+    # Trending score per decision for the sort=hot feed, refreshed by services/trending.py
+    __table_args__ = (
+        Index("ix_decision_score_score_decision_id", "score", "decision_id"),
+    )
+
+    decision_id: int = Field(foreign_key="decision.id", primary_key=True)
+    score: float = 0.0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class DecisionPrediction(SQLModel, table=True):
+    # AI consequence predictions, generated once per decision
+    decision_id: int = Field(foreign_key="decision.id", primary_key=True)
+    good: str
+    bad: str
+    weird: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class UserHistorySummary(SQLModel, table=True):
+    # Rolling AI summary of a user's older decisions, used to bound prompt size
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    summary: str
+    last_decision_id: int  # Newest decision already folded into the summary
+    folded_count: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class AnalysisCache(SQLModel, table=True):
+    # AI analysis results keyed by a hash of the user's ordered decision texts
+    __table_args__ = (
+        UniqueConstraint("user_id", "kind", "content_hash"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    kind: str  # "personality" or "life_areas"
+    content_hash: str
+    result: str  # JSON-encoded analysis output
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class SchemaMigration(SQLModel, table=True):
+    # One row per applied migration in app/migrations.py
+    __tablename__ = "schema_migration"
+
+    version: int = Field(primary_key=True)
+    name: str
+    applied_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,110 @@
+import base64
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlmodel import Session, tuple_
+
+
+def encode_cursor(key: Any, row_id: int) -> str:
+    """
+    Encode a (sort key, id) position as an opaque cursor string.
+
+    The key is a created_at datetime or a numeric score; a score is written
+    with repr, which round-trips floats exactly so the seek lands on the same row.
+    """
+    text = key.isoformat() if isinstance(key, datetime) else repr(key)
+    raw = f"{text}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, parse_key: Callable[[str], Any] = datetime.fromisoformat) -> Tuple[Any, int]:
+    """Decode a cursor produced by encode_cursor; parse_key turns the key back into its type."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key, row_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return parse_key(key), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(
+    session: Session,
+    query: Any,
+    model: Any,
+    limit: int,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    order: Optional[Tuple[Any, Any]] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Run a newest-first query with either keyset or offset pagination.
+
+    A non-empty cursor seeks past the (created_at, id) it encodes, so page cost
+    does not grow with depth and new rows don't shift later pages. Without one
+    the legacy offset is applied.
+
+    Args:
+        order: (created_at, id) columns to sort and seek on when they come from
+            a joined table holding copies of the model's values; defaults to the model's own
+
+    Returns:
+        The page of rows and the cursor for the next page (None on the last page)
+    """
+    created_at_column, id_column = order or (model.created_at, model.id)
+    query = query.order_by(created_at_column.desc(), id_column.desc())
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(tuple_(created_at_column, id_column) < tuple_(created_at, row_id))
+    elif offset:
+        query = query.offset(offset)
+
+    # Fetch one extra row to know whether another page exists
+    rows = session.exec(query.limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+
+def paginate_ranked(
+    session: Session,
+    query: Any,
+    score: Any,
+    row_id: Any,
+    limit: int,
+    offset: int = 0,
+    cursor: Optional[str] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Like paginate, but highest score first, seeking on (score, id).
+
+    The query must select (row, score value) pairs. Scores are refreshed in
+    the background, so a cursor resumes below the position it encodes rather
+    than at a fixed row; items that moved up past it since are not repeated.
+
+    Returns:
+        The page of rows and the cursor for the next page (None on the last page)
+    """
+    query = query.order_by(score.desc(), row_id.desc())
+    if cursor:
+        last_score, last_id = decode_cursor(cursor, float)
+        query = query.where(tuple_(score, row_id) < tuple_(last_score, last_id))
+    elif offset:
+        query = query.offset(offset)
+
+    rows = session.exec(query.limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_row, last_score = rows[-1]
+        next_cursor = encode_cursor(last_score, last_row.id)
+    return [row for row, _ in rows], next_cursor
+
+
+def page_response(items: List[Any], next_cursor: Optional[str], cursor: Optional[str]) -> Any:
+    """Keep the plain-list response for offset clients; cursor clients get an envelope."""
+    if cursor is None:
+        return items
+    return {"items": items, "next_cursor": next_cursor}
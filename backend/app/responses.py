@@ -0,0 +1,15 @@
+"""
+orjson-backed JSON response, the app's default response class.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        # Content has already been through FastAPI's encoder; orjson only does the dump
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
@@ -1,20 +1,44 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response
+from app.services.gemini_client import gemini_client
+from app.services.jobs import job_queue
+from app.services.vote_buffer import vote_buffer
+from app.services.timelines import timelines
+from app.services.live_counts import vote_hub
+from app.http_cache import make_etag, not_modified
 
 router = APIRouter()
 
+ABOUT = {
+    "name": "Parallel",
+    "description": "A decision-making social platform where users post binary choices, vote on others' decisions, and compete on AI-powered leaderboards.",
+    "version": "1.0.0",
+    "features": [
+        "Post binary decision dilemmas",
+        "Vote on community decisions",
+        "AI-powered consequence predictions",
+        "Personality analysis based on decisions",
+        "Follow other users",
+        "Competitive leaderboards"
+    ]
+}
+ABOUT_ETAG = make_etag("about", sorted(ABOUT.items()))
+
 @router.get("/about/")
-def get_about():
+def get_about(request: Request, response: Response):
     """Get information about the Parallel platform"""
+    # Static per release
+    cached = not_modified(request, response, etag=ABOUT_ETAG, cache_control="public, max-age=3600")
+    if cached:
+        return cached
+    return ABOUT
+
+@router.get("/about/ai")
+def get_ai_status():
+    """Gemini client metrics (in-flight calls, timeouts, breaker state), background jobs and the vote buffer"""
     return {
-        "name": "Parallel",
-        "description": "A decision-making social platform where users post binary choices, vote on others' decisions, and compete on AI-powered leaderboards.",
-        "version": "1.0.0",
-        "features": [
-            "Post binary decision dilemmas",
-            "Vote on community decisions",
-            "AI-powered consequence predictions",
-            "Personality analysis based on decisions",
-            "Follow other users",
-            "Competitive leaderboards"
-        ]
+        **gemini_client.metrics(),
+        "jobs": job_queue.metrics(),
+        "vote_buffer": vote_buffer.metrics(),
+        "timelines": timelines.metrics(),
+        "live_counts": vote_hub.metrics()
     }
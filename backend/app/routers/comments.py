@@ -1,20 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select, func
-from app.database import get_session
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_session
 from app.models import Comment, Decision, User
 from app.auth import get_current_user
-from typing import Optional, List
+from app.services.hydration import hydrate_comments
+from app.pagination import paginate, page_response
+from app.schemas import CommentItem, CommentPage, UserSummary
+from typing import Optional, List, Union
 
 router = APIRouter()
 
-@router.post("/comments/")
+@router.post("/comments/", response_model=CommentItem)
 async def create_comment(
     comment: Comment,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
     # Check if decision exists
-    decision = session.get(Decision, comment.decision_id)
+    decision = await session.get(Decision, comment.decision_id)
     if not decision:
         raise HTTPException(status_code=404, detail="Decision not found")
 
@@ -22,54 +26,40 @@ async def create_comment(
     comment.user_id = current_user.id
 
     session.add(comment)
-    session.commit()
-    session.refresh(comment)
+    await session.commit()
+    await session.refresh(comment)
 
-    # Return comment with user info
-    user = session.get(User, comment.user_id)
-    return {
-        **comment.dict(),
-        "user": user.dict() if user else None
-    }
+    # Return comment with user info (the author is the current user)
+    authors = {current_user.id: UserSummary.model_validate(current_user)}
+    return (await session.run_sync(hydrate_comments, [comment], authors))[0]
 
-@router.get("/comments/{decision_id}")
+@router.get("/comments/{decision_id}", response_model=Union[List[CommentItem], CommentPage])
 async def get_comments(
     decision_id: int,
     offset: int = 0,
     limit: int = 20,
-    session: Session = Depends(get_session)
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_async_session)
 ):
     # Check if decision exists
-    decision = session.get(Decision, decision_id)
+    decision = await session.get(Decision, decision_id)
     if not decision:
         raise HTTPException(status_code=404, detail="Decision not found")
 
-    comments = session.exec(
-        select(Comment)
-        .where(Comment.decision_id == decision_id)
-        .order_by(Comment.created_at.desc())
-        .offset(offset)
-        .limit(limit)
-    ).all()
+    comments, next_cursor = await session.run_sync(
+        paginate, select(Comment).where(Comment.decision_id == decision_id), Comment, limit, offset, cursor
+    )
 
     # Enrich with user info
-    result = []
-    for comment in comments:
-        user = session.get(User, comment.user_id)
-        result.append({
-            **comment.dict(),
-            "user": user.dict() if user else None
-        })
-
-    return result
+    return page_response(await session.run_sync(hydrate_comments, comments), next_cursor, cursor)
 
 @router.delete("/comments/{comment_id}")
 async def delete_comment(
     comment_id: int,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user)
 ):
-    comment = session.get(Comment, comment_id)
+    comment = await session.get(Comment, comment_id)
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
 
@@ -77,6 +67,6 @@ async def delete_comment(
     if comment.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this comment")
 
-    session.delete(comment)
-    session.commit()
+    await session.delete(comment)
+    await session.commit()
     return {"message": "Comment deleted successfully"}
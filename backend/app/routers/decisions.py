@@ -1,18 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select, func
-from app.database import get_session
-from app.models import Decision, User, Vote, Follow
-from app.services.gemini import predict_consequences, generate_consensus_recommendation
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_session, get_async_session, async_engine
+from app.models import Decision, User, Vote, Follow, VoteTally, DecisionPrediction, DecisionScore
+from app.services.gemini import (
+    predict_consequences, stream_consequences, generate_consensus_recommendation, CONSENSUS_FALLBACK
+)
+from app.services.cache import TTLCache, SingleFlight
+from app.services.tallies import get_vote_counts_bulk
+from app.services.hydration import hydrate_decisions
+from app.services.vote_buffer import vote_buffer
+from app.services.search import search_decisions
+from app.services.similarity import similarity_index
+from app.services.leaderboards import leaderboards
+from app.services.trending import initial_score
+from app.services.timelines import timelines
+from app.services.analysis_cache import enqueue_refresh
 from app.auth import get_current_user_optional
+from app.pagination import paginate, paginate_ranked, page_response
+from app.http_cache import make_etag, not_modified
+from app.schemas import DecisionItem, FeedResponse, SearchResultItem
+from datetime import datetime
 from typing import Optional, List
-from difflib import SequenceMatcher
+import hashlib
+import json
+import os
 
 router = APIRouter()
 
+# Consensus recommendations keyed by normalized text + similar-decision fingerprint
+CONSENSUS_CACHE_TTL = float(os.getenv("CONSENSUS_CACHE_TTL_SECONDS", "600"))
+CONSENSUS_FAILURE_TTL = 30.0
+consensus_cache = TTLCache(maxsize=int(os.getenv("CONSENSUS_CACHE_SIZE", "512")), ttl=CONSENSUS_CACHE_TTL)
+consensus_flight = SingleFlight()
+
 @router.post("/decisions/")
-async def create_decision(decision: Decision, session: Session = Depends(get_session)):
+async def create_decision(decision: Decision, session: AsyncSession = Depends(get_async_session)):
     # Check if user exists
-    user = session.get(User, decision.user_id)
+    user = await session.get(User, decision.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -20,179 +46,226 @@ async def create_decision(decision: Decision, session: Session = Depends(get_ses
     if not decision.option_a or not decision.option_b:
         raise HTTPException(status_code=400, detail="Both option_a and option_b are required")
 
-    # Save to DB
+    # The author's profile page changes too (decision count)
+    user.updated_at = datetime.utcnow()
+
+    # Save to DB along with an empty vote tally and its starting hot score
     session.add(decision)
-    session.commit()
-    session.refresh(decision)
+    await session.flush()
+    session.add(VoteTally(decision_id=decision.id))
+    session.add(DecisionScore(decision_id=decision.id, score=initial_score()))
+    # Push into followers' following feeds in the same transaction
+    await session.run_sync(timelines.fan_out, decision)
+    await session.commit()
+    await session.refresh(decision)
+
+    # Make the new decision findable by /decisions/recommend
+    similarity_index.add(decision.id, decision.content)
+    leaderboards.record_decision(decision.id, decision.user_id)
+
+    # The author's stored AI analyses are now stale; recompute them off the request path
+    enqueue_refresh(decision.user_id)
     return decision
 
-@router.get("/decisions/")
+@router.get("/decisions/", response_model=FeedResponse)
 def read_decisions(
     offset: int = 0,
     limit: int = 20,
     user_id: Optional[int] = None,
     following_user_id: Optional[int] = None,  # Get decisions from users this user follows
     search: Optional[str] = None,
+    sort: str = "new",  # new (newest first) or hot (trending score)
+    cursor: Optional[str] = None,  # Opaque keyset cursor; when sent, response includes next_cursor
     session: Session = Depends(get_session)
 ):
     """Get decisions feed - supports filtering by user, following, or search"""
-    query = select(Decision)
+    if sort not in ("new", "hot"):
+        raise HTTPException(status_code=400, detail="sort must be new or hot")
+
+    if sort == "hot":
+        # Precomputed scores (services/trending.py), read through their index
+        query = select(Decision, DecisionScore.score).join(DecisionScore, DecisionScore.decision_id == Decision.id)
+    else:
+        query = select(Decision)
     
     # Filter by specific user
     if user_id:
         query = query.where(Decision.user_id == user_id)
-    # Filter by users that a specific user follows
+    # Decisions from users that a specific user follows, read from their timeline inbox
+    elif following_user_id and sort == "new":
+        decisions, next_cursor = timelines.page(session, following_user_id, limit, offset, cursor)
+        return page_response(hydrate_decisions(session, decisions), next_cursor, cursor)
     elif following_user_id:
-        # Get IDs of users being followed
-        follows = session.exec(
-            select(Follow).where(Follow.follower_id == following_user_id)
+        following_ids = session.exec(
+            select(Follow.following_id).where(Follow.follower_id == following_user_id)
         ).all()
-        following_ids = [f.following_id for f in follows]
         if following_ids:
             query = query.where(Decision.user_id.in_(following_ids))
         else:
             # Return empty if not following anyone
-            return []
-    # Search in decision content
+            return page_response([], None, cursor)
+    # Search in decision content, ranked by relevance (pages by offset)
     elif search:
-        query = query.where(Decision.content.ilike(f"%{search}%"))
-    
-    decisions = session.exec(
-        query
-        .order_by(Decision.created_at.desc())
-        .offset(offset)
-        .limit(limit)
-    ).all()
-    
-    # Enrich with vote counts and user info
-    result = []
-    for decision in decisions:
-        vote_counts = session.exec(
-            select(func.count(Vote.id)).where(Vote.decision_id == decision.id)
-        ).first() or 0
-        option_a_count = session.exec(
-            select(func.count(Vote.id)).where(
-                Vote.decision_id == decision.id,
-                Vote.choice == "option_a"
-            )
-        ).first() or 0
-        option_b_count = session.exec(
-            select(func.count(Vote.id)).where(
-                Vote.decision_id == decision.id,
-                Vote.choice == "option_b"
-            )
-        ).first() or 0
-
-        user = session.get(User, decision.user_id)
-        result.append({
-            **decision.dict(),
-            "user": user.dict() if user else None,
-            "vote_counts": {
-                "total": vote_counts,
-                "option_a": option_a_count,
-                "option_b": option_b_count
-            }
-        })
+        matches = search_decisions(session, search, limit, offset)
+        # The ILIKE fallback (no FTS index, or no words to match) has no snippets
+        items = [
+            SearchResultItem(**dict(item), snippet=snippet) if snippet is not None else item
+            for item, (_, snippet) in zip(hydrate_decisions(session, [decision for decision, _ in matches]), matches)
+        ]
+        return page_response(items, None, cursor)
     
-    return result
+    if sort == "hot":
+        decisions, next_cursor = paginate_ranked(
+            session, query, DecisionScore.score, DecisionScore.decision_id, limit, offset, cursor
+        )
+    else:
+        decisions, next_cursor = paginate(session, query, Decision, limit, offset, cursor)
+
+    # Enrich with vote counts and user info in a fixed number of queries
+    return page_response(hydrate_decisions(session, decisions), next_cursor, cursor)
+
+@router.get("/decisions/{decision_id}", response_model=DecisionItem)
+def get_decision(decision_id: int, request: Request, response: Response, session: Session = Depends(get_session)):
+    # Validator in one query: the decision itself never changes, so only its
+    # author's row version and its vote counts can
+    version = session.exec(
+        select(
+            func.coalesce(User.updated_at, User.created_at),
+            VoteTally.option_a, VoteTally.option_b, VoteTally.total
+        )
+        .select_from(Decision)
+        .join(User, User.id == Decision.user_id)
+        .outerjoin(VoteTally, VoteTally.decision_id == Decision.id)
+        .where(Decision.id == decision_id)
+    ).first()
+    if not version:
+        raise HTTPException(status_code=404, detail="Decision not found")
+
+    pending = sorted(vote_buffer.count_deltas([decision_id]).get(decision_id, {}).items())
+    etag = make_etag("decision", decision_id, *version, pending)
+    cached = not_modified(request, response, etag=etag, cache_control="no-cache")
+    if cached:
+        return cached
 
-@router.get("/decisions/{decision_id}")
-def get_decision(decision_id: int, session: Session = Depends(get_session)):
     decision = session.get(Decision, decision_id)
+    return hydrate_decisions(session, [decision])[0]
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.get("/decisions/{decision_id}/consequences/stream")
+async def stream_decision_consequences(decision_id: int, session: AsyncSession = Depends(get_async_session)):
+    """Stream good/bad/weird predictions as Server-Sent Events while Gemini writes them"""
+    # Events: "delta" (partial field text), one "result", then "done". Results are
+    # stored, so later requests replay them without calling the model.
+    decision = await session.get(Decision, decision_id)
     if not decision:
         raise HTTPException(status_code=404, detail="Decision not found")
-    
-    # Get vote counts
-    option_a_count = session.exec(
-        select(func.count(Vote.id)).where(
-            Vote.decision_id == decision_id,
-            Vote.choice == "option_a"
-        )
-    ).first() or 0
-    option_b_count = session.exec(
-        select(func.count(Vote.id)).where(
-            Vote.decision_id == decision_id,
-            Vote.choice == "option_b"
-        )
-    ).first() or 0
 
-    user = session.get(User, decision.user_id)
+    stored = await session.get(DecisionPrediction, decision_id)
+    stored_predictions = {"good": stored.good, "bad": stored.bad, "weird": stored.weird} if stored else None
+    content = decision.content
 
-    return {
-        **decision.dict(),
-        "user": user.dict() if user else None,
-        "vote_counts": {
-            "option_a": option_a_count,
-            "option_b": option_b_count
-        }
-    }
+    async def events():
+        if stored_predictions:
+            yield _sse("result", {**stored_predictions, "cached": True})
+            yield _sse("done", {})
+            return
+
+        async for kind, payload in stream_consequences(content):
+            if kind == "delta":
+                yield _sse("delta", payload)
+                continue
+
+            if kind == "result":
+                # The request session may already be closed while streaming
+                async with AsyncSession(async_engine) as write_session:
+                    await write_session.merge(DecisionPrediction(
+                        decision_id=decision_id,
+                        **{key: str(payload[key]) for key in ("good", "bad", "weird")}
+                    ))
+                    await write_session.commit()
+            yield _sse("result", {**payload, "cached": False, "fallback": kind == "fallback"})
+        yield _sse("done", {})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 def find_similar_decisions(decision_text: str, session: Session, limit: int = 20) -> List[dict]:
     """Find decisions similar to the given text based on content similarity."""
-    # Get all decisions
-    all_decisions = session.exec(select(Decision)).all()
+    # LSH lookup returns only candidates sharing a band bucket, scored exactly
+    similarity_index.ensure_loaded(session)
+    matches = similarity_index.query(decision_text, min_similarity=0.3)
 
-    # Calculate similarity scores
+    # Stored tallies fold legacy do_it/dont_do_it into option_a/option_b
+    tallies = get_vote_counts_bulk(session, [decision_id for decision_id, _ in matches])
     similarities = []
-    for decision in all_decisions:
-        # Simple similarity based on sequence matching
-        similarity = SequenceMatcher(None, decision_text.lower(), decision.content.lower()).ratio()
-
-        # Also get vote counts for this decision
-        do_it_count = session.exec(
-            select(func.count(Vote.id)).where(
-                Vote.decision_id == decision.id,
-                Vote.choice == "do_it"
-            )
-        ).first() or 0
-        dont_do_it_count = session.exec(
-            select(func.count(Vote.id)).where(
-                Vote.decision_id == decision.id,
-                Vote.choice == "dont_do_it"
-            )
-        ).first() or 0
-
+    for decision_id, similarity in matches:
+        do_it_count = tallies[decision_id]["option_a"]
+        dont_do_it_count = tallies[decision_id]["option_b"]
         similarities.append({
-            'decision': decision,
+            'id': decision_id,
             'similarity': similarity,
             'do_it_count': do_it_count,
             'dont_do_it_count': dont_do_it_count,
             'total_votes': do_it_count + dont_do_it_count
         })
 
-    # Filter out very low similarity and sort by similarity and vote count
-    filtered_similarities = [
-        s for s in similarities
-        if s['similarity'] > 0.3 and s['total_votes'] > 0  # At least some similarity and votes
-    ]
+    # Keep only decisions with some votes
+    filtered_similarities = [s for s in similarities if s['total_votes'] > 0]
 
     # Sort by combination of similarity and vote count (prioritize well-voted similar decisions)
     filtered_similarities.sort(
         key=lambda x: x['similarity'] * 0.7 + (x['total_votes'] / 100) * 0.3,
         reverse=True
     )
+    top = filtered_similarities[:limit]
+
+    decisions = session.exec(
+        select(Decision).where(Decision.id.in_([s['id'] for s in top]))
+    ).all()
+    contents = {d.id: d.content for d in decisions}
 
     # Return top similar decisions with their vote data
     return [
         {
-            'id': s['decision'].id,
-            'content': s['decision'].content,
+            'id': s['id'],
+            'content': contents[s['id']],
             'do_it_count': s['do_it_count'],
             'dont_do_it_count': s['dont_do_it_count'],
             'similarity': s['similarity']
         }
-        for s in filtered_similarities[:limit]
+        for s in top
+        if s['id'] in contents
     ]
 
+def consensus_cache_key(decision_text: str, similar_decisions: List[dict]) -> tuple:
+    """Normalized text plus a fingerprint of the similar set and its vote counts."""
+    normalized = " ".join(decision_text.lower().split())
+    fingerprint = hashlib.sha1(json.dumps(
+        [(s['id'], s['do_it_count'], s['dont_do_it_count']) for s in similar_decisions]
+    ).encode()).hexdigest()
+    return normalized, fingerprint
+
+async def _generate_and_cache_consensus(key: tuple, decision_text: str, similar_decisions: List[dict]) -> str:
+    recommendation = await generate_consensus_recommendation(decision_text, similar_decisions)
+    # Cache failures only briefly so an outage isn't pinned for the full TTL
+    ttl = CONSENSUS_FAILURE_TTL if recommendation == CONSENSUS_FALLBACK else None
+    consensus_cache.set(key, recommendation, ttl=ttl)
+    return recommendation
+
 @router.get("/decisions/recommend/{decision_text:path}")
 async def get_consensus_recommendation(
     decision_text: str,
     current_user: Optional[User] = Depends(get_current_user_optional),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Get AI recommendation based on community consensus from similar decisions."""
     # Find similar decisions with vote data
-    similar_decisions = find_similar_decisions(decision_text, session)
+    similar_decisions = await session.run_sync(lambda sync_session: find_similar_decisions(decision_text, sync_session))
 
     if not similar_decisions:
         return {
@@ -200,9 +273,15 @@ async def get_consensus_recommendation(
             "similar_decisions_count": 0
         }
 
-    # Generate AI recommendation based on consensus
+    # Generate AI recommendation based on consensus; identical concurrent
+    # requests share one model call and repeats are served from the cache
+    key = consensus_cache_key(decision_text, similar_decisions)
     try:
-        recommendation = await generate_consensus_recommendation(decision_text, similar_decisions)
+        recommendation = consensus_cache.get(key)
+        if recommendation is None:
+            recommendation = await consensus_flight.do(
+                key, lambda: _generate_and_cache_consensus(key, decision_text, similar_decisions)
+            )
         return {
             "recommendation": recommendation,
             "similar_decisions_count": len(similar_decisions),
@@ -1,31 +1,65 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, select, func
-from app.database import get_session
-from app.models import User, Decision, Vote
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_session
+from app.models import User
+from app.services.leaderboards import leaderboards, METRICS, WINDOWS
+from app.http_cache import make_etag, not_modified
 
 router = APIRouter()
 
+def _validate(metric: str, window: str):
+    if metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of {', '.join(METRICS)}")
+    if window not in WINDOWS:
+        raise HTTPException(status_code=400, detail=f"window must be one of {', '.join(WINDOWS)}")
+
 @router.get("/leaderboard/")
-async def get_leaderboard(session: Session = Depends(get_session)):
-    # Get users ranked by number of decisions posted
-    leaderboard = session.exec(
-        select(
-            User.id,
-            User.username,
-            func.count(Decision.id).label("decisions_count")
-        )
-        .join(Decision, User.id == Decision.user_id)
-        .group_by(User.id, User.username)
-        .order_by(func.count(Decision.id).desc())
-        .limit(10)
-    ).all()
+async def get_leaderboard(
+    request: Request,
+    response: Response,
+    metric: str = "decisions",  # decisions, votes_received or votes_cast
+    window: str = "all",  # day, week or all
+    limit: int = 10,
+    offset: int = 0,
+    session: AsyncSession = Depends(get_async_session)
+):
+    # Ranked in memory; only the usernames for this page come from the database
+    _validate(metric, window)
+
+    entries = leaderboards.top(metric, window, min(limit, 100), offset)
+
+    # The ranked page is its own validator (usernames never change); boards are
+    # only periodically reconciled across workers anyway, so allow brief reuse
+    cached = not_modified(request, response, etag=make_etag("leaderboard", metric, entries), cache_control="public, max-age=10")
+    if cached:
+        return cached
+
+    user_ids = [user_id for _, user_id, _ in entries]
+    usernames = dict((await session.exec(
+        select(User.id, User.username).where(User.id.in_(user_ids))
+    )).all()) if user_ids else {}
 
     return [
         {
-            "rank": i + 1,
-            "user_id": item.id,
-            "username": item.username,
-            "decisions_count": item.decisions_count
+            "rank": rank,
+            "user_id": user_id,
+            "username": usernames.get(user_id),
+            f"{metric}_count": score
         }
-        for i, item in enumerate(leaderboard)
+        for rank, user_id, score in entries
     ]
+
+@router.get("/leaderboard/rank/{user_id}")
+async def get_leaderboard_rank(user_id: int, metric: str = "decisions", window: str = "all"):
+    """A single user's position on any leaderboard, not just the top 10"""
+    _validate(metric, window)
+    rank, score, ranked_users = leaderboards.rank(metric, window, user_id)
+    return {
+        "user_id": user_id,
+        "metric": metric,
+        "window": window,
+        "rank": rank,
+        f"{metric}_count": score,
+        "ranked_users": ranked_users
+    }
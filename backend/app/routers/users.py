@@ -1,14 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session, select, func
-from app.database import get_session
+from sqlmodel import select, func, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_session
 from app.models import User, Decision, Follow, Vote
-from app.services.gemini import predict_personality, analyze_life_areas
+from app.services.analysis_cache import get_analysis, load_decision_texts
+from app.services.hydration import hydrate_decisions
+from app.services.timelines import timelines
+from app.pagination import paginate, page_response
+from app.http_cache import make_etag, not_modified
+from app.batching import parse_ids
+from app.schemas import DecisionItem, DecisionPage, UserBatch, UserProfile, UserPublic, UserSummary
 from app.auth import (
-    get_password_hash, authenticate_user, create_access_token,
-    get_current_user, get_current_user_optional
+    get_password_hash_async, authenticate_user_async, create_access_token,
+    get_current_user, get_current_user_optional, invalidate_cached_user
 )
-from typing import Optional, List
+from typing import Optional, List, Union
+from datetime import datetime
 from pydantic import BaseModel, EmailStr
 
 router = APIRouter()
@@ -36,20 +44,20 @@ class UserResponse(BaseModel):
     created_at: str
 
 @router.post("/auth/register", response_model=UserResponse)
-async def register_user(user_data: UserCreate, session: Session = Depends(get_session)):
+async def register_user(user_data: UserCreate, session: AsyncSession = Depends(get_async_session)):
     """Register a new user with email and password."""
     # Check if username already exists
-    existing_user = session.exec(select(User).where(User.username == user_data.username)).first()
+    existing_user = (await session.exec(select(User).where(User.username == user_data.username))).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already taken")
 
     # Check if email already exists
-    existing_email = session.exec(select(User).where(User.email == user_data.email)).first()
+    existing_email = (await session.exec(select(User).where(User.email == user_data.email))).first()
     if existing_email:
         raise HTTPException(status_code=400, detail="Email already registered")
 
     # Create user with hashed password
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     user = User(
         username=user_data.username,
         email=user_data.email,
@@ -57,8 +65,8 @@ async def register_user(user_data: UserCreate, session: Session = Depends(get_se
     )
 
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
     return UserResponse(
         id=user.id,
         username=user.username,
@@ -69,16 +77,16 @@ async def register_user(user_data: UserCreate, session: Session = Depends(get_se
     )
 
 @router.post("/auth/login", response_model=Token)
-async def login_user(credentials: UserLogin, session: Session = Depends(get_session)):
+async def login_user(credentials: UserLogin, session: AsyncSession = Depends(get_async_session)):
     """Login user and return JWT token."""
-    user = authenticate_user(session, credentials.username, credentials.password)
+    user = await authenticate_user_async(session, credentials.username, credentials.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username/email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = create_access_token(data={"sub": user.username})
+    access_token = create_access_token(data={"sub": user.username, "uid": user.id})
     return Token(access_token=access_token, token_type="bearer")
 
 @router.get("/auth/me", response_model=UserResponse)
@@ -98,217 +106,245 @@ async def update_user_profile(
     bio: Optional[str] = None,
     avatar_url: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Update current user's profile."""
+    # current_user belongs to the auth dependency's session; edit this session's copy
+    user = await session.get(User, current_user.id)
     if bio is not None:
-        current_user.bio = bio
+        user.bio = bio
     if avatar_url is not None:
-        current_user.avatar_url = avatar_url
+        user.avatar_url = avatar_url
+    user.updated_at = datetime.utcnow()
 
-    session.commit()
-    session.refresh(current_user)
+    await session.commit()
+    invalidate_cached_user(user)
     return {"message": "Profile updated successfully"}
 
 # Legacy endpoint for backward compatibility (creates user without password - NOT SECURE)
 @router.post("/users/")
-async def create_user_legacy(user: User, session: Session = Depends(get_session)):
+async def create_user_legacy(user: User, session: AsyncSession = Depends(get_async_session)):
     raise HTTPException(
         status_code=410,
         detail="This endpoint is deprecated. Use /auth/register instead."
     )
 
-@router.get("/users/{user_id}")
-async def get_user(user_id: int, session: Session = Depends(get_session)):
-    user = session.get(User, user_id)
+@router.get("/users/batch", response_model=UserBatch)
+async def get_users_batch(
+    request: Request,
+    response: Response,
+    ids: str = Query(..., description="Comma-separated user ids"),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Public profiles for many users in one query; unknown ids are listed in missing"""
+    user_ids = parse_ids(ids)
+    users = {}
+    if user_ids:
+        users = {user.id: user for user in (await session.exec(select(User).where(User.id.in_(user_ids)))).all()}
+
+    # Same version as GET /users/{user_id}; a missing id versions as None
+    versions = {user_id: (user.updated_at or user.created_at).isoformat() for user_id, user in users.items()}
+    etag = make_etag("users", *((user_id, versions.get(user_id)) for user_id in user_ids))
+    cached = not_modified(request, response, etag=etag, cache_control="no-cache")
+    if cached:
+        return cached
+
+    return UserBatch(
+        items={user_id: UserPublic.model_validate(users[user_id]) for user_id in user_ids if user_id in users},
+        missing=[user_id for user_id in user_ids if user_id not in users]
+    )
+
+@router.get("/users/{user_id}", response_model=UserProfile)
+async def get_user(
+    user_id: int,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_async_session)
+):
+    user = await session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+
+    # updated_at covers the profile fields and the counts below, so a
+    # revalidation skips the count queries
+    modified = user.updated_at or user.created_at
+    cached = not_modified(
+        request, response,
+        etag=make_etag("user", user_id, modified.isoformat()),
+        last_modified=modified,
+        cache_control="no-cache"
+    )
+    if cached:
+        return cached
     
     # Get stats
-    decisions_count = session.exec(
+    decisions_count = (await session.exec(
         select(func.count(Decision.id)).where(Decision.user_id == user_id)
-    ).first() or 0
+    )).first() or 0
     
-    followers_count = session.exec(
+    followers_count = (await session.exec(
         select(func.count(Follow.id)).where(Follow.following_id == user_id)
-    ).first() or 0
+    )).first() or 0
     
-    following_count = session.exec(
+    following_count = (await session.exec(
         select(func.count(Follow.id)).where(Follow.follower_id == user_id)
-    ).first() or 0
+    )).first() or 0
     
-    return {
-        **user.dict(),
-        "decisions_count": decisions_count,
-        "followers_count": followers_count,
-        "following_count": following_count
-    }
-
-@router.get("/users/")
-async def search_users(q: Optional[str] = Query(None, description="Search query"), session: Session = Depends(get_session)):
+    return UserProfile(
+        **UserPublic.model_validate(user).model_dump(),
+        decisions_count=decisions_count,
+        followers_count=followers_count,
+        following_count=following_count
+    )
+
+@router.get("/users/", response_model=List[UserPublic])
+async def search_users(q: Optional[str] = Query(None, description="Search query"), session: AsyncSession = Depends(get_async_session)):
     """Search users by username"""
     if not q:
         # Return all users if no query
-        users = session.exec(select(User).limit(50)).all()
+        users = (await session.exec(select(User).limit(50))).all()
         return users
     
     # Search users by username
-    users = session.exec(
+    users = (await session.exec(
         select(User).where(User.username.ilike(f"%{q}%")).limit(20)
-    ).all()
+    )).all()
     return users
 
 @router.post("/users/{follower_id}/follow/{following_id}")
-async def follow_user(follower_id: int, following_id: int, session: Session = Depends(get_session)):
+async def follow_user(follower_id: int, following_id: int, session: AsyncSession = Depends(get_async_session)):
     if follower_id == following_id:
         raise HTTPException(status_code=400, detail="Cannot follow yourself")
     
     # Check if users exist
-    follower = session.get(User, follower_id)
-    following = session.get(User, following_id)
+    follower = await session.get(User, follower_id)
+    following = await session.get(User, following_id)
     if not follower or not following:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Check if already following
-    existing_follow = session.exec(
+    existing_follow = (await session.exec(
         select(Follow).where(
             Follow.follower_id == follower_id,
             Follow.following_id == following_id
         )
-    ).first()
+    )).first()
     
     if existing_follow:
         raise HTTPException(status_code=400, detail="Already following this user")
     
     follow = Follow(follower_id=follower_id, following_id=following_id)
     session.add(follow)
-    session.commit()
-    session.refresh(follow)
+    # Both profiles' follow counts change
+    follower.updated_at = following.updated_at = datetime.utcnow()
+    await session.flush()
+    # Seed the follower's timeline with the author's recent decisions
+    await session.run_sync(timelines.backfill, following_id, follower_id)
+    await session.commit()
+    await session.refresh(follow)
     return follow
 
 @router.delete("/users/{follower_id}/follow/{following_id}")
-async def unfollow_user(follower_id: int, following_id: int, session: Session = Depends(get_session)):
-    follow = session.exec(
+async def unfollow_user(follower_id: int, following_id: int, session: AsyncSession = Depends(get_async_session)):
+    follow = (await session.exec(
         select(Follow).where(
             Follow.follower_id == follower_id,
             Follow.following_id == following_id
         )
-    ).first()
+    )).first()
     
     if not follow:
         raise HTTPException(status_code=404, detail="Not following this user")
     
-    session.delete(follow)
-    session.commit()
+    await session.delete(follow)
+    await session.exec(
+        update(User).where(User.id.in_([follower_id, following_id])).values(updated_at=datetime.utcnow())
+    )
+    await session.run_sync(timelines.remove, follower_id, following_id)
+    await session.commit()
     return {"message": "Unfollowed successfully"}
 
-@router.get("/users/{user_id}/following")
-async def get_following(user_id: int, session: Session = Depends(get_session)):
+@router.get("/users/{user_id}/following", response_model=List[UserPublic])
+async def get_following(user_id: int, session: AsyncSession = Depends(get_async_session)):
     """Get users that this user is following"""
-    follows = session.exec(
+    follows = (await session.exec(
         select(Follow).where(Follow.follower_id == user_id)
-    ).all()
+    )).all()
     
     following_ids = [f.following_id for f in follows]
-    users = session.exec(
+    users = (await session.exec(
         select(User).where(User.id.in_(following_ids))
-    ).all()
+    )).all()
     return users
 
-@router.get("/users/{user_id}/followers")
-async def get_followers(user_id: int, session: Session = Depends(get_session)):
+@router.get("/users/{user_id}/followers", response_model=List[UserPublic])
+async def get_followers(user_id: int, session: AsyncSession = Depends(get_async_session)):
     """Get users following this user"""
-    follows = session.exec(
+    follows = (await session.exec(
         select(Follow).where(Follow.following_id == user_id)
-    ).all()
+    )).all()
     
     follower_ids = [f.follower_id for f in follows]
-    users = session.exec(
+    users = (await session.exec(
         select(User).where(User.id.in_(follower_ids))
-    ).all()
+    )).all()
     return users
 
-@router.get("/users/{user_id}/decisions")
-async def get_user_decisions(user_id: int, limit: int = 20, offset: int = 0, session: Session = Depends(get_session)):
+@router.get("/users/{user_id}/decisions", response_model=Union[List[DecisionItem], DecisionPage])
+async def get_user_decisions(
+    user_id: int,
+    limit: int = 20,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_async_session)
+):
     """Get decisions by a specific user with vote counts and user data"""
-    decisions = session.exec(
-        select(Decision)
-        .where(Decision.user_id == user_id)
-        .order_by(Decision.created_at.desc())
-        .limit(limit)
-        .offset(offset)
-    ).all()
+    decisions, next_cursor = await session.run_sync(
+        paginate, select(Decision).where(Decision.user_id == user_id), Decision, limit, offset, cursor
+    )
 
     # Get the user data (all decisions belong to the same user)
-    user = session.get(User, user_id)
+    user = await session.get(User, user_id)
+    authors = {user_id: UserSummary.model_validate(user)} if user else {}
 
     # Enrich with vote counts and user data
-    result = []
-    for decision in decisions:
-        option_a_count = session.exec(
-            select(func.count(Vote.id)).where(
-                Vote.decision_id == decision.id,
-                Vote.choice == "option_a"
-            )
-        ).first() or 0
-        option_b_count = session.exec(
-            select(func.count(Vote.id)).where(
-                Vote.decision_id == decision.id,
-                Vote.choice == "option_b"
-            )
-        ).first() or 0
-
-        result.append({
-            **decision.dict(),
-            "user": user.dict() if user else None,
-            "vote_counts": {
-                "option_a": option_a_count,
-                "option_b": option_b_count
-            }
-        })
-
-    return result
+    items = await session.run_sync(hydrate_decisions, decisions, authors)
+    return page_response(items, next_cursor, cursor)
 
 @router.get("/users/{user_id}/personality")
-async def get_user_personality(user_id: int, session: Session = Depends(get_session)):
-    user = session.get(User, user_id)
+async def get_user_personality(user_id: int, session: AsyncSession = Depends(get_async_session)):
+    user = await session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Get all decisions by this user
-    decisions = session.exec(select(Decision).where(Decision.user_id == user_id)).all()
+    # Get all decision texts by this user, oldest first
+    decision_texts = await session.run_sync(load_decision_texts, user_id)
 
-    if not decisions:
+    if not decision_texts:
         return {"personality_report": "Not enough data - post some decisions first!"}
 
-    # Compile decision texts
-    decision_texts = [d.content for d in decisions]
-
-    # Get AI personality analysis
+    # Get the latest stored AI personality analysis; refreshes run in the background
     try:
-        personality_report = await predict_personality(decision_texts)
-        return {"personality_report": personality_report}
+        personality_report, status = await get_analysis(session, user_id, "personality", decision_texts)
+        return {"personality_report": personality_report, "analysis_status": status}
     except Exception as e:
         print(f"Personality AI Error: {e}")
         return {"personality_report": "AI analysis unavailable"}
 
 @router.get("/users/{user_id}/life-areas")
-async def get_user_life_areas(user_id: int, session: Session = Depends(get_session)):
+async def get_user_life_areas(user_id: int, session: AsyncSession = Depends(get_async_session)):
     """Get AI-powered life area analysis and personalized recommendations."""
-    user = session.get(User, user_id)
+    user = await session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Get all decisions by this user
-    decisions = session.exec(select(Decision).where(Decision.user_id == user_id)).all()
-
-    # Compile decision texts
-    decision_texts = [d.content for d in decisions]
+    # Get all decision texts by this user, oldest first
+    decision_texts = await session.run_sync(load_decision_texts, user_id)
 
-    # Get AI life areas analysis
+    # Get the latest stored AI life areas analysis; refreshes run in the background
     try:
-        analysis = await analyze_life_areas(decision_texts)
-        return analysis
+        analysis, status = await get_analysis(session, user_id, "life_areas", decision_texts)
+        return {**analysis, "analysis_status": status}
     except Exception as e:
         print(f"Life Areas AI Error: {e}")
         return {
@@ -1,38 +1,196 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select, func
-from app.database import get_session
+import asyncio
+import json
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_session
 from app.models import Vote, Decision
+from app.services.tallies import CHOICE_COLUMNS, cast_vote, find_vote_counts, vote_count_delta, get_vote_counts as get_stored_vote_counts
+from app.services.vote_buffer import vote_buffer, VoteBufferFull
+from app.services.leaderboards import leaderboards
+from app.services.live_counts import vote_hub
+from app.http_cache import make_etag, not_modified
+from app.batching import parse_ids
+from app.schemas import VoteCountsBatch
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 @router.post("/votes/")
-async def create_vote(vote: Vote, session: Session = Depends(get_session)):
-    # Check if user already voted on this decision
-    existing_vote = session.exec(
-        select(Vote).where(Vote.user_id == vote.user_id, Vote.decision_id == vote.decision_id)
-    ).first()
+async def create_vote(vote: Vote, session: AsyncSession = Depends(get_async_session)):
+    if vote.choice not in CHOICE_COLUMNS:
+        raise HTTPException(status_code=400, detail="Invalid vote choice")
+
+    if vote_buffer.enabled:
+        return await _submit_buffered_vote(vote, session)
+
+    # Same check as the buffered path; the vote table doesn't enforce it on SQLite
+    if not await session.get(Decision, vote.decision_id):
+        raise HTTPException(status_code=404, detail="Decision not found")
+
+    # A first vote inserts, a different option changes the vote
+    result = await session.run_sync(cast_vote, vote.user_id, vote.decision_id, vote.choice)
+    if result is None:
+        raise HTTPException(status_code=400, detail="User already voted on this decision")
 
-    if existing_vote:
+    await session.commit()
+    stored_vote, previous_column = result
+    vote_hub.publish(vote.decision_id, vote_count_delta(vote.choice, previous_column))
+    if previous_column is None:
+        leaderboards.record_vote(vote.user_id, vote.decision_id, stored_vote.id)
+    return stored_vote
+
+async def _submit_buffered_vote(vote: Vote, session: AsyncSession):
+    # Same checks as the direct path, against the newest of pending and stored vote
+    has_pending, previous_column = vote_buffer.pending_column(vote.user_id, vote.decision_id)
+    if not has_pending:
+        stored_choice = (await session.exec(
+            select(Vote.choice).where(Vote.user_id == vote.user_id, Vote.decision_id == vote.decision_id)
+        )).first()
+        previous_column = CHOICE_COLUMNS.get(stored_choice) if stored_choice else None
+    if previous_column == CHOICE_COLUMNS[vote.choice]:
         raise HTTPException(status_code=400, detail="User already voted on this decision")
+    if not has_pending:
+        decision = await session.get(Decision, vote.decision_id)
+        if not decision:
+            raise HTTPException(status_code=404, detail="Decision not found")
+    # Release the read connection before waiting on a batch
+    await session.close()
+
+    try:
+        written = vote_buffer.submit(vote.user_id, vote.decision_id, vote.choice, previous_column)
+    except VoteBufferFull:
+        raise HTTPException(status_code=503, detail="Too many votes in flight, retry shortly", headers={"Retry-After": "1"})
+    # Counts served from here on include the queued vote, so push it now
+    vote_hub.publish(vote.decision_id, vote_count_delta(vote.choice, previous_column))
+
+    if vote_buffer.mode == "queued":
+        return JSONResponse(status_code=202, content={
+            "status": "queued",
+            "user_id": vote.user_id,
+            "decision_id": vote.decision_id,
+            "choice": vote.choice
+        })
+
+    try:
+        stored_vote = await written
+    except Exception:
+        logger.exception("Buffered vote write failed")
+        raise HTTPException(status_code=503, detail="Vote could not be recorded, please retry")
+    return stored_vote if stored_vote is not None else vote
+
+@router.get("/votes/counts", response_model=VoteCountsBatch)
+async def get_vote_counts_batch(
+    request: Request,
+    response: Response,
+    ids: str = Query(..., description="Comma-separated decision ids"),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Vote counts for many decisions in one query; unknown ids are listed in missing"""
+    decision_ids = parse_ids(ids)
+    counts = vote_buffer.overlay_counts(await session.run_sync(find_vote_counts, decision_ids))
 
-    session.add(vote)
-    session.commit()
-    session.refresh(vote)
-    return vote
+    # Like GET /votes/{decision_id}: the counts are the version
+    etag = make_etag("votes", *((decision_id, counts.get(decision_id)) for decision_id in decision_ids))
+    cached = not_modified(request, response, etag=etag, cache_control="no-cache")
+    if cached:
+        return cached
+
+    return VoteCountsBatch(
+        items={decision_id: counts[decision_id] for decision_id in decision_ids if decision_id in counts},
+        missing=[decision_id for decision_id in decision_ids if decision_id not in counts]
+    )
 
 @router.get("/votes/{decision_id}")
-async def get_vote_counts(decision_id: int, session: Session = Depends(get_session)):
-    # Get counts for option_a and option_b
-    option_a_count = session.exec(
-        select(func.count(Vote.id)).where(Vote.decision_id == decision_id, Vote.choice == "option_a")
-    ).first()
+async def get_vote_counts(
+    decision_id: int,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_async_session)
+):
+    # Read the materialized tally instead of counting votes
+    counts = await session.run_sync(get_stored_vote_counts, decision_id)
+    # Include votes still waiting in the write buffer
+    vote_buffer.overlay_counts({decision_id: counts})
 
-    option_b_count = session.exec(
-        select(func.count(Vote.id)).where(Vote.decision_id == decision_id, Vote.choice == "option_b")
-    ).first()
+    # The counts are their own version; polls revalidate every time
+    etag = make_etag("votes", decision_id, counts["option_a"], counts["option_b"], counts["total"])
+    cached = not_modified(request, response, etag=etag, cache_control="no-cache")
+    if cached:
+        return cached
 
     return {
         "decision_id": decision_id,
-        "option_a": option_a_count or 0,
-        "option_b": option_b_count or 0
+        "option_a": counts["option_a"],
+        "option_b": counts["option_b"]
     }
+
+def _counts_message(counts: dict) -> dict:
+    return {"type": "counts", "counts": {str(decision_id): value for decision_id, value in counts.items()}}
+
+@router.websocket("/votes/live")
+async def vote_counts_socket(websocket: WebSocket):
+    """
+    Live vote counts for any number of decisions over one connection.
+
+    Send {"subscribe": [ids]} / {"unsubscribe": [ids]}; receive
+    {"type": "counts", "counts": {id: {option_a, option_b, total}}} with the
+    current counts on subscribe and then at most one update per tick.
+    """
+    await websocket.accept()
+    subscription = vote_hub.subscribe()
+
+    async def send_updates():
+        while True:
+            await websocket.send_json(_counts_message(await subscription.next_update()))
+
+    sender = asyncio.create_task(send_updates())
+    try:
+        while True:
+            message = await websocket.receive_json()
+            try:
+                subscribe = [int(i) for i in message.get("subscribe", [])]
+                unsubscribe = [int(i) for i in message.get("unsubscribe", [])]
+            except (AttributeError, TypeError, ValueError):
+                await websocket.send_json({"type": "error", "detail": "Expected {\"subscribe\": [ids]} or {\"unsubscribe\": [ids]}"})
+                continue
+            vote_hub.remove(subscription, unsubscribe)
+            requested = set(subscribe) - subscription.decision_ids
+            added = await vote_hub.add(subscription, subscribe)
+            if len(added) < len(requested):
+                await websocket.send_json({
+                    "type": "error",
+                    "detail": f"At most {vote_hub.max_subscriptions} decisions per connection"
+                })
+    except (WebSocketDisconnect, ValueError):
+        # ValueError: a frame that isn't JSON; drop the connection
+        pass
+    finally:
+        sender.cancel()
+        vote_hub.close(subscription)
+
+@router.get("/votes/live/stream")
+async def vote_counts_stream(ids: str = Query(..., description="Comma-separated decision ids")):
+    """Server-Sent Events version of /votes/live for a fixed set of decisions"""
+    decision_ids = parse_ids(ids, limit=vote_hub.max_subscriptions)
+
+    subscription = vote_hub.subscribe()
+    await vote_hub.add(subscription, decision_ids)
+
+    async def events():
+        try:
+            while True:
+                try:
+                    counts = await asyncio.wait_for(subscription.next_update(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Keep proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: counts\ndata: {json.dumps(_counts_message(counts)['counts'])}\n\n"
+        finally:
+            vote_hub.close(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
@@ -0,0 +1,87 @@
+"""
+Typed response schemas for the hot read paths (feed items, comments, profiles).
+
+They carry only what clients render, so password hashes and emails never
+leave the server in feeds, and FastAPI serializes them in pydantic-core
+instead of walking plain dicts with jsonable_encoder.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+from pydantic import BaseModel, ConfigDict
+
+
+class UserSummary(BaseModel):
+    """Author embedded in feed items and comments."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    username: str
+    avatar_url: Optional[str] = None
+
+
+class UserPublic(UserSummary):
+    """A user in search results and follower lists."""
+    bio: Optional[str] = None
+    created_at: datetime
+
+
+class UserProfile(UserPublic):
+    decisions_count: int
+    followers_count: int
+    following_count: int
+
+
+class VoteCounts(BaseModel):
+    option_a: int
+    option_b: int
+    total: int
+
+
+class VoteCountsBatch(BaseModel):
+    items: Dict[int, VoteCounts]  # Keyed by decision id
+    missing: List[int]  # Requested ids with no such decision
+
+
+class UserBatch(BaseModel):
+    items: Dict[int, UserPublic]  # Keyed by user id
+    missing: List[int]
+
+
+class DecisionItem(BaseModel):
+    id: int
+    user_id: int
+    content: str
+    option_a: str
+    option_b: str
+    created_at: datetime
+    user: Optional[UserSummary] = None
+    vote_counts: VoteCounts
+
+
+class SearchResultItem(DecisionItem):
+    snippet: str  # Content with the matched terms highlighted
+
+
+class DecisionPage(BaseModel):
+    items: List[Union[SearchResultItem, DecisionItem]]
+    next_cursor: Optional[str] = None
+
+
+# Search results first: a union picks the first member that matches exactly,
+# so plain feed items don't get validated as search results
+FeedResponse = Union[List[SearchResultItem], List[DecisionItem], DecisionPage]
+
+
+class CommentItem(BaseModel):
+    id: int
+    user_id: int
+    decision_id: int
+    content: str
+    created_at: datetime
+    user: Optional[UserSummary] = None
+
+
+class CommentPage(BaseModel):
+    items: List[CommentItem]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,153 @@
+"""
+Persistent, content-addressed store for per-user AI analyses, refreshed in the
+background so profile views never wait on Gemini once a result exists.
+"""
+import asyncio
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import AnalysisCache, Decision
+from app.services import gemini
+from app.services.history import build_decision_history
+from app.services.jobs import job_queue
+
+ANALYSIS_KINDS = ("personality", "life_areas")
+
+
+def load_decision_texts(session: Session, user_id: int) -> List[str]:
+    """A user's decision texts in posting order, so the hash is stable."""
+    return list(session.exec(
+        select(Decision.content)
+        .where(Decision.user_id == user_id)
+        .order_by(Decision.created_at, Decision.id)
+    ).all())
+
+
+def decision_texts_hash(decision_texts: List[str]) -> str:
+    return hashlib.sha256(json.dumps(decision_texts).encode()).hexdigest()
+
+
+def _is_cacheable(kind: str, result: Any) -> bool:
+    # Never persist placeholder output; it would outlive the outage or missing key
+    if not gemini.GEMINI_API_KEY:
+        return False
+    if kind == "personality":
+        return result != gemini.PERSONALITY_FALLBACK
+    return gemini.LIFE_AREAS_FALLBACK not in result.get("recommendations", {}).values()
+
+
+def get_latest_analysis(session: Session, user_id: int, kind: str) -> Optional[AnalysisCache]:
+    return session.exec(
+        select(AnalysisCache)
+        .where(AnalysisCache.user_id == user_id, AnalysisCache.kind == kind)
+        .order_by(AnalysisCache.created_at.desc(), AnalysisCache.id.desc())
+    ).first()
+
+
+def store_analysis(session: Session, user_id: int, kind: str, content_hash: str, result: Any) -> None:
+    """Store a result and drop the user's older entries of the same kind."""
+    session.exec(
+        delete(AnalysisCache).where(
+            AnalysisCache.user_id == user_id,
+            AnalysisCache.kind == kind
+        )
+    )
+    session.add(AnalysisCache(
+        user_id=user_id,
+        kind=kind,
+        content_hash=content_hash,
+        result=json.dumps(result)
+    ))
+    try:
+        session.commit()
+    except IntegrityError:
+        # A concurrent refresh stored the same analysis first
+        session.rollback()
+
+
+async def run_analysis(user_id: int, kind: str) -> Any:
+    """Call Gemini with the user's token-bounded history (recent decisions + summary)."""
+    recent_texts, history_summary = await build_decision_history(user_id)
+    if kind == "personality":
+        return await gemini.predict_personality(recent_texts, history_summary)
+    return await gemini.analyze_life_areas(recent_texts, history_summary)
+
+
+async def refresh_analysis(user_id: int, kind: str) -> Any:
+    """
+    Job body: recompute one analysis for the user's current decisions.
+
+    Uses its own sessions since it runs outside any request: one to read the
+    inputs and one to store the result, none held while Gemini runs.
+    """
+    from app.database import async_engine
+
+    async with AsyncSession(async_engine) as session:
+        decision_texts = await session.run_sync(load_decision_texts, user_id)
+        latest = await session.run_sync(get_latest_analysis, user_id, kind)
+    content_hash = decision_texts_hash(decision_texts)
+    if latest and latest.content_hash == content_hash:
+        return json.loads(latest.result)
+
+    result = await run_analysis(user_id, kind)
+
+    if _is_cacheable(kind, result):
+        async with AsyncSession(async_engine) as session:
+            await session.run_sync(store_analysis, user_id, kind, content_hash, result)
+    return result
+
+
+def enqueue_refresh(user_id: int, kinds: Tuple[str, ...] = ANALYSIS_KINDS) -> None:
+    """Queue background refreshes of a user's analyses (e.g. after a new decision)."""
+    for kind in kinds:
+        job_queue.enqueue(("analysis", user_id, kind), lambda kind=kind: refresh_analysis(user_id, kind))
+
+
+async def get_analysis(
+    session: AsyncSession,
+    user_id: int,
+    kind: str,
+    decision_texts: List[str]
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Return the latest stored analysis without waiting on Gemini when possible.
+
+    A stale result (decisions changed since it was computed) is returned as-is
+    while a refresh runs in the background. Only a user with no stored result
+    at all waits for the first computation.
+
+    Returns:
+        The analysis and a metadata dict with "status" ("fresh", "refreshing"
+        or "unavailable"), "fresh" and "computed_at"
+    """
+    content_hash = decision_texts_hash(decision_texts)
+    latest = await session.run_sync(get_latest_analysis, user_id, kind)
+    key = ("analysis", user_id, kind)
+
+    if latest is not None:
+        fresh = latest.content_hash == content_hash
+        if not fresh:
+            job_queue.enqueue(key, lambda: refresh_analysis(user_id, kind))
+        return json.loads(latest.result), {
+            "status": "fresh" if fresh else "refreshing",
+            "fresh": fresh,
+            "computed_at": latest.created_at.isoformat()
+        }
+
+    future = job_queue.enqueue(key, lambda: refresh_analysis(user_id, kind))
+    if future is not None:
+        result = await asyncio.shield(future)
+    else:
+        result = await refresh_analysis(user_id, kind)
+    stored = _is_cacheable(kind, result)
+    return result, {
+        "status": "fresh" if stored else "unavailable",
+        "fresh": stored,
+        "computed_at": datetime.utcnow().isoformat() if stored else None
+    }
@@ -5,7 +5,9 @@ import google.generativeai as genai
 import os
 import json
 import logging
-from typing import Dict, List
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from app.services.gemini_client import gemini_client
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,6 +20,89 @@ if not GEMINI_API_KEY:
 else:
     genai.configure(api_key=GEMINI_API_KEY)
 
+# Returned when the model call fails, so callers can avoid caching them
+CONSENSUS_FALLBACK = "Unable to generate consensus analysis at this time. Please try again later."
+PERSONALITY_FALLBACK = "Unable to generate personality analysis at this time. Please try again later."
+LIFE_AREAS_FALLBACK = "Unable to generate personalized recommendation at this time."
+
+
+CONSEQUENCE_KEYS = ("good", "bad", "weird")
+
+CONSEQUENCES_NO_KEY = {
+    "good": "AI predictions unavailable (API key not configured)",
+    "bad": "AI predictions unavailable (API key not configured)",
+    "weird": "AI predictions unavailable (API key not configured)"
+}
+CONSEQUENCES_INVALID = {
+    "good": "AI couldn't generate a valid prediction",
+    "bad": "AI couldn't generate a valid prediction",
+    "weird": "AI couldn't generate a valid prediction"
+}
+CONSEQUENCES_FALLBACK = {
+    "good": "Unexpected outcome awaits",
+    "bad": "There may be unforeseen challenges",
+    "weird": "Something unusual might happen"
+}
+
+
+def _consequences_prompt(decision_text: str) -> str:
+    return f"""
+        A user is considering this decision: "{decision_text}".
+        Predict 3 consequences: 1 good, 1 bad, and 1 weird/bizarre.
+        Return ONLY a raw JSON object (no markdown, no code blocks) with keys: "good", "bad", "weird".
+        Each value should be a single sentence.
+        """
+
+
+def _parse_consequences(response_text: str) -> Dict[str, str]:
+    # Clean response text
+    text = response_text.strip()
+    text = text.replace('```json', '').replace('```', '').strip()
+
+    # Parse JSON
+    predictions = json.loads(text)
+
+    # Validate response has required keys
+    if all(key in predictions for key in CONSEQUENCE_KEYS):
+        return predictions
+    else:
+        raise ValueError("AI response missing required keys")
+
+
+def _partial_json_string(text: str, key: str) -> Optional[Tuple[str, bool]]:
+    """
+    Read the (possibly still incomplete) string value of key from partial JSON.
+
+    Returns:
+        (decoded value so far, whether the closing quote has arrived), or None
+        if the key's value hasn't started yet
+    """
+    match = re.search(r'"%s"\s*:\s*"' % re.escape(key), text)
+    if not match:
+        return None
+
+    raw = []
+    i = match.end()
+    while i < len(text):
+        char = text[i]
+        if char == "\\":
+            if i + 1 >= len(text):
+                break
+            escape_len = 6 if text[i + 1] == "u" else 2
+            if i + escape_len > len(text):
+                break
+            # A high surrogate is only decodable together with the low one after it
+            if escape_len == 6 and "d800" <= text[i + 2:i + 6].lower() <= "dbff" and i + 12 > len(text):
+                break
+            raw.append(text[i:i + escape_len])
+            i += escape_len
+            continue
+        if char == '"':
+            return json.loads('"' + "".join(raw) + '"'), True
+        raw.append(char)
+        i += 1
+    return json.loads('"' + "".join(raw) + '"'), False
+
 
 async def predict_consequences(decision_text: str) -> Dict[str, str]:
     """
@@ -30,60 +115,84 @@ async def predict_consequences(decision_text: str) -> Dict[str, str]:
         Dictionary with 'good', 'bad', and 'weird' consequence predictions
     """
     if not GEMINI_API_KEY:
-        return {
-            "good": "AI predictions unavailable (API key not configured)",
-            "bad": "AI predictions unavailable (API key not configured)",
-            "weird": "AI predictions unavailable (API key not configured)"
-        }
+        return dict(CONSEQUENCES_NO_KEY)
     
     try:
-        model = genai.GenerativeModel('gemini-3-flash-preview')
-        
-        prompt = f"""
-        A user is considering this decision: "{decision_text}".
-        Predict 3 consequences: 1 good, 1 bad, and 1 weird/bizarre.
-        Return ONLY a raw JSON object (no markdown, no code blocks) with keys: "good", "bad", "weird".
-        Each value should be a single sentence.
-        """
-        
-        response = await model.generate_content_async(prompt)
-        
-        # Clean response text
-        text = response.text.strip()
-        text = text.replace('```json', '').replace('```', '').strip()
-        
-        # Parse JSON
-        predictions = json.loads(text)
-        
-        # Validate response has required keys
-        required_keys = ['good', 'bad', 'weird']
-        if all(key in predictions for key in required_keys):
-            return predictions
-        else:
-            raise ValueError("AI response missing required keys")
+        response_text = await gemini_client.generate(_consequences_prompt(decision_text))
+        return _parse_consequences(response_text)
             
     except json.JSONDecodeError as e:
         logger.error(f"JSON parsing error in predict_consequences: {e}")
-        return {
-            "good": "AI couldn't generate a valid prediction",
-            "bad": "AI couldn't generate a valid prediction", 
-            "weird": "AI couldn't generate a valid prediction"
-        }
+        return dict(CONSEQUENCES_INVALID)
     except Exception as e:
         logger.error(f"Error in predict_consequences: {e}")
-        return {
-            "good": "Unexpected outcome awaits",
-            "bad": "There may be unforeseen challenges",
-            "weird": "Something unusual might happen"
-        }
+        return dict(CONSEQUENCES_FALLBACK)
 
 
-async def predict_personality(decision_texts: List[str]) -> str:
+async def stream_consequences(decision_text: str) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream consequence predictions while Gemini generates them.
+
+    Args:
+        decision_text: The decision text to analyze
+
+    Yields:
+        ("delta", {"field", "text", "complete"}) as each JSON string value grows,
+        then exactly one final ("result", predictions) on success or
+        ("fallback", predictions) when the model output couldn't be used
+    """
+    if not GEMINI_API_KEY:
+        yield "fallback", dict(CONSEQUENCES_NO_KEY)
+        return
+
+    buffer = ""
+    emitted = {key: 0 for key in CONSEQUENCE_KEYS}
+    completed = set()
+    try:
+        async for chunk in gemini_client.stream(_consequences_prompt(decision_text)):
+            buffer += chunk
+            for key in CONSEQUENCE_KEYS:
+                if key in completed:
+                    continue
+                partial = _partial_json_string(buffer, key)
+                if partial is None:
+                    continue
+                value, complete = partial
+                if len(value) > emitted[key] or complete:
+                    yield "delta", {"field": key, "text": value[emitted[key]:], "complete": complete}
+                    emitted[key] = len(value)
+                    if complete:
+                        completed.add(key)
+        predictions = _parse_consequences(buffer)
+    except json.JSONDecodeError as e:
+        logger.error(f"JSON parsing error in stream_consequences: {e}")
+        yield "fallback", dict(CONSEQUENCES_INVALID)
+        return
+    except Exception as e:
+        logger.error(f"Error in stream_consequences: {e}")
+        yield "fallback", dict(CONSEQUENCES_FALLBACK)
+        return
+
+    yield "result", predictions
+
+
+def _format_decision_history(decision_texts: List[str], history_summary: Optional[str]) -> str:
+    decisions_str = "\n".join(f"- {text}" for text in decision_texts)
+    if not history_summary:
+        return decisions_str
+    return (
+        f"Summary of their earlier decisions:\n{history_summary}\n\n"
+        f"Their most recent decisions:\n{decisions_str}"
+    )
+
+
+async def predict_personality(decision_texts: List[str], history_summary: Optional[str] = None) -> str:
     """
     Analyze a user's personality based on their decision-making patterns.
 
     Args:
         decision_texts: List of decision texts from the user
+        history_summary: Rolling summary of older decisions not listed in decision_texts
 
     Returns:
         Personality analysis as a string
@@ -95,9 +204,7 @@ async def predict_personality(decision_texts: List[str]) -> str:
         return "Not enough decisions to analyze personality."
 
     try:
-        model = genai.GenerativeModel('gemini-3-flash-preview')
-
-        decisions_str = "\n".join(f"- {text}" for text in decision_texts)
+        decisions_str = _format_decision_history(decision_texts, history_summary)
 
         prompt = f"""
         Analyze this user's decision-making patterns based on their posted decisions:
@@ -116,9 +223,9 @@ async def predict_personality(decision_texts: List[str]) -> str:
         Be constructive and insightful.
         """
 
-        response = await model.generate_content_async(prompt)
+        response_text = await gemini_client.generate(prompt)
 
-        personality_text = response.text.strip()
+        personality_text = response_text.strip()
 
         if personality_text:
             return personality_text
@@ -127,7 +234,53 @@ async def predict_personality(decision_texts: List[str]) -> str:
 
     except Exception as e:
         logger.error(f"Error in predict_personality: {e}")
-        return "Unable to generate personality analysis at this time. Please try again later."
+        return PERSONALITY_FALLBACK
+
+
+async def summarize_decisions(
+    previous_summary: Optional[str],
+    decision_texts: List[str],
+    max_words: int
+) -> Optional[str]:
+    """
+    Fold older decisions into a user's rolling decision-history summary.
+
+    Args:
+        previous_summary: The summary so far, if any
+        decision_texts: Decisions to fold in, oldest first
+        max_words: Upper bound on the summary length
+
+    Returns:
+        The updated summary, or None if it couldn't be generated
+    """
+    if not GEMINI_API_KEY or not decision_texts:
+        return None
+
+    try:
+        decisions_str = "\n".join(f"- {text}" for text in decision_texts)
+        previous_str = previous_summary or "(none yet)"
+
+        prompt = f"""
+        You maintain a running summary of one user's decision-making history.
+
+        Current summary:
+        {previous_str}
+
+        Newly added decisions:
+        {decisions_str}
+
+        Rewrite the summary so it also covers the new decisions. Keep recurring themes,
+        risk appetite, priorities and notable specific decisions.
+        Use at most {max_words} words of plain prose.
+        """
+
+        response_text = await gemini_client.generate(prompt)
+        summary = response_text.strip()
+        return summary or None
+
+    except Exception as e:
+        logger.error(f"Error in summarize_decisions: {e}")
+        return None
 
 
 async def generate_consensus_recommendation(
@@ -151,8 +304,6 @@ async def generate_consensus_recommendation(
         return "Not enough similar decisions to analyze consensus."
 
     try:
-        model = genai.GenerativeModel('gemini-3-flash-preview')
-
         # Format similar decisions with vote data
         similar_str = ""
         for i, decision in enumerate(similar_decisions[:10], 1):  # Limit to 10 for context
@@ -178,9 +329,9 @@ async def generate_consensus_recommendation(
         Be encouraging and constructive.
         """
 
-        response = await model.generate_content_async(prompt)
+        response_text = await gemini_client.generate(prompt)
 
-        recommendation = response.text.strip()
+        recommendation = response_text.strip()
 
         if recommendation:
             return recommendation
@@ -189,15 +340,16 @@ async def generate_consensus_recommendation(
 
     except Exception as e:
         logger.error(f"Error in generate_consensus_recommendation: {e}")
-        return "Unable to generate consensus analysis at this time. Please try again later."
+        return CONSENSUS_FALLBACK
 
 
-async def analyze_life_areas(decision_texts: List[str]) -> Dict[str, any]:
+async def analyze_life_areas(decision_texts: List[str], history_summary: Optional[str] = None) -> Dict[str, any]:
     """
     Analyze user's decisions to provide life area assessments and personalized recommendations.
 
     Args:
         decision_texts: List of decision texts from the user
+        history_summary: Rolling summary of older decisions not listed in decision_texts
 
     Returns:
         Dictionary with life area percentages and recommendations
@@ -235,9 +387,7 @@ async def analyze_life_areas(decision_texts: List[str]) -> Dict[str, any]:
         }
 
     try:
-        model = genai.GenerativeModel('gemini-3-flash-preview')
-
-        decisions_str = "\n".join(f"- {text}" for text in decision_texts)
+        decisions_str = _format_decision_history(decision_texts, history_summary)
 
         prompt = f"""
         Analyze this user's decision-making history and provide insights about four key life areas.
@@ -265,10 +415,10 @@ async def analyze_life_areas(decision_texts: List[str]) -> Dict[str, any]:
         For recommendations: Provide personalized, actionable advice for each area based on their decision patterns.
         """
 
-        response = await model.generate_content_async(prompt)
+        response_text = await gemini_client.generate(prompt)
 
         # Clean response text
-        text = response.text.strip()
+        text = response_text.strip()
         text = text.replace('```json', '').replace('```', '').strip()
 
         # Parse JSON
@@ -302,10 +452,10 @@ async def analyze_life_areas(decision_texts: List[str]) -> Dict[str, any]:
                 "personal_growth": 50
             },
             "recommendations": {
-                "career": "Unable to generate personalized recommendation at this time.",
-                "relationships": "Unable to generate personalized recommendation at this time.",
-                "future": "Unable to generate personalized recommendation at this time.",
-                "personal_growth": "Unable to generate personalized recommendation at this time."
+                "career": LIFE_AREAS_FALLBACK,
+                "relationships": LIFE_AREAS_FALLBACK,
+                "future": LIFE_AREAS_FALLBACK,
+                "personal_growth": LIFE_AREAS_FALLBACK
             }
         }
     except Exception as e:
@@ -318,9 +468,9 @@ async def analyze_life_areas(decision_texts: List[str]) -> Dict[str, any]:
                 "personal_growth": 50
             },
             "recommendations": {
-                "career": "Unable to generate personalized recommendation at this time.",
-                "relationships": "Unable to generate personalized recommendation at this time.",
-                "future": "Unable to generate personalized recommendation at this time.",
-                "personal_growth": "Unable to generate personalized recommendation at this time."
+                "career": LIFE_AREAS_FALLBACK,
+                "relationships": LIFE_AREAS_FALLBACK,
+                "future": LIFE_AREAS_FALLBACK,
+                "personal_growth": LIFE_AREAS_FALLBACK
             }
         }
@@ -0,0 +1,264 @@
+"""
+Shared Gemini client: reused model instances, bounded concurrency, per-call
+deadlines and a circuit breaker so upstream slowdowns fail fast.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import AsyncIterator, Dict, Optional
+
+import google.generativeai as genai
+
+logger = logging.getLogger(__name__)
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-3-flash-preview")
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "20"))
+GEMINI_BREAKER_FAILURES = int(os.getenv("GEMINI_BREAKER_FAILURES", "5"))
+GEMINI_BREAKER_RESET_SECONDS = float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "30"))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Gemini while the circuit breaker is open."""
+
+
+class GeminiBusyError(Exception):
+    """Raised when no local concurrency slot frees up in time; says nothing about Gemini's health."""
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker.
+
+    After failure_threshold consecutive failures the breaker opens and rejects
+    calls for reset_timeout seconds, then lets a single probe call through.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Gemini circuit breaker closed")
+            self.consecutive_failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """Let another probe through if the current one ended without a verdict."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            probe_failed = self._probe_in_flight
+            self._probe_in_flight = False
+            if probe_failed or self.consecutive_failures >= self.failure_threshold:
+                if self._opened_at is None or probe_failed:
+                    logger.warning(f"Gemini circuit breaker opened after {self.consecutive_failures} failures")
+                self._opened_at = time.monotonic()
+
+
+class GeminiClient:
+    """Process-wide entry point for Gemini text generation."""
+
+    def __init__(
+        self,
+        model_name: str = GEMINI_MODEL,
+        max_concurrency: int = GEMINI_MAX_CONCURRENCY,
+        timeout: float = GEMINI_TIMEOUT_SECONDS,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.model_name = model_name
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker(GEMINI_BREAKER_FAILURES, GEMINI_BREAKER_RESET_SECONDS)
+        self._models: Dict[str, genai.GenerativeModel] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.busy = 0
+
+    def model(self, model_name: Optional[str] = None) -> genai.GenerativeModel:
+        """Reuse one GenerativeModel per model name instead of building one per call."""
+        name = model_name or self.model_name
+        if name not in self._models:
+            self._models[name] = genai.GenerativeModel(name)
+        return self._models[name]
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _acquire_slot(self) -> asyncio.Semaphore:
+        """
+        Wait up to the deadline for a concurrency slot.
+
+        Raises:
+            GeminiBusyError: Every slot stayed taken; local load, not an upstream failure
+        """
+        semaphore = self._get_semaphore()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.busy += 1
+            self.breaker.release_probe()
+            raise GeminiBusyError("No Gemini concurrency slot available")
+        except asyncio.CancelledError:
+            self.breaker.release_probe()
+            raise
+        finally:
+            self.waiting -= 1
+        return semaphore
+
+    async def generate(self, prompt: str, model_name: Optional[str] = None) -> str:
+        """
+        Generate text for a prompt.
+
+        Waiting for a concurrency slot and the call itself each get the deadline;
+        only the call's outcome counts toward the circuit breaker.
+
+        Raises:
+            CircuitOpenError: The breaker is open; callers should use their fallback
+            GeminiBusyError: No concurrency slot freed up within the deadline
+            asyncio.TimeoutError: The call exceeded the deadline
+        """
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError("Gemini circuit breaker is open")
+
+        semaphore = await self._acquire_slot()
+        self.calls += 1
+        self.in_flight += 1
+        try:
+            response = await asyncio.wait_for(
+                self.model(model_name).generate_content_async(prompt), timeout=self.timeout
+            )
+            text = response.text
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.breaker.record_failure()
+            raise
+        except asyncio.CancelledError:
+            # Client went away; says nothing about upstream health
+            self.breaker.release_probe()
+            raise
+        except Exception:
+            self.failures += 1
+            self.breaker.record_failure()
+            raise
+        finally:
+            self.in_flight -= 1
+            semaphore.release()
+
+        self.successes += 1
+        self.breaker.record_success()
+        return text
+
+    async def stream(self, prompt: str, model_name: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Generate text for a prompt, yielding chunks as the model produces them.
+
+        Same breaker, concurrency slot and deadlines as generate(); the call's
+        deadline bounds the whole stream, not each chunk.
+        """
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError("Gemini circuit breaker is open")
+
+        semaphore = await self._acquire_slot()
+        self.calls += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+
+        def remaining() -> float:
+            return max(0.0, deadline - loop.time())
+
+        self.in_flight += 1
+        try:
+            response = await asyncio.wait_for(
+                self.model(model_name).generate_content_async(prompt, stream=True), timeout=remaining()
+            )
+            chunks = response.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=remaining())
+                except StopAsyncIteration:
+                    break
+                yield chunk.text
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.breaker.record_failure()
+            raise
+        except (asyncio.CancelledError, GeneratorExit):
+            # Consumer went away; says nothing about upstream health
+            self.breaker.release_probe()
+            raise
+        except Exception:
+            self.failures += 1
+            self.breaker.record_failure()
+            raise
+        else:
+            self.successes += 1
+            self.breaker.record_success()
+        finally:
+            self.in_flight -= 1
+            semaphore.release()
+
+    def metrics(self) -> Dict[str, object]:
+        return {
+            "model": self.model_name,
+            "breaker_state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "timeout_seconds": self.timeout,
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "busy": self.busy,
+        }
+
+
+gemini_client = GeminiClient()
@@ -0,0 +1,139 @@
+"""
+Token-bounded decision history for AI prompts, backed by a rolling per-user summary.
+"""
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Decision, UserHistorySummary
+from app.services.gemini import summarize_decisions
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("ANALYSIS_PROMPT_TOKEN_BUDGET", "1500"))
+SUMMARY_MAX_WORDS = int(os.getenv("ANALYSIS_SUMMARY_MAX_WORDS", "200"))
+# Rough English average; good enough for budgeting without a tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _take_within_budget(decisions: List[Tuple[int, str]], budget: int, newest: bool) -> int:
+    """How many decisions from one end of the list fit in the token budget (at least one)."""
+    ordered = reversed(decisions) if newest else iter(decisions)
+    taken, used = 0, 0
+    for _, content in ordered:
+        cost = estimate_tokens(content) + 1
+        if taken and used + cost > budget:
+            break
+        taken += 1
+        used += cost
+    return taken
+
+
+# One history build per user at a time: the personality and life-areas
+# refreshes run together and would otherwise summarize the same decisions twice
+_user_locks: Dict[int, asyncio.Lock] = {}
+_lock_holders: Dict[int, int] = {}  # Callers holding or waiting on each lock
+
+
+def _load_history(session: Session, user_id: int) -> Tuple[Optional[str], List[Tuple[int, str]]]:
+    """The stored summary and the decisions not folded into it yet, oldest first."""
+    state = session.get(UserHistorySummary, user_id)
+    folded_through = state.last_decision_id if state else 0
+    pending = session.exec(
+        select(Decision.id, Decision.content)
+        .where(Decision.user_id == user_id, Decision.id > folded_through)
+        .order_by(Decision.id)
+    ).all()
+    return (state.summary if state else None), [tuple(row) for row in pending]
+
+
+def _store_summary(session: Session, user_id: int, summary: str, last_decision_id: int, folded: int) -> None:
+    """Upsert the rolling summary; never moves it back to an older decision."""
+    insert = postgresql_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+    now = datetime.utcnow()
+    statement = insert(UserHistorySummary).values(
+        user_id=user_id, summary=summary, last_decision_id=last_decision_id, folded_count=folded, updated_at=now
+    )
+    session.exec(statement.on_conflict_do_update(
+        index_elements=[UserHistorySummary.user_id],
+        set_={
+            "summary": summary,
+            "last_decision_id": last_decision_id,
+            "folded_count": UserHistorySummary.folded_count + folded,
+            "updated_at": now,
+        },
+        where=UserHistorySummary.last_decision_id < last_decision_id,
+    ))
+
+
+async def build_decision_history(user_id: int) -> Tuple[List[str], Optional[str]]:
+    """
+    Prepare a user's decision history for an analysis prompt within the token budget.
+
+    The newest decisions are sent verbatim while they fit; anything older that
+    hasn't been summarized yet is folded into the stored rolling summary in
+    budget-sized batches. Decisions already folded are never reread, so the
+    work per call stays flat however long the history gets.
+
+    Opens a short session for the read and for each summary write, so no
+    connection is held while Gemini summarizes. Calls for the same user run
+    one at a time.
+
+    Returns:
+        (recent decision texts oldest first, summary of everything older or None)
+    """
+    lock = _user_locks.setdefault(user_id, asyncio.Lock())
+    _lock_holders[user_id] = _lock_holders.get(user_id, 0) + 1
+    try:
+        async with lock:
+            return await _build_decision_history(user_id)
+    finally:
+        _lock_holders[user_id] -= 1
+        if not _lock_holders[user_id]:
+            del _lock_holders[user_id]
+            del _user_locks[user_id]
+
+
+async def _build_decision_history(user_id: int) -> Tuple[List[str], Optional[str]]:
+    from app.database import async_engine
+
+    async with AsyncSession(async_engine) as session:
+        summary, pending = await session.run_sync(_load_history, user_id)
+
+    summary_tokens = estimate_tokens(summary) if summary else 0
+    recent_budget = max(PROMPT_TOKEN_BUDGET - summary_tokens, PROMPT_TOKEN_BUDGET // 2)
+    recent_count = _take_within_budget(pending, recent_budget, newest=True)
+    if recent_count < len(pending):
+        # Once over budget, fold down to half of it so summaries happen in
+        # batches rather than once for every new decision
+        recent_count = _take_within_budget(pending, recent_budget // 2, newest=True)
+    overflow = pending[:len(pending) - recent_count]
+
+    # Fold the overflow into the summary, one bounded summarization call per batch
+    while overflow:
+        batch_size = _take_within_budget(overflow, PROMPT_TOKEN_BUDGET, newest=False)
+        batch = overflow[:batch_size]
+        new_summary = await summarize_decisions(summary, [content for _, content in batch], SUMMARY_MAX_WORDS)
+        if not new_summary:
+            # Leave the rest for the next refresh; this prompt just omits it
+            break
+
+        summary = " ".join(new_summary.split()[:SUMMARY_MAX_WORDS])
+        async with AsyncSession(async_engine) as session:
+            await session.run_sync(_store_summary, user_id, summary, batch[-1][0], len(batch))
+            await session.commit()
+        overflow = overflow[batch_size:]
+
+    recent = [content for _, content in pending[len(pending) - recent_count:]]
+    # A single oversized decision is clipped rather than blowing the budget
+    max_chars = recent_budget * CHARS_PER_TOKEN
+    recent = [content if len(content) <= max_chars else content[:max_chars] + "…" for content in recent]
+    return recent, summary
@@ -0,0 +1,77 @@
+"""
+Batched hydration of feed rows so a page costs a fixed number of queries.
+"""
+from typing import Dict, Iterable, List, Optional
+
+from sqlmodel import Session, select
+
+from app.models import Comment, Decision, User
+from app.schemas import CommentItem, DecisionItem, UserSummary
+from app.services.tallies import get_vote_counts_bulk
+from app.services.vote_buffer import vote_buffer
+
+
+def load_authors(session: Session, user_ids: Iterable[int]) -> Dict[int, UserSummary]:
+    """Load each distinct author once with a single IN query, only the columns feeds show."""
+    ids = list(set(user_ids))
+    if not ids:
+        return {}
+    rows = session.exec(select(User.id, User.username, User.avatar_url).where(User.id.in_(ids))).all()
+    return {row.id: UserSummary.model_validate(row) for row in rows}
+
+
+def hydrate_decisions(
+    session: Session,
+    decisions: List[Decision],
+    authors: Optional[Dict[int, UserSummary]] = None
+) -> List[DecisionItem]:
+    """
+    Attach author and vote counts to a page of decisions.
+
+    Args:
+        session: Database session
+        decisions: Decision rows in the order they should be returned
+        authors: Already-loaded authors keyed by id, to skip the user query
+
+    Returns:
+        Feed items with "user" and "vote_counts" filled in
+    """
+    if authors is None:
+        authors = load_authors(session, [d.user_id for d in decisions])
+    tallies = vote_buffer.overlay_counts(get_vote_counts_bulk(session, [d.id for d in decisions]))
+
+    return [
+        DecisionItem(
+            id=decision.id,
+            user_id=decision.user_id,
+            content=decision.content,
+            option_a=decision.option_a,
+            option_b=decision.option_b,
+            created_at=decision.created_at,
+            user=authors.get(decision.user_id),
+            vote_counts=tallies[decision.id]
+        )
+        for decision in decisions
+    ]
+
+
+def hydrate_comments(
+    session: Session,
+    comments: List[Comment],
+    authors: Optional[Dict[int, UserSummary]] = None
+) -> List[CommentItem]:
+    """Attach the author to a page of comments."""
+    if authors is None:
+        authors = load_authors(session, [c.user_id for c in comments])
+
+    return [
+        CommentItem(
+            id=comment.id,
+            user_id=comment.user_id,
+            decision_id=comment.decision_id,
+            content=comment.content,
+            created_at=comment.created_at,
+            user=authors.get(comment.user_id)
+        )
+        for comment in comments
+    ]
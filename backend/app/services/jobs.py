@@ -0,0 +1,169 @@
+"""
+In-process async job queue with a small worker pool, and the periodic
+background loops services use to resync from the database.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from sqlmodel import Session
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "1000"))
+
+
+class JobQueue:
+    """
+    Deduplicating background job queue.
+
+    Jobs are identified by a key; enqueueing a key that is already waiting or
+    running returns the existing future instead of scheduling duplicate work.
+    """
+
+    def __init__(self, maxsize: int = JOB_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self, num_workers: int = JOB_WORKERS) -> None:
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(num_workers)]
+        logger.info(f"Job queue started with {num_workers} worker(s)")
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+    def is_pending(self, key: Hashable) -> bool:
+        return key in self._pending
+
+    def enqueue(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Optional[asyncio.Future]:
+        """
+        Schedule fn() to run on a worker.
+
+        Returns:
+            Future resolving to fn's result, or None if the queue is full
+        """
+        existing = self._pending.get(key)
+        if existing is not None:
+            return existing
+
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may await a background job; don't warn about unretrieved errors
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+        if not self.running:
+            # No worker pool (e.g. lifespan not run); execute in the background directly
+            self._pending[key] = future
+            asyncio.ensure_future(self._run(key, fn, future))
+            return future
+
+        try:
+            self._queue.put_nowait((key, fn, future))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"Job queue full, dropping job {key!r}")
+            return None
+        self._pending[key] = future
+        return future
+
+    async def _run(self, key: Hashable, fn: Callable[[], Awaitable[Any]], future: asyncio.Future) -> None:
+        try:
+            result = await fn()
+            self.completed += 1
+            if not future.done():
+                future.set_result(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Job {key!r} failed: {e}")
+            if not future.done():
+                future.set_exception(e)
+        finally:
+            self._pending.pop(key, None)
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            key, fn, future = await self._queue.get()
+            try:
+                await self._run(key, fn, future)
+            finally:
+                self._queue.task_done()
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "workers": len(self._workers),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "pending": len(self._pending),
+            "completed": self.completed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+
+class PeriodicTask:
+    """
+    Run fn() every interval seconds until stopped.
+
+    A failed run is logged and the loop carries on with the next one.
+    """
+
+    def __init__(self, name: str, fn: Callable[[], Awaitable[Any]]):
+        self.name = name
+        self.fn = fn
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self, interval: float) -> None:
+        """Start the loop; an interval of 0 or less leaves it off."""
+        if interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop(interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.fn()
+            except Exception as e:
+                logger.error(f"{self.name} failed: {e}")
+
+
+async def run_in_session(fn: Callable[[Session], Any]) -> Any:
+    """Run a sync fn(session) in a worker thread with its own session, off the event loop."""
+    from app.database import engine
+
+    def run() -> Any:
+        with Session(engine) as session:
+            return fn(session)
+
+    return await asyncio.to_thread(run)
+
+
+job_queue = JobQueue()
@@ -0,0 +1,274 @@
+"""
+Leaderboards kept up to date as decisions and votes happen, instead of a
+GROUP BY over the decision table on every request.
+
+Each (metric, window) pair is a RankedScores structure: a Fenwick tree over
+score values, so any user's rank and each step of a top-N walk cost
+O(log max_score). Windows are calendar periods in UTC ("day" is today,
+"week" the current ISO week) and start empty when the period rolls over.
+
+The database stays the source of truth: rebuild() recomputes everything
+from the decision and vote tables at startup and every
+LEADERBOARD_REBUILD_SECONDS, which also folds in events other worker
+processes recorded. A periodic rebuild queries in a worker thread up to the
+newest decision and vote ids it sees, then swaps the boards in on the event
+loop and replays the events recorded meanwhile that are newer than those.
+
+Votes are credited to a decision's author through an in-memory map of every
+decision id to its author. A vote on a decision created by another worker
+since the last rebuild counts toward votes_cast right away but toward the
+author's votes_received only after the next rebuild.
+"""
+import itertools
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlmodel import Session, select, func
+
+from app.models import Decision, Vote
+from app.services.jobs import PeriodicTask, run_in_session
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("decisions", "votes_received", "votes_cast")
+WINDOWS = ("day", "week", "all")
+LEADERBOARD_REBUILD_SECONDS = float(os.getenv("LEADERBOARD_REBUILD_SECONDS", "300"))
+
+
+def period_start(window: str, now: datetime) -> Optional[datetime]:
+    """Start of the current period for a window (None for all-time)."""
+    day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if window == "day":
+        return day
+    if window == "week":
+        return day - timedelta(days=day.weekday())
+    return None
+
+
+class _Fenwick:
+    """Binary indexed tree of how many users hold each score (1-based)."""
+
+    def __init__(self, size: int = 64):
+        self.size = size
+        self.tree = [0] * (size + 1)
+
+    def add(self, index: int, delta: int) -> None:
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index: int) -> int:
+        """Number of users with score <= index."""
+        total = 0
+        index = min(index, self.size)
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def find(self, k: int) -> int:
+        """Smallest score s with prefix(s) >= k."""
+        position = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            nxt = position + step
+            if nxt <= self.size and self.tree[nxt] < k:
+                position = nxt
+                k -= self.tree[nxt]
+            step >>= 1
+        return position + 1
+
+    def grow(self, needed: int) -> None:
+        counts = [self.prefix(i) - self.prefix(i - 1) for i in range(1, self.size + 1)]
+        while self.size < needed:
+            self.size *= 2
+        self.tree = [0] * (self.size + 1)
+        for score, count in enumerate(counts, start=1):
+            if count:
+                self.add(score, count)
+
+
+class RankedScores:
+    """
+    Per-user scores with O(log n) rank lookup and top-N listing.
+
+    Ranks are competition style: tied users share a rank and the next rank
+    skips (1, 2, 2, 4). Users with a score of 0 are unranked.
+    """
+
+    def __init__(self):
+        self.scores: Dict[int, int] = {}
+        # Users at each score, in the order they reached it (earlier ranks first on ties)
+        self._by_score: Dict[int, Dict[int, None]] = {}
+        self._tree = _Fenwick()
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def increment(self, user_id: int, delta: int = 1) -> int:
+        old = self.scores.get(user_id, 0)
+        new = max(old + delta, 0)
+        if new == old:
+            return new
+        if old:
+            self._tree.add(old, -1)
+            bucket = self._by_score[old]
+            del bucket[user_id]
+            if not bucket:
+                del self._by_score[old]
+        if new:
+            if new > self._tree.size:
+                self._tree.grow(new)
+            self._tree.add(new, 1)
+            self._by_score.setdefault(new, {})[user_id] = None
+            self.scores[user_id] = new
+        else:
+            del self.scores[user_id]
+        return new
+
+    def rank(self, user_id: int) -> Optional[int]:
+        score = self.scores.get(user_id)
+        if not score:
+            return None
+        return len(self.scores) - self._tree.prefix(score) + 1
+
+    def top(self, limit: int, offset: int = 0) -> List[Tuple[int, int, int]]:
+        """(rank, user_id, score) for positions offset+1 .. offset+limit."""
+        results = []
+        position = offset + 1
+        total = len(self.scores)
+        while position <= total and len(results) < limit:
+            # position-th highest = (total - position + 1)-th lowest
+            score = self._tree.find(total - position + 1)
+            rank = total - self._tree.prefix(score) + 1
+            skip = position - rank
+            # Slice the tie bucket lazily; it can hold most users (e.g. everyone at 1)
+            for user_id in itertools.islice(self._by_score[score], skip, skip + limit - len(results)):
+                results.append((rank, user_id, score))
+                position += 1
+        return results
+
+
+class LeaderboardEngine:
+    def __init__(self):
+        self._boards: Dict[Tuple[str, str], Tuple[Optional[datetime], RankedScores]] = {}
+        # Decision author lookup so a vote can be credited without a query
+        self._authors: Dict[int, int] = {}
+        # Events recorded while a rebuild's queries run, replayed onto its boards
+        self._recorded: Optional[List[Tuple[str, int, int, Optional[int]]]] = None
+        self._rebuilder = PeriodicTask("Leaderboard rebuild", self.rebuild_async)
+        self.rebuilt_at: Optional[datetime] = None
+
+    def board(self, metric: str, window: str, now: Optional[datetime] = None) -> RankedScores:
+        """The current period's board, starting a fresh one if the period rolled over."""
+        start = period_start(window, now or datetime.utcnow())
+        entry = self._boards.get((metric, window))
+        if entry is None or entry[0] != start:
+            entry = self._boards[(metric, window)] = (start, RankedScores())
+        return entry[1]
+
+    def _credit(self, metric: str, user_id: int, delta: int = 1) -> None:
+        now = datetime.utcnow()
+        for window in WINDOWS:
+            self.board(metric, window, now).increment(user_id, delta)
+
+    def record_decision(self, decision_id: int, user_id: int) -> None:
+        if self._recorded is not None:
+            self._recorded.append(("decision", decision_id, user_id, None))
+        self._authors[decision_id] = user_id
+        self._credit("decisions", user_id)
+
+    def record_vote(self, voter_id: int, decision_id: int, vote_id: Optional[int] = None) -> None:
+        """Count a first vote (changing a vote's option doesn't count again)."""
+        if self._recorded is not None:
+            self._recorded.append(("vote", decision_id, voter_id, vote_id))
+        self._credit("votes_cast", voter_id)
+        author_id = self._authors.get(decision_id)
+        if author_id is not None:
+            self._credit("votes_received", author_id)
+
+    @staticmethod
+    def _load(session: Session) -> Dict[str, Any]:
+        """Query everything a rebuild needs, up to the newest decision and vote at the start."""
+        now = datetime.utcnow()
+        last_decision_id = session.exec(select(func.max(Decision.id))).one() or 0
+        last_vote_id = session.exec(select(func.max(Vote.id))).one() or 0
+        decisions_seen = Decision.id <= last_decision_id
+        votes_seen = Vote.id <= last_vote_id
+
+        rows = {}
+        for window in WINDOWS:
+            start = period_start(window, now)
+            queries = {
+                "decisions": select(Decision.user_id, func.count(Decision.id))
+                    .where(decisions_seen, *([Decision.created_at >= start] if start else []))
+                    .group_by(Decision.user_id),
+                "votes_cast": select(Vote.user_id, func.count(Vote.id))
+                    .where(votes_seen, *([Vote.created_at >= start] if start else []))
+                    .group_by(Vote.user_id),
+                "votes_received": select(Decision.user_id, func.count(Vote.id))
+                    .join(Decision, Decision.id == Vote.decision_id)
+                    .where(votes_seen, *([Vote.created_at >= start] if start else []))
+                    .group_by(Decision.user_id),
+            }
+            for metric, query in queries.items():
+                rows[(metric, window)] = (start, session.exec(query).all())
+
+        return {
+            "now": now,
+            "rows": rows,
+            "authors": session.exec(select(Decision.id, Decision.user_id).where(decisions_seen)).all(),
+            "last_decision_id": last_decision_id,
+            "last_vote_id": last_vote_id,
+        }
+
+    def _swap(self, loaded: Dict[str, Any], recorded: Iterable[Tuple[str, int, int, Optional[int]]] = ()) -> None:
+        """Build boards from _load's rows, install them, then replay events they don't include."""
+        boards = {}
+        for key, (start, rows) in loaded["rows"].items():
+            scores = RankedScores()
+            # Insert in score order so ties keep a stable, meaningful order
+            for user_id, count in sorted(rows, key=lambda row: row[1]):
+                scores.increment(user_id, count)
+            boards[key] = (start, scores)
+        self._boards = boards
+        self._authors = dict(loaded["authors"])
+        self.rebuilt_at = loaded["now"]
+
+        for kind, decision_id, user_id, vote_id in recorded:
+            if kind == "decision" and decision_id > loaded["last_decision_id"]:
+                self.record_decision(decision_id, user_id)
+            elif kind == "vote" and (vote_id is None or vote_id > loaded["last_vote_id"]):
+                self.record_vote(user_id, decision_id, vote_id)
+
+    def rebuild(self, session: Session) -> None:
+        """Recompute every board from the database (at startup, before events arrive)."""
+        self._swap(self._load(session))
+
+    async def rebuild_async(self) -> None:
+        """Recompute every board without blocking the event loop or losing concurrent events."""
+        self._recorded = []
+        try:
+            loaded = await run_in_session(self._load)
+        finally:
+            recorded, self._recorded = self._recorded, None
+        self._swap(loaded, recorded)
+
+    async def start(self, interval: float = LEADERBOARD_REBUILD_SECONDS) -> None:
+        await self._rebuilder.start(interval)
+
+    async def stop(self) -> None:
+        await self._rebuilder.stop()
+
+    def top(self, metric: str, window: str, limit: int, offset: int = 0) -> List[Tuple[int, int, int]]:
+        return self.board(metric, window).top(limit, offset)
+
+    def rank(self, metric: str, window: str, user_id: int) -> Tuple[Optional[int], int, int]:
+        """(rank or None if unranked, score, number of ranked users)"""
+        scores = self.board(metric, window)
+        return scores.rank(user_id), scores.scores.get(user_id, 0), len(scores)
+
+
+leaderboards = LeaderboardEngine()
@@ -0,0 +1,222 @@
+"""
+Pub/sub hub pushing live vote counts to clients instead of them polling
+GET /votes/{decision_id}.
+
+Each decision is a channel. A client connection is one Subscription to any
+number of channels (up to LIVE_COUNTS_MAX_SUBSCRIPTIONS). create_vote
+publishes the count delta of every vote it records. Every LIVE_COUNTS_TICK_MS
+the hub folds the accumulated deltas into each channel's counts and hands each
+subscriber a single update holding every channel of theirs that changed. A
+viral decision costs a subscriber at most one update per tick, however many
+votes land in it.
+
+Counts start from a database snapshot when a channel gets its first
+subscriber. Votes recorded by other worker processes are not published
+here, so every LIVE_COUNTS_RESYNC_SECONDS the hub re-reads all subscribed
+channels and pushes whatever moved. That resync also corrects any drift.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.services.tallies import get_vote_counts_bulk
+from app.services.vote_buffer import vote_buffer
+
+logger = logging.getLogger(__name__)
+
+LIVE_COUNTS_TICK_MS = int(os.getenv("LIVE_COUNTS_TICK_MS", "250"))
+LIVE_COUNTS_RESYNC_SECONDS = float(os.getenv("LIVE_COUNTS_RESYNC_SECONDS", "5"))
+LIVE_COUNTS_MAX_SUBSCRIPTIONS = int(os.getenv("LIVE_COUNTS_MAX_SUBSCRIPTIONS", "200"))
+
+Counts = Dict[str, int]
+
+
+class Subscription:
+    """One client connection's channels and its not-yet-sent updates."""
+
+    def __init__(self):
+        self.decision_ids: Set[int] = set()
+        self._pending: Dict[int, Counts] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, decision_id: int, counts: Counts) -> None:
+        # Coalesce: a newer update for the same decision replaces the unsent one
+        self._pending[decision_id] = dict(counts)
+        self._ready.set()
+
+    async def next_update(self) -> Dict[int, Counts]:
+        """Wait for and take every pending update."""
+        await self._ready.wait()
+        self._ready.clear()
+        pending, self._pending = self._pending, {}
+        return pending
+
+
+class VoteCountHub:
+    def __init__(
+        self,
+        tick: float = LIVE_COUNTS_TICK_MS / 1000,
+        resync_interval: float = LIVE_COUNTS_RESYNC_SECONDS,
+        max_subscriptions: int = LIVE_COUNTS_MAX_SUBSCRIPTIONS
+    ):
+        self.tick = tick
+        self.resync_interval = resync_interval
+        self.max_subscriptions = max_subscriptions
+        self._channels: Dict[int, Set[Subscription]] = {}
+        # Current counts per channel; absent while its first snapshot loads
+        self._counts: Dict[int, Counts] = {}
+        self._deltas: Dict[int, Counts] = {}
+        self._needs_resync: Set[int] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.updates_sent = 0
+
+    def subscribe(self) -> Subscription:
+        return Subscription()
+
+    async def add(self, subscription: Subscription, decision_ids: Iterable[int]) -> List[int]:
+        """
+        Subscribe to channels; their current counts are pushed right away.
+
+        Returns:
+            The decision ids added (beyond max_subscriptions the rest are ignored)
+        """
+        added = []
+        for decision_id in decision_ids:
+            if decision_id in subscription.decision_ids:
+                continue
+            if len(subscription.decision_ids) >= self.max_subscriptions:
+                break
+            subscription.decision_ids.add(decision_id)
+            self._channels.setdefault(decision_id, set()).add(subscription)
+            added.append(decision_id)
+
+        loading = [decision_id for decision_id in added if decision_id not in self._counts]
+        if loading:
+            snapshot = await self._load(loading)
+            for decision_id in loading:
+                if decision_id in self._channels and decision_id not in self._counts:
+                    self._counts[decision_id] = snapshot[decision_id]
+        for decision_id in added:
+            if decision_id in self._counts:
+                subscription.push(decision_id, self._counts[decision_id])
+        return added
+
+    def remove(self, subscription: Subscription, decision_ids: Iterable[int]) -> None:
+        for decision_id in list(decision_ids):
+            subscription.decision_ids.discard(decision_id)
+            subscribers = self._channels.get(decision_id)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                # Last subscriber gone: stop tracking the channel
+                del self._channels[decision_id]
+                self._counts.pop(decision_id, None)
+                self._deltas.pop(decision_id, None)
+                self._needs_resync.discard(decision_id)
+
+    def close(self, subscription: Subscription) -> None:
+        self.remove(subscription, list(subscription.decision_ids))
+
+    def publish(self, decision_id: int, delta: Counts) -> None:
+        """Record a vote's count change (see tallies.vote_count_delta); sent on the next tick."""
+        if decision_id not in self._channels or not delta:
+            return
+        self.published += 1
+        if decision_id not in self._counts:
+            # Snapshot still loading; it may or may not include this vote
+            self._needs_resync.add(decision_id)
+            return
+        pending = self._deltas.setdefault(decision_id, {})
+        for column, change in delta.items():
+            pending[column] = pending.get(column, 0) + change
+
+    async def _load(self, decision_ids: List[int]) -> Dict[int, Counts]:
+        from app.database import async_engine
+        from sqlmodel.ext.asyncio.session import AsyncSession
+
+        async with AsyncSession(async_engine) as session:
+            counts = await session.run_sync(get_vote_counts_bulk, decision_ids)
+        # Include votes still waiting in the write buffer, as GET /votes/ does
+        return vote_buffer.overlay_counts(counts)
+
+    def _send(self, decision_id: int, counts: Counts) -> None:
+        for subscription in self._channels.get(decision_id, ()):
+            subscription.push(decision_id, counts)
+            self.updates_sent += 1
+
+    def flush_deltas(self) -> int:
+        """Apply accumulated deltas and push the changed channels. Returns how many changed."""
+        deltas, self._deltas = self._deltas, {}
+        changed = 0
+        for decision_id, delta in deltas.items():
+            counts = self._counts.get(decision_id)
+            if counts is None or not any(delta.values()):
+                continue
+            for column, change in delta.items():
+                counts[column] = counts.get(column, 0) + change
+            self._send(decision_id, counts)
+            changed += 1
+        return changed
+
+    async def resync(self, decision_ids: Optional[Iterable[int]] = None) -> int:
+        """Re-read channels from the database and push the ones that moved."""
+        ids = list(self._channels if decision_ids is None else decision_ids)
+        if not ids:
+            return 0
+        # Deltas are published after their vote is stored, so the snapshot covers these
+        for decision_id in ids:
+            self._deltas.pop(decision_id, None)
+        fresh = await self._load(ids)
+        changed = 0
+        for decision_id in ids:
+            if decision_id not in self._channels:
+                continue
+            if self._deltas.pop(decision_id, None):
+                # Published during the load: the snapshot may or may not include
+                # them, so read the channel again instead of guessing
+                self._needs_resync.add(decision_id)
+            if self._counts.get(decision_id) != fresh[decision_id]:
+                self._counts[decision_id] = fresh[decision_id]
+                self._send(decision_id, fresh[decision_id])
+                changed += 1
+        return changed
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        last_resync = time.monotonic()
+        while True:
+            await asyncio.sleep(self.tick)
+            try:
+                self.flush_deltas()
+                if time.monotonic() - last_resync >= self.resync_interval:
+                    last_resync = time.monotonic()
+                    self._needs_resync.clear()
+                    await self.resync()
+                elif self._needs_resync:
+                    ids, self._needs_resync = self._needs_resync, set()
+                    await self.resync(ids)
+            except Exception as e:
+                logger.error(f"Live vote count tick failed: {e}")
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "channels": len(self._channels),
+            "published": self.published,
+            "updates_sent": self.updates_sent,
+        }
+
+
+vote_hub = VoteCountHub()
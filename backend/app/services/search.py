@@ -0,0 +1,124 @@
+"""
+Full-text search over decision content backed by an SQLite FTS5 index.
+"""
+import logging
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select, text
+
+from app.models import Decision
+
+logger = logging.getLogger(__name__)
+
+# Set once the FTS5 table and its sync triggers are in place
+FTS_ENABLED = False
+
+_FTS_SETUP = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS decision_fts USING fts5(
+        content, content='decision', content_rowid='id', tokenize='unicode61'
+    )
+    """,
+    # External-content table: triggers keep the index in step with decision rows
+    """
+    CREATE TRIGGER IF NOT EXISTS decision_fts_ai AFTER INSERT ON decision BEGIN
+        INSERT INTO decision_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS decision_fts_ad AFTER DELETE ON decision BEGIN
+        INSERT INTO decision_fts(decision_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS decision_fts_au AFTER UPDATE OF content ON decision BEGIN
+        INSERT INTO decision_fts(decision_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO decision_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+]
+
+
+def setup_search_index(engine: Engine) -> None:
+    """Create the FTS5 index and triggers, building the index on first run."""
+    global FTS_ENABLED
+    if engine.dialect.name != "sqlite":
+        return
+
+    try:
+        with engine.begin() as conn:
+            existed = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'decision_fts'")
+            ).first() is not None
+            for statement in _FTS_SETUP:
+                conn.execute(text(statement))
+            if not existed:
+                conn.execute(text("INSERT INTO decision_fts(decision_fts) VALUES ('rebuild')"))
+        FTS_ENABLED = True
+    except Exception as e:
+        # SQLite builds without FTS5 keep the ILIKE fallback
+        logger.warning(f"Full-text search index unavailable: {e}")
+
+
+def build_match_query(search: str) -> Optional[str]:
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+
+    Every word is quoted so user input can't inject FTS syntax, and the last
+    word is a prefix match so results update as the user types.
+    """
+    words = re.findall(r"\w+", search)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_decisions(
+    session: Session,
+    search: str,
+    limit: int,
+    offset: int = 0
+) -> List[Tuple[Decision, Optional[str]]]:
+    """
+    Search decision content, best matches first.
+
+    Args:
+        session: Database session
+        search: Raw search text from the client
+        limit: Maximum number of results
+        offset: Number of ranked results to skip
+
+    Returns:
+        (decision, highlighted snippet) pairs ordered by BM25 rank; the snippet
+        is None when the FTS index is unavailable and ILIKE was used instead
+    """
+    match = build_match_query(search) if FTS_ENABLED else None
+    if match is None:
+        decisions = session.exec(
+            select(Decision)
+            .where(Decision.content.ilike(f"%{search}%"))
+            .order_by(Decision.created_at.desc())
+            .offset(offset)
+            .limit(limit)
+        ).all()
+        return [(decision, None) for decision in decisions]
+
+    rows = session.exec(
+        text(
+            "SELECT rowid, snippet(decision_fts, 0, '<mark>', '</mark>', '…', 16) "
+            "FROM decision_fts WHERE decision_fts MATCH :match "
+            "ORDER BY bm25(decision_fts) LIMIT :limit OFFSET :offset"
+        ).bindparams(match=match, limit=limit, offset=offset)
+    ).all()
+    if not rows:
+        return []
+
+    decisions = session.exec(
+        select(Decision).where(Decision.id.in_([row[0] for row in rows]))
+    ).all()
+    by_id = {decision.id: decision for decision in decisions}
+    return [(by_id[row_id], snippet) for row_id, snippet in rows if row_id in by_id]
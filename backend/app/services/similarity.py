@@ -0,0 +1,148 @@
+"""
+MinHash/LSH index for finding decisions with similar text without scanning them all.
+"""
+import hashlib
+import struct
+import threading
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, Set, Tuple
+
+from sqlmodel import Session, select
+
+from app.models import Decision
+
+SHINGLE_SIZE = 3
+NUM_BANDS = 32
+ROWS_PER_BAND = 2
+NUM_HASHES = NUM_BANDS * ROWS_PER_BAND
+# Only this many of the best LSH candidates are scored exactly per query
+MAX_CANDIDATES = 200
+
+_HASH_ROW = struct.Struct(f"<{NUM_HASHES}I")
+
+
+def shingles(text: str) -> Set[str]:
+    """Overlapping character n-grams of whitespace-normalized, lowercased text."""
+    normalized = " ".join(text.lower().split())
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized}
+    return {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text: str) -> List[int]:
+    """
+    Compute the MinHash signature of a text.
+
+    One extendable-output hash per shingle yields all NUM_HASHES values at once,
+    which is much cheaper in Python than NUM_HASHES separate hash functions.
+    """
+    rows = [
+        _HASH_ROW.unpack(hashlib.shake_128(shingle.encode()).digest(_HASH_ROW.size))
+        for shingle in shingles(text)
+    ]
+    return [min(column) for column in zip(*rows)]
+
+
+class SimilarityIndex:
+    """
+    In-memory LSH index over decision content.
+
+    Signatures are split into bands; decisions sharing any band bucket with the
+    query become candidates, which are then scored exactly with SequenceMatcher.
+    Lookups touch only the matching buckets, not the whole corpus.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[int]] = defaultdict(set)
+        self._contents: Dict[int, str] = {}
+        self._signatures: Dict[int, List[int]] = {}
+        self.loaded = False
+
+    @staticmethod
+    def _bands(signature: List[int]):
+        for band in range(NUM_BANDS):
+            start = band * ROWS_PER_BAND
+            yield band, tuple(signature[start:start + ROWS_PER_BAND])
+
+    def add(self, decision_id: int, content: str) -> None:
+        signature = minhash(content)
+        with self._lock:
+            if decision_id in self._signatures:
+                self._remove_locked(decision_id)
+            self._contents[decision_id] = content.lower()
+            self._signatures[decision_id] = signature
+            for key in self._bands(signature):
+                self._buckets[key].add(decision_id)
+
+    def remove(self, decision_id: int) -> None:
+        with self._lock:
+            self._remove_locked(decision_id)
+
+    def _remove_locked(self, decision_id: int) -> None:
+        signature = self._signatures.pop(decision_id, None)
+        self._contents.pop(decision_id, None)
+        if signature is None:
+            return
+        for key in self._bands(signature):
+            bucket = self._buckets.get(key)
+            if bucket:
+                bucket.discard(decision_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def rebuild(self, session: Session) -> None:
+        """Reload the whole index from the decision table."""
+        rows = session.exec(select(Decision.id, Decision.content)).all()
+        with self._lock:
+            self._buckets.clear()
+            self._contents.clear()
+            self._signatures.clear()
+        for decision_id, content in rows:
+            self.add(decision_id, content)
+        self.loaded = True
+
+    def ensure_loaded(self, session: Session) -> None:
+        if not self.loaded:
+            self.rebuild(session)
+
+    def query(
+        self,
+        text: str,
+        min_similarity: float = 0.0,
+        max_candidates: int = MAX_CANDIDATES
+    ) -> List[Tuple[int, float]]:
+        """
+        Find indexed decisions similar to text.
+
+        Candidates are ordered by how many bands they share with the query (an
+        estimate of shingle overlap) and only the best max_candidates are scored.
+
+        Returns:
+            (decision_id, SequenceMatcher ratio) pairs above min_similarity,
+            most similar first
+        """
+        signature = minhash(text)
+        with self._lock:
+            band_hits: Dict[int, int] = defaultdict(int)
+            for key in self._bands(signature):
+                for candidate in self._buckets.get(key, ()):
+                    band_hits[candidate] += 1
+            best = sorted(band_hits, key=band_hits.get, reverse=True)[:max_candidates]
+            contents = {cid: self._contents[cid] for cid in best}
+
+        lowered = text.lower()
+        scored = []
+        for decision_id, content in contents.items():
+            similarity = SequenceMatcher(None, lowered, content).ratio()
+            if similarity > min_similarity:
+                scored.append((decision_id, similarity))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored
+
+    def __len__(self) -> int:
+        return len(self._contents)
+
+
+similarity_index = SimilarityIndex()
@@ -0,0 +1,252 @@
+"""
+Materialized vote tallies so read paths never have to COUNT the vote table.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select, func, update, case
+
+from app.models import Decision, Vote, VoteTally
+
+# Legacy "do it / don't do it" votes are folded into the matching option slot
+CHOICE_COLUMNS = {
+    "option_a": "option_a",
+    "do_it": "option_a",
+    "option_b": "option_b",
+    "dont_do_it": "option_b",
+}
+
+
+def empty_counts() -> Dict[str, int]:
+    return {"option_a": 0, "option_b": 0, "total": 0}
+
+
+def apply_vote(session: Session, decision_id: int, choice: str, delta: int = 1) -> None:
+    """
+    Adjust the stored tally for a decision inside the caller's transaction.
+
+    Args:
+        session: Session holding the vote write; the caller commits
+        decision_id: Decision the vote belongs to
+        choice: Vote choice ("option_a", "option_b" or a legacy alias)
+        delta: +1 for a new vote, -1 for a removed one
+    """
+    values = {"total": VoteTally.total + delta}
+    column = CHOICE_COLUMNS.get(choice)
+    if column:
+        values[column] = getattr(VoteTally, column) + delta
+
+    result = session.exec(
+        update(VoteTally).where(VoteTally.decision_id == decision_id).values(**values)
+    )
+    if result.rowcount == 0:
+        # No tally row yet (e.g. decision inserted outside create_decision)
+        tally = VoteTally(decision_id=decision_id, total=delta)
+        if column:
+            setattr(tally, column, delta)
+        session.add(tally)
+
+
+def _canonical_choice(choice_column):
+    """SQL expression folding legacy choice aliases onto option_a / option_b."""
+    return case(*((choice_column == alias, column) for alias, column in CHOICE_COLUMNS.items()), else_=choice_column)
+
+
+def vote_count_delta(choice: str, previous_column: Optional[str]) -> Dict[str, int]:
+    """Tally change for a vote that is new (previous_column None) or moved from another option."""
+    column = CHOICE_COLUMNS[choice]
+    if previous_column is None:
+        return {column: 1, "total": 1}
+    if previous_column == column:
+        return {}
+    return {column: 1, previous_column: -1}
+
+
+def apply_count_delta(session: Session, decision_id: int, delta: Dict[str, int]) -> None:
+    """Add a vote_count_delta (or several summed) to a decision's stored tally."""
+    if not any(delta.values()):
+        return
+    session.exec(
+        update(VoteTally)
+        .where(VoteTally.decision_id == decision_id)
+        .values(**{column: getattr(VoteTally, column) + change for column, change in delta.items()})
+    )
+
+
+def cast_vote(
+    session: Session,
+    user_id: int,
+    decision_id: int,
+    choice: str,
+    update_tally: bool = True
+) -> Optional[Tuple[Vote, Optional[str]]]:
+    """
+    Record or change a user's vote.
+
+    A first vote is one INSERT ... ON CONFLICT DO NOTHING; a row coming back
+    means it was inserted. Otherwise a guarded UPDATE moves the existing vote
+    to the other option, and a row coming back means it changed. The unique
+    (user_id, decision_id) index and the UPDATE's guard make the database the
+    arbiter, so parallel clicks can't double count. A changed vote moves one
+    count between the option columns; the caller commits, keeping vote and
+    tally in step.
+
+    Args:
+        session: Session holding the write; the caller commits
+        user_id: Voter
+        decision_id: Decision being voted on
+        choice: A key of CHOICE_COLUMNS
+        update_tally: False when the caller applies vote_count_delta itself (e.g. summed per batch)
+
+    Returns:
+        (stored vote, previous option column or None for a first vote), or
+        None if the user already voted for the same option
+    """
+    new_column = CHOICE_COLUMNS[choice]
+    insert = postgresql_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+    inserted = session.exec(
+        insert(Vote)
+        .values(user_id=user_id, decision_id=decision_id, choice=choice, created_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=[Vote.user_id, Vote.decision_id])
+        .returning(Vote.id, Vote.created_at)
+    ).first()
+    if inserted is not None:
+        vote_id, created_at = inserted
+        if update_tally:
+            apply_vote(session, decision_id, choice)
+        return Vote(id=vote_id, user_id=user_id, decision_id=decision_id, choice=choice, created_at=created_at), None
+
+    changed = session.exec(
+        update(Vote)
+        .where(
+            Vote.user_id == user_id,
+            Vote.decision_id == decision_id,
+            # Re-voting the same option is a no-op and returns no row
+            _canonical_choice(Vote.choice) != new_column,
+        )
+        .values(choice=choice)
+        .returning(Vote.id, Vote.created_at)
+    ).first()
+    if changed is None:
+        return None
+
+    vote_id, created_at = changed
+    previous_column = "option_b" if new_column == "option_a" else "option_a"
+    if update_tally:
+        apply_count_delta(session, decision_id, vote_count_delta(choice, previous_column))
+    return Vote(id=vote_id, user_id=user_id, decision_id=decision_id, choice=choice, created_at=created_at), previous_column
+
+
+def get_vote_counts(session: Session, decision_id: int) -> Dict[str, int]:
+    """Return the stored tally for one decision."""
+    tally = session.get(VoteTally, decision_id)
+    if not tally:
+        return empty_counts()
+    return {"option_a": tally.option_a, "option_b": tally.option_b, "total": tally.total}
+
+
+def get_vote_counts_bulk(session: Session, decision_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+    """Return stored tallies for many decisions with a single IN query."""
+    ids = list(set(decision_ids))
+    counts = {decision_id: empty_counts() for decision_id in ids}
+    if not ids:
+        return counts
+
+    tallies = session.exec(select(VoteTally).where(VoteTally.decision_id.in_(ids))).all()
+    for tally in tallies:
+        counts[tally.decision_id] = {
+            "option_a": tally.option_a,
+            "option_b": tally.option_b,
+            "total": tally.total,
+        }
+    return counts
+
+
+def find_vote_counts(session: Session, decision_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+    """
+    Like get_vote_counts_bulk, but only for decisions that exist.
+
+    One query: decisions outer-joined to their tallies, so a missing decision
+    is absent from the result instead of reading as zero votes.
+    """
+    ids = list(set(decision_ids))
+    if not ids:
+        return {}
+
+    rows = session.exec(
+        select(Decision.id, VoteTally.option_a, VoteTally.option_b, VoteTally.total)
+        .outerjoin(VoteTally, VoteTally.decision_id == Decision.id)
+        .where(Decision.id.in_(ids))
+    ).all()
+    return {
+        decision_id: {"option_a": option_a or 0, "option_b": option_b or 0, "total": total or 0}
+        for decision_id, option_a, option_b, total in rows
+    }
+
+
+def _counted_tallies(session: Session) -> Dict[int, Dict[str, int]]:
+    """Recount every decision's votes straight from the vote table."""
+    option_a_choices = [c for c, column in CHOICE_COLUMNS.items() if column == "option_a"]
+    option_b_choices = [c for c, column in CHOICE_COLUMNS.items() if column == "option_b"]
+    rows = session.exec(
+        select(
+            Vote.decision_id,
+            func.sum(case((Vote.choice.in_(option_a_choices), 1), else_=0)),
+            func.sum(case((Vote.choice.in_(option_b_choices), 1), else_=0)),
+            func.count(Vote.id),
+        ).group_by(Vote.decision_id)
+    ).all()
+    return {
+        decision_id: {"option_a": a or 0, "option_b": b or 0, "total": total or 0}
+        for decision_id, a, b, total in rows
+    }
+
+
+def rebuild_vote_tallies(session: Session) -> int:
+    """
+    Reconcile stored tallies against the vote table and fix any drift.
+
+    Args:
+        session: Database session; committed on success
+
+    Returns:
+        Number of tally rows that were created or corrected
+    """
+    counted = _counted_tallies(session)
+    stored = {t.decision_id: t for t in session.exec(select(VoteTally)).all()}
+
+    fixed = 0
+    for decision_id, counts in counted.items():
+        tally = stored.pop(decision_id, None)
+        if tally is None:
+            session.add(VoteTally(decision_id=decision_id, **counts))
+            fixed += 1
+        elif (tally.option_a, tally.option_b, tally.total) != (
+            counts["option_a"], counts["option_b"], counts["total"]
+        ):
+            tally.option_a = counts["option_a"]
+            tally.option_b = counts["option_b"]
+            tally.total = counts["total"]
+            session.add(tally)
+            fixed += 1
+
+    # Whatever is left has no votes at all any more
+    for tally in stored.values():
+        if tally.total or tally.option_a or tally.option_b:
+            tally.option_a = tally.option_b = tally.total = 0
+            session.add(tally)
+            fixed += 1
+
+    session.commit()
+    return fixed
+
+
+if __name__ == "__main__":
+    from app.database import engine, create_db_and_tables
+
+    create_db_and_tables()
+    with Session(engine) as session:
+        fixed = rebuild_vote_tallies(session)
+    print(f"Vote tallies reconciled, {fixed} row(s) corrected")
@@ -0,0 +1,187 @@
+"""
+Fan-out-on-write timelines for the following feed.
+
+When a decision is posted, its id is pushed into every follower's inbox
+(the timeline_entry table) in the same transaction, with one INSERT ... SELECT
+over the author's followers. Reading the following feed is then a single
+range scan over (user_id, created_at, decision_id) instead of loading every
+Follow row and filtering decisions with a large IN list.
+
+Authors with more than TIMELINE_FANOUT_LIMIT followers are not fanned out:
+their posts would mean a huge write per decision. Their followers' feeds pull
+those decisions at read time (fan-out-on-read) and merge them with the inbox.
+The set of large authors is recomputed at startup and every
+TIMELINE_REFRESH_SECONDS, and both paths use it, so a decision never shows
+up twice. An author who drops back under the limit has their recent posts
+backfilled into their followers' inboxes.
+"""
+import logging
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import literal, true
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select, func, delete
+
+from app.models import Decision, Follow, TimelineEntry
+from app.pagination import encode_cursor, paginate
+from app.services.jobs import PeriodicTask, run_in_session
+
+logger = logging.getLogger(__name__)
+
+TIMELINE_FANOUT_LIMIT = int(os.getenv("TIMELINE_FANOUT_LIMIT", "5000"))
+# Decisions copied into an inbox on follow (and on leaving the large-author set)
+TIMELINE_BACKFILL = int(os.getenv("TIMELINE_BACKFILL", "200"))
+TIMELINE_REFRESH_SECONDS = float(os.getenv("TIMELINE_REFRESH_SECONDS", "300"))
+
+_COLUMNS = ["user_id", "decision_id", "author_id", "created_at"]
+_ORDER = (TimelineEntry.created_at, TimelineEntry.decision_id)
+
+
+def _insert_ignoring_duplicates(session: Session, rows) -> int:
+    """INSERT ... SELECT into timeline_entry, skipping entries that already exist."""
+    insert = postgresql_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+    statement = insert(TimelineEntry).from_select(_COLUMNS, rows).on_conflict_do_nothing()
+    return session.exec(statement).rowcount
+
+
+class Timelines:
+    def __init__(self, fanout_limit: int = TIMELINE_FANOUT_LIMIT):
+        self.fanout_limit = fanout_limit
+        self.large_authors: Set[int] = set()
+        self._refresher = PeriodicTask(
+            "Timeline large-author refresh", lambda: run_in_session(self.refresh_large_authors)
+        )
+        self.fanned_out = 0
+        self.skipped = 0
+
+    def fan_out(self, session: Session, decision: Decision) -> int:
+        """
+        Push a new decision into its author's followers' inboxes, inside the caller's transaction.
+
+        Returns:
+            Number of inboxes written (0 for a large-fanout author)
+        """
+        if decision.user_id in self.large_authors:
+            self.skipped += 1
+            return 0
+        followers = (
+            select(
+                Follow.follower_id,
+                literal(decision.id),
+                literal(decision.user_id),
+                literal(decision.created_at),
+            )
+            .where(Follow.following_id == decision.user_id)
+            .distinct()
+        )
+        written = _insert_ignoring_duplicates(session, followers)
+        self.fanned_out += 1
+        return written
+
+    def backfill(self, session: Session, author_id: int, follower_id: Optional[int] = None) -> int:
+        """
+        Copy an author's latest TIMELINE_BACKFILL decisions into one follower's inbox
+        (after a follow) or all of them (follower_id None). The caller commits.
+        """
+        if author_id in self.large_authors:
+            return 0
+        recent = (
+            select(Decision.id, Decision.user_id, Decision.created_at)
+            .where(Decision.user_id == author_id)
+            .order_by(Decision.created_at.desc(), Decision.id.desc())
+            .limit(TIMELINE_BACKFILL)
+            .subquery()
+        )
+        followers = select(Follow.follower_id).where(Follow.following_id == author_id)
+        if follower_id is not None:
+            followers = followers.where(Follow.follower_id == follower_id)
+        followers = followers.distinct().subquery()
+        rows = select(followers.c.follower_id, recent.c.id, recent.c.user_id, recent.c.created_at) \
+            .select_from(followers).join(recent, true())
+        return _insert_ignoring_duplicates(session, rows)
+
+    def remove(self, session: Session, follower_id: int, author_id: int) -> None:
+        """Drop an unfollowed author's decisions from an inbox. The caller commits."""
+        session.exec(delete(TimelineEntry).where(
+            TimelineEntry.user_id == follower_id,
+            TimelineEntry.author_id == author_id
+        ))
+
+    def refresh_large_authors(self, session: Session) -> Set[int]:
+        """Recompute which authors are read-time only, backfilling any that dropped out."""
+        large = set(session.exec(
+            select(Follow.following_id)
+            .group_by(Follow.following_id)
+            .having(func.count(Follow.id) > self.fanout_limit)
+        ).all())
+        dropped = self.large_authors - large
+        self.large_authors = large
+        for author_id in dropped:
+            self.backfill(session, author_id)
+        if dropped:
+            session.commit()
+            logger.info(f"Backfilled timelines for {len(dropped)} author(s) back under the fan-out limit")
+        return large
+
+    def page(
+        self,
+        session: Session,
+        user_id: int,
+        limit: int,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Decision], Optional[str]]:
+        """
+        A page of the user's following feed, newest first.
+
+        Returns:
+            The page of decisions and the cursor for the next page (None on the last page)
+        """
+        inbox = (
+            select(Decision)
+            .join(TimelineEntry, TimelineEntry.decision_id == Decision.id)
+            .where(TimelineEntry.user_id == user_id)
+        )
+        pulled_authors = []
+        if self.large_authors:
+            pulled_authors = list(session.exec(
+                select(Follow.following_id).where(
+                    Follow.follower_id == user_id,
+                    Follow.following_id.in_(self.large_authors)
+                )
+            ).all())
+        if not pulled_authors:
+            return paginate(session, inbox, Decision, limit, offset, cursor, order=_ORDER)
+
+        # Fan-out-on-read: merge the large authors' own decisions with the inbox.
+        # Entries pushed before an author became large are skipped to avoid repeats.
+        inbox = inbox.where(TimelineEntry.author_id.not_in(pulled_authors))
+        pulled = select(Decision).where(Decision.user_id.in_(pulled_authors))
+        skip = 0 if cursor else offset
+        pushed, more_pushed = paginate(session, inbox, Decision, skip + limit, 0, cursor, order=_ORDER)
+        read, more_read = paginate(session, pulled, Decision, skip + limit, 0, cursor)
+        merged = sorted(pushed + read, key=lambda decision: (decision.created_at, decision.id), reverse=True)
+
+        decisions = merged[skip:skip + limit]
+        has_more = bool(more_pushed or more_read) or len(merged) > skip + limit
+        next_cursor = encode_cursor(decisions[-1].created_at, decisions[-1].id) if has_more and decisions else None
+        return decisions, next_cursor
+
+    async def start(self, interval: float = TIMELINE_REFRESH_SECONDS) -> None:
+        await self._refresher.start(interval)
+
+    async def stop(self) -> None:
+        await self._refresher.stop()
+
+    def metrics(self) -> Dict[str, object]:
+        return {
+            "fanout_limit": self.fanout_limit,
+            "large_authors": len(self.large_authors),
+            "fanned_out": self.fanned_out,
+            "skipped": self.skipped,
+        }
+
+
+timelines = Timelines()
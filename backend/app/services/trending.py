@@ -0,0 +1,129 @@
+"""
+Trending ("hot") scores for the sort=hot decisions feed.
+
+Ranking by engagement at query time would mean aggregating votes and comments
+over every decision for each page. Instead every decision has a row in the
+decision_score table, indexed on (score, decision_id), so a hot page is one
+index range scan, the same cost as the newest-first feed.
+
+    score = (1 + HOT_VOTE_WEIGHT * recent votes + HOT_COMMENT_WEIGHT * recent comments)
+            / (age in hours + 2) ** HOT_GRAVITY
+
+"Recent" is the last HOT_VELOCITY_HOURS, so the numerator follows vote and
+comment velocity while the denominator decays every decision with age.
+create_decision stores a new decision's starting score; refresh() recomputes
+the decisions younger than HOT_MAX_AGE_HOURS every HOT_REFRESH_SECONDS and
+settles older ones at 0, where the feed continues newest-first (ties break
+on decision id).
+"""
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import exists, insert, literal
+from sqlmodel import Session, select, func, update
+
+from app.models import Comment, Decision, DecisionScore, Vote
+from app.services.jobs import PeriodicTask, run_in_session
+
+logger = logging.getLogger(__name__)
+
+HOT_VOTE_WEIGHT = float(os.getenv("HOT_VOTE_WEIGHT", "1.0"))
+HOT_COMMENT_WEIGHT = float(os.getenv("HOT_COMMENT_WEIGHT", "2.0"))
+HOT_GRAVITY = float(os.getenv("HOT_GRAVITY", "1.5"))
+HOT_VELOCITY_HOURS = float(os.getenv("HOT_VELOCITY_HOURS", "24"))
+HOT_MAX_AGE_HOURS = float(os.getenv("HOT_MAX_AGE_HOURS", "168"))
+HOT_REFRESH_SECONDS = float(os.getenv("HOT_REFRESH_SECONDS", "60"))
+
+
+def hot_score(recent_votes: int, recent_comments: int, age_hours: float) -> float:
+    engagement = 1 + HOT_VOTE_WEIGHT * recent_votes + HOT_COMMENT_WEIGHT * recent_comments
+    return engagement / (max(age_hours, 0.0) + 2) ** HOT_GRAVITY
+
+
+def initial_score() -> float:
+    """Score of a decision that was just posted."""
+    return hot_score(0, 0, 0.0)
+
+
+def _recent_counts(session: Session, model, since: datetime, cutoff: datetime) -> Dict[int, int]:
+    """Rows of model (Vote or Comment) per decision since `since`, for decisions posted after `cutoff`."""
+    rows = session.exec(
+        select(model.decision_id, func.count(model.id))
+        .join(Decision, Decision.id == model.decision_id)
+        .where(Decision.created_at >= cutoff, model.created_at >= since)
+        .group_by(model.decision_id)
+    ).all()
+    return dict(rows)
+
+
+class TrendingScores:
+    def __init__(self):
+        self._refresher = PeriodicTask("Trending score refresh", lambda: run_in_session(self.refresh))
+        self.refreshed_at: Optional[datetime] = None
+        self.last_refreshed = 0
+
+    def refresh(self, session: Session, now: Optional[datetime] = None) -> int:
+        """
+        Recompute the scores of recent decisions.
+
+        Args:
+            session: Database session; committed on success
+            now: Reference time (defaults to utcnow)
+
+        Returns:
+            Number of decisions rescored
+        """
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(hours=HOT_MAX_AGE_HOURS)
+        since = now - timedelta(hours=HOT_VELOCITY_HOURS)
+
+        # Decisions posted before this table existed (or outside create_decision)
+        session.exec(insert(DecisionScore).from_select(
+            ["decision_id", "score", "updated_at"],
+            select(Decision.id, literal(0.0), literal(now))
+            .where(~exists().where(DecisionScore.decision_id == Decision.id))
+        ))
+
+        votes = _recent_counts(session, Vote, since, cutoff)
+        comments = _recent_counts(session, Comment, since, cutoff)
+        recent = session.exec(select(Decision.id, Decision.created_at).where(Decision.created_at >= cutoff)).all()
+        scores = [
+            {
+                "decision_id": decision_id,
+                "score": hot_score(
+                    votes.get(decision_id, 0),
+                    comments.get(decision_id, 0),
+                    (now - created_at).total_seconds() / 3600
+                ),
+                "updated_at": now,
+            }
+            for decision_id, created_at in recent
+        ]
+        if scores:
+            # Bulk UPDATE by primary key, one executemany
+            session.execute(update(DecisionScore), scores)
+
+        # Aged out of the window: settle at 0 so the tail of the feed is newest-first
+        session.exec(
+            update(DecisionScore)
+            .where(
+                DecisionScore.score > 0,
+                DecisionScore.decision_id.in_(select(Decision.id).where(Decision.created_at < cutoff))
+            )
+            .values(score=0.0, updated_at=now)
+        )
+        session.commit()
+
+        self.refreshed_at = now
+        self.last_refreshed = len(scores)
+        return len(scores)
+
+    async def start(self, interval: float = HOT_REFRESH_SECONDS) -> None:
+        await self._refresher.start(interval)
+
+    async def stop(self) -> None:
+        await self._refresher.stop()
+
+trending = TrendingScores()
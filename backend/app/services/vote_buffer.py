@@ -0,0 +1,327 @@
+"""
+Optional write-behind buffer for vote ingestion.
+
+Instead of one transaction per POST /votes/, validated votes are queued in
+memory and written in batches: every VOTE_BUFFER_FLUSH_MS milliseconds, or as
+soon as VOTE_BUFFER_BATCH_SIZE votes are waiting. A batch is one transaction
+of upserts (tallies.cast_vote), so a viral decision costs one commit per batch
+instead of one per vote.
+
+Durability, by VOTE_BUFFER_MODE:
+    off        Default. Every vote commits before the response (no buffer).
+    committed  Group commit: the request waits until its batch has committed,
+               so a 2xx still means the vote is in the database. Batching only
+               adds up to one flush interval of latency.
+    queued     Write-behind: the request gets 202 once the vote is queued.
+               A graceful shutdown flushes everything, but a crash or kill -9
+               loses votes accepted since the last flush (at most one flush
+               interval, never more than VOTE_BUFFER_MAX_PENDING votes).
+
+Pending votes are overlaid on the counts this process serves, so a voter
+sees their own vote immediately. Each worker process has its own buffer, so
+with several workers that holds only for requests routed to the same one.
+When VOTE_BUFFER_MAX_PENDING votes are waiting, new votes are refused with
+VoteBufferFull (the router answers 503 + Retry-After) rather than growing
+without bound.
+"""
+import asyncio
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.models import Vote
+from app.services.tallies import CHOICE_COLUMNS, apply_count_delta, cast_vote, vote_count_delta
+
+logger = logging.getLogger(__name__)
+
+VOTE_BUFFER_MODE = os.getenv("VOTE_BUFFER_MODE", "off").lower()
+VOTE_BUFFER_FLUSH_MS = int(os.getenv("VOTE_BUFFER_FLUSH_MS", "50"))
+VOTE_BUFFER_BATCH_SIZE = int(os.getenv("VOTE_BUFFER_BATCH_SIZE", "500"))
+VOTE_BUFFER_MAX_PENDING = int(os.getenv("VOTE_BUFFER_MAX_PENDING", "10000"))
+
+VoteKey = Tuple[int, int]  # (user_id, decision_id)
+
+
+class VoteBufferFull(Exception):
+    """Raised when the buffer already holds max_pending votes."""
+
+
+class _PendingVote:
+    __slots__ = ("user_id", "decision_id", "choice", "previous_column", "futures")
+
+    def __init__(self, user_id: int, decision_id: int, choice: str, previous_column: Optional[str]):
+        self.user_id = user_id
+        self.decision_id = decision_id
+        self.choice = choice
+        # Option the stored vote had when this was queued (None: no stored vote)
+        self.previous_column = previous_column
+        self.futures: List[asyncio.Future] = []
+
+    def count_delta(self) -> Dict[str, int]:
+        return vote_count_delta(self.choice, self.previous_column)
+
+
+class VoteBuffer:
+    def __init__(
+        self,
+        mode: str = VOTE_BUFFER_MODE,
+        flush_interval: float = VOTE_BUFFER_FLUSH_MS / 1000,
+        batch_size: int = VOTE_BUFFER_BATCH_SIZE,
+        max_pending: int = VOTE_BUFFER_MAX_PENDING
+    ):
+        if mode not in ("off", "committed", "queued"):
+            raise ValueError(f"VOTE_BUFFER_MODE must be off, committed or queued, not {mode!r}")
+        self.mode = mode
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        # Waiting for a flush, and taken by the flush currently writing; both
+        # count as pending for overlays until their transaction commits
+        self._pending: "OrderedDict[VoteKey, _PendingVote]" = OrderedDict()
+        self._flushing: Dict[VoteKey, _PendingVote] = {}
+        # Overlays are read from threadpool routes too
+        self._lock = threading.Lock()
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+        self.accepted = 0
+        self.rejected = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    async def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        self._batch_ready = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Vote buffer started ({self.mode}, flush every {self.flush_interval * 1000:g} ms "
+            f"or {self.batch_size} votes, max {self.max_pending} pending)"
+        )
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write out everything still queued."""
+        if self._task is None:
+            return
+        # Let an in-progress batch finish rather than cancelling it mid-write
+        self._stopping = True
+        self._batch_ready.set()
+        await self._task
+        self._task = None
+        while self._pending:
+            await self.flush()
+
+    def pending_column(self, user_id: int, decision_id: int) -> Tuple[bool, Optional[str]]:
+        """
+        The option a queued-but-unwritten vote by this user would store.
+
+        Returns:
+            (whether a vote is pending, its option column)
+        """
+        key = (user_id, decision_id)
+        with self._lock:
+            entry = self._pending.get(key) or self._flushing.get(key)
+            return (True, CHOICE_COLUMNS[entry.choice]) if entry else (False, None)
+
+    def submit(self, user_id: int, decision_id: int, choice: str, previous_column: Optional[str]) -> asyncio.Future:
+        """
+        Queue a validated vote; a newer vote by the same user on the same decision replaces it.
+
+        Args:
+            previous_column: The option of the vote this one replaces, None for a first vote
+
+        Returns:
+            Future resolving to the stored Vote once its batch commits
+
+        Raises:
+            VoteBufferFull: max_pending votes are already waiting
+        """
+        key = (user_id, decision_id)
+        future = asyncio.get_running_loop().create_future()
+        # In queued mode nobody awaits; don't warn about unretrieved errors
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                if len(self._pending) >= self.max_pending:
+                    self.rejected += 1
+                    raise VoteBufferFull(f"{len(self._pending)} votes waiting to be written")
+                in_flight = self._flushing.get(key)
+                if in_flight is not None:
+                    # Replaces a vote being written right now; that write lands first
+                    previous_column = CHOICE_COLUMNS[in_flight.choice]
+                entry = self._pending[key] = _PendingVote(user_id, decision_id, choice, previous_column)
+            else:
+                # Coalesce: keep the stored-vote baseline, take the newest choice
+                entry.choice = choice
+            entry.futures.append(future)
+            self.accepted += 1
+            queued = len(self._pending)
+        if self._task is None:
+            # No flush loop (e.g. lifespan not run); write straight away
+            asyncio.ensure_future(self.flush())
+        elif queued >= self.batch_size:
+            self._batch_ready.set()
+        return future
+
+    def count_deltas(self, decision_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+        """Net change pending votes will make to each decision's tally."""
+        wanted = set(decision_ids)
+        deltas: Dict[int, Dict[str, int]] = {}
+        with self._lock:
+            if not self._pending and not self._flushing:
+                return deltas
+            for entry in list(self._flushing.values()) + list(self._pending.values()):
+                if entry.decision_id not in wanted:
+                    continue
+                counts = deltas.setdefault(entry.decision_id, {})
+                for column, delta in entry.count_delta().items():
+                    counts[column] = counts.get(column, 0) + delta
+        return deltas
+
+    def overlay_counts(self, counts_by_decision: Dict[int, Dict[str, int]]) -> Dict[int, Dict[str, int]]:
+        """Add pending votes to stored tallies in place, for read-your-writes."""
+        for decision_id, delta in self.count_deltas(counts_by_decision).items():
+            counts = counts_by_decision[decision_id]
+            for column, change in delta.items():
+                counts[column] = counts.get(column, 0) + change
+        return counts_by_decision
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Vote buffer flush failed: {e}")
+            if len(self._pending) >= self.batch_size:
+                # Still a full batch waiting; don't sit out the interval
+                self._batch_ready.set()
+
+    async def flush(self) -> int:
+        """Write up to batch_size queued votes in one transaction. Returns how many were written."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        # One batch at a time: _flushing belongs to the flush holding the lock
+        async with self._flush_lock:
+            return await self._flush_batch()
+
+    async def _flush_batch(self) -> int:
+        with self._lock:
+            if not self._pending:
+                return 0
+            while self._pending and len(self._flushing) < self.batch_size:
+                key, entry = self._pending.popitem(last=False)
+                self._flushing[key] = entry
+            batch = list(self._flushing.values())
+
+        try:
+            stored = await self._write(batch)
+        except Exception as e:
+            # Couldn't even open a session; fail the whole batch
+            self.failed += len(batch)
+            logger.error(f"Dropping {len(batch)} buffered vote(s): {e}")
+            stored = {(entry.user_id, entry.decision_id): e for entry in batch}
+        finally:
+            with self._lock:
+                self._flushing.clear()
+
+        for entry in batch:
+            result = stored.get((entry.user_id, entry.decision_id))
+            for future in entry.futures:
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        self.batches += 1
+        return len(batch)
+
+    async def _write(self, batch: List[_PendingVote]) -> Dict[VoteKey, object]:
+        from app.database import async_engine
+        from sqlmodel.ext.asyncio.session import AsyncSession
+
+        new_votes: List[Vote] = []
+
+        def write_votes(session, entries) -> Dict[VoteKey, Optional[Vote]]:
+            written = {}
+            # One tally UPDATE per decision per batch rather than one per vote
+            deltas: Dict[int, Dict[str, int]] = {}
+            for entry in entries:
+                result = cast_vote(session, entry.user_id, entry.decision_id, entry.choice, update_tally=False)
+                # None: the stored vote already had this option
+                written[(entry.user_id, entry.decision_id)] = result[0] if result else None
+                if result and result[1] is None:
+                    new_votes.append(result[0])
+                if result:
+                    summed = deltas.setdefault(entry.decision_id, {})
+                    for column, change in vote_count_delta(entry.choice, result[1]).items():
+                        summed[column] = summed.get(column, 0) + change
+            for decision_id, delta in deltas.items():
+                apply_count_delta(session, decision_id, delta)
+            return written
+
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            try:
+                stored = await session.run_sync(write_votes, batch)
+                await session.commit()
+                self.flushed += len(batch)
+                self._record_new_votes(new_votes)
+                return stored
+            except Exception as e:
+                await session.rollback()
+                logger.warning(f"Vote batch of {len(batch)} failed ({e}); retrying votes one by one")
+
+        # Isolate the bad vote(s) so the rest of the batch still lands
+        stored: Dict[VoteKey, object] = {}
+        for entry in batch:
+            key = (entry.user_id, entry.decision_id)
+            async with AsyncSession(async_engine, expire_on_commit=False) as session:
+                try:
+                    new_votes.clear()
+                    stored.update(await session.run_sync(write_votes, [entry]))
+                    await session.commit()
+                    self.flushed += 1
+                    self._record_new_votes(new_votes)
+                except Exception as e:
+                    await session.rollback()
+                    self.failed += 1
+                    logger.error(f"Dropping vote {key!r}: {e}")
+                    stored[key] = e
+        return stored
+
+    @staticmethod
+    def _record_new_votes(votes: List[Vote]) -> None:
+        from app.services.leaderboards import leaderboards
+
+        for vote in votes:
+            leaderboards.record_vote(vote.user_id, vote.decision_id, vote.id)
+
+    def metrics(self) -> Dict[str, object]:
+        return {
+            "mode": self.mode,
+            "pending": len(self._pending),
+            "flushing": len(self._flushing),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failed": self.failed,
+        }
+
+
+vote_buffer = VoteBuffer()
@@ -0,0 +1,164 @@
+"""
+Throughput of async def routes under parallel clients: the old pattern (a sync
+Session used inside async def, blocking the event loop on every query) against
+the AsyncSession the routers now use.
+
+Run from the backend directory:
+    python -m benchmarks.concurrency_benchmark --decisions 20000 --requests 200
+
+--latency-ms adds a simulated network round trip to every statement, as with a
+hosted Postgres: the sync variant sleeps on the event loop thread the way a
+blocking driver waits, the async one awaits it. Local SQLite alone is mostly
+CPU-bound, so with 0 ms the two modes come out about even on a single core.
+
+Uses a throwaway SQLite database unless DATABASE_URL is already set. Keep the
+client count within the sync pool size (15 connections by default): past that
+the blocking variant deadlocks until the pool checkout times out, since the
+sessions holding connections can't be closed while the loop is blocked.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/concurrency_benchmark.db"
+
+import aiosqlite
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import event
+from sqlmodel import Session, select, func
+
+from app.database import create_db_and_tables, engine, get_session
+from app.models import Decision, Follow, User, VoteTally
+from app.routers import users
+
+
+def seed(num_users: int, num_decisions: int) -> None:
+    rng = random.Random(7)
+    with Session(engine) as session:
+        if session.exec(select(func.count(Decision.id))).one() >= num_decisions:
+            return
+        users_ = [User(username=f"bench{i}", email=f"bench{i}@example.com", password_hash="-") for i in range(num_users)]
+        session.add_all(users_)
+        session.flush()
+        decisions = [
+            Decision(user_id=rng.choice(users_).id, content=f"Benchmark decision {i}", option_a="Do it", option_b="Don't")
+            for i in range(num_decisions)
+        ]
+        session.add_all(decisions)
+        session.flush()
+        session.add_all([VoteTally(decision_id=decision.id) for decision in decisions])
+        session.commit()
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(users.router, prefix="/api")
+
+    # The pre-async user search: same query, but run on the event loop thread
+    @app.get("/legacy/users/")
+    async def legacy_search_users(q: str, session: Session = Depends(get_session)):
+        return session.exec(select(User).where(User.username.ilike(f"%{q}%")).limit(20)).all()
+
+    # The pre-async profile stats: three counts on a blocking session
+    @app.get("/legacy/users/{user_id}")
+    async def legacy_get_user(user_id: int, session: Session = Depends(get_session)):
+        user = session.get(User, user_id)
+        return {
+            **user.dict(),
+            "decisions_count": session.exec(select(func.count(Decision.id)).where(Decision.user_id == user_id)).first(),
+            "followers_count": session.exec(select(func.count(Follow.id)).where(Follow.following_id == user_id)).first(),
+            "following_count": session.exec(select(func.count(Follow.id)).where(Follow.follower_id == user_id)).first()
+        }
+
+    return app
+
+
+def add_latency(latency: float) -> None:
+    """Delay every statement on both engines by a simulated network round trip."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def blocking_round_trip(*_):
+        time.sleep(latency)
+
+    execute = aiosqlite.Cursor.execute
+
+    async def awaited_round_trip(self, *args, **kwargs):
+        await asyncio.sleep(latency)
+        return await execute(self, *args, **kwargs)
+
+    aiosqlite.Cursor.execute = awaited_round_trip
+
+
+async def run(client: httpx.AsyncClient, paths, concurrency: int):
+    latencies = []
+    queue = list(paths)
+
+    async def worker():
+        while queue:
+            path = queue.pop()
+            start = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, latencies
+
+
+def pct(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+
+async def main_async(args) -> None:
+    app = build_app()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm up both engines' connection pools
+        await client.get("/api/users/?q=bench1")
+        await client.get("/legacy/users/?q=bench1")
+
+        print(f"{'route':<22}{'mode':<8}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for route, new_path, old_path in (
+            ("user search", "/api/users/?q=bench{id}", "/legacy/users/?q=bench{id}"),
+            ("user profile", "/api/users/{id}", "/legacy/users/{id}"),
+        ):
+            for concurrency in args.concurrency:
+                for mode, template in (("sync", old_path), ("async", new_path)):
+                    paths = [template.format(id=(i % args.users) + 1) for i in range(args.requests)]
+                    throughput, latencies = await run(client, paths, concurrency)
+                    print(
+                        f"{route:<22}{mode:<8}{concurrency:>8}{throughput:>10.1f}"
+                        f"{pct(latencies, 50) * 1000:>10.1f}{pct(latencies, 95) * 1000:>10.1f}"
+                    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--decisions", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 12])
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    create_db_and_tables()
+    start = time.perf_counter()
+    seed(args.users, args.decisions)
+    print(f"Database: {os.environ['DATABASE_URL']} (seeded in {time.perf_counter() - start:.1f}s)")
+    print(f"Simulated round trip per statement: {args.latency_ms:g} ms")
+    if args.latency_ms > 0:
+        add_latency(args.latency_ms / 1000)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Login throughput and feed latency during a login storm: password verification
+on the event loop thread (the old login route) against the hashing pool the
+auth routes now use.
+
+Run from the backend directory:
+    python -m benchmarks.password_benchmark --logins 40 --login-clients 8
+
+While the storm runs, one client keeps requesting the decisions feed; its
+p99 shows how long other requests wait behind password hashing. Argon2 cost
+comes from ARGON2_TIME_COST / ARGON2_MEMORY_COST_KIB / ARGON2_PARALLELISM and
+the pool size from PASSWORD_HASH_WORKERS, as in the app.
+
+Uses a throwaway SQLite database unless DATABASE_URL is already set.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/password_benchmark.db"
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from sqlmodel import Session, select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.auth import ARGON2_MEMORY_COST, ARGON2_TIME_COST, PASSWORD_HASH_WORKERS, authenticate_user, get_password_hash
+from app.database import create_db_and_tables, engine, get_async_session
+from app.models import Decision, User, VoteTally
+from app.routers import decisions, users
+
+PASSWORD = "benchmark-password"
+
+
+def seed(num_users: int, num_decisions: int) -> None:
+    with Session(engine) as session:
+        if session.exec(select(func.count(User.id))).one() >= num_users:
+            return
+        # One hash for everyone; verification cost is the same
+        password_hash = get_password_hash(PASSWORD)
+        users_ = [
+            User(username=f"bench{i}", email=f"bench{i}@example.com", password_hash=password_hash)
+            for i in range(num_users)
+        ]
+        session.add_all(users_)
+        session.flush()
+        decisions_ = [
+            Decision(user_id=users_[i % num_users].id, content=f"Benchmark decision {i}", option_a="Do it", option_b="Don't")
+            for i in range(num_decisions)
+        ]
+        session.add_all(decisions_)
+        session.flush()
+        session.add_all([VoteTally(decision_id=decision.id) for decision in decisions_])
+        session.commit()
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(users.router, prefix="/api")
+    app.include_router(decisions.router, prefix="/api")
+
+    # The pre-pool login: verification runs on the event loop thread
+    @app.post("/legacy/auth/login")
+    async def legacy_login(credentials: users.UserLogin, session: AsyncSession = Depends(get_async_session)):
+        user = await session.run_sync(authenticate_user, credentials.username, credentials.password)
+        if not user:
+            raise HTTPException(status_code=401)
+        return {"user_id": user.id}
+
+    return app
+
+
+def pct(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+
+async def storm(client: httpx.AsyncClient, path: str, args):
+    """Run the login storm while one client polls the feed."""
+    queue = [f"bench{i % args.users}" for i in range(args.logins)]
+    feed_latencies = []
+    done = asyncio.Event()
+
+    async def login_worker():
+        while queue:
+            username = queue.pop()
+            response = await client.post(path, json={"username": username, "password": PASSWORD})
+            response.raise_for_status()
+
+    async def feed_client():
+        while not done.is_set():
+            start = time.perf_counter()
+            response = await client.get("/api/decisions/?limit=20")
+            response.raise_for_status()
+            feed_latencies.append(time.perf_counter() - start)
+
+    feed = asyncio.create_task(feed_client())
+    start = time.perf_counter()
+    await asyncio.gather(*(login_worker() for _ in range(args.login_clients)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await feed
+    return args.logins / elapsed, feed_latencies
+
+
+async def main_async(args) -> None:
+    app = build_app()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Warm up connection pools and the hashing pool
+        await client.get("/api/decisions/?limit=20")
+        await client.post("/api/auth/login", json={"username": "bench0", "password": PASSWORD})
+
+        idle = []
+        for _ in range(50):
+            start = time.perf_counter()
+            await client.get("/api/decisions/?limit=20")
+            idle.append(time.perf_counter() - start)
+        print(f"Feed with no logins: p50 {pct(idle, 50) * 1000:.1f} ms, p99 {pct(idle, 99) * 1000:.1f} ms\n")
+
+        print(f"{'login hashing':<16}{'logins/s':>10}{'feed reqs':>11}{'feed p50 ms':>13}{'feed p99 ms':>13}")
+        for mode, path in (("event loop", "/legacy/auth/login"), ("thread pool", "/api/auth/login")):
+            throughput, latencies = await storm(client, path, args)
+            print(
+                f"{mode:<16}{throughput:>10.1f}{len(latencies):>11}"
+                f"{pct(latencies, 50) * 1000:>13.1f}{pct(latencies, 99) * 1000:>13.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--decisions", type=int, default=2000)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--login-clients", type=int, default=8)
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    create_db_and_tables()
+    seed(args.users, args.decisions)
+    print(f"Database: {os.environ['DATABASE_URL']}")
+    print(
+        f"Argon2 time_cost={ARGON2_TIME_COST} memory={ARGON2_MEMORY_COST} KiB, "
+        f"{PASSWORD_HASH_WORKERS} hashing worker(s), {os.cpu_count()} CPU(s)"
+    )
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
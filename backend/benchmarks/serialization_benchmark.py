@@ -0,0 +1,113 @@
+"""
+Serialization time and bytes per feed page: the old dict-spread items
+(decision.dict() plus the full user.dict(), through jsonable_encoder and
+json.dumps) against the typed DecisionItem schema rendered the way the app
+now does it (pydantic-core, then orjson).
+
+Run from the backend directory:
+    python -m benchmarks.serialization_benchmark --page-sizes 20 100
+
+Works on in-memory rows, so it measures only response building and encoding,
+not the queries behind them. Brotli sizes are shown when the brotli package
+is installed.
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.compression import BROTLI_QUALITY, GZIP_LEVEL, brotli
+from app.models import Decision, User
+from app.responses import ORJSONResponse
+from app.schemas import DecisionItem, FeedResponse, UserSummary
+
+feed_adapter = TypeAdapter(FeedResponse)
+
+
+def make_rows(page_size: int, num_authors: int = 10):
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    users = [
+        User(
+            id=i, username=f"user{i}", email=f"user{i}@example.com",
+            password_hash="$argon2id$v=19$m=65536,t=3,p=4$" + "x" * 64,
+            bio="Trying to make better decisions, one vote at a time.", created_at=now
+        )
+        for i in range(1, num_authors + 1)
+    ]
+    decisions = [
+        Decision(
+            id=i, user_id=rng.choice(users).id,
+            content=f"Should I take the new job offer in another city? Option {i} has been on my mind all week.",
+            option_a="Take the job", option_b="Stay where I am",
+            created_at=now - timedelta(minutes=i)
+        )
+        for i in range(1, page_size + 1)
+    ]
+    tallies = {d.id: {"option_a": rng.randrange(100), "option_b": rng.randrange(100), "total": 0} for d in decisions}
+    return users, decisions, tallies
+
+
+def legacy_page(users, decisions, tallies) -> bytes:
+    authors = {user.id: user.dict() for user in users}
+    items = [
+        {**decision.dict(), "user": authors.get(decision.user_id), "vote_counts": tallies[decision.id]}
+        for decision in decisions
+    ]
+    # What FastAPI + JSONResponse did with an untyped route
+    return json.dumps(
+        jsonable_encoder(items), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode()
+
+
+def typed_page(users, decisions, tallies) -> bytes:
+    authors = {user.id: UserSummary.model_validate(user) for user in users}
+    items = [
+        DecisionItem(
+            id=decision.id, user_id=decision.user_id, content=decision.content,
+            option_a=decision.option_a, option_b=decision.option_b, created_at=decision.created_at,
+            user=authors.get(decision.user_id), vote_counts=tallies[decision.id]
+        )
+        for decision in decisions
+    ]
+    # What FastAPI does with response_model=FeedResponse and the ORJSONResponse default class
+    content = feed_adapter.dump_python(feed_adapter.validate_python(items), mode="json")
+    return ORJSONResponse(content).body
+
+
+def timed(fn, args, repeat: int):
+    fn(*args)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = fn(*args)
+    return (time.perf_counter() - start) / repeat, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[20, 100])
+    parser.add_argument("--repeat", type=int, default=300)
+    args = parser.parse_args()
+
+    header = f"{'items':>6}  {'format':<8}{'ms/page':>9}{'bytes':>9}{'gzip':>8}"
+    print(header + (f"{'brotli':>8}" if brotli else "  (brotli not installed)"))
+    for page_size in args.page_sizes:
+        rows = make_rows(page_size)
+        for name, fn in (("legacy", legacy_page), ("typed", typed_page)):
+            seconds, body = timed(fn, rows, args.repeat)
+            line = (
+                f"{page_size:>6}  {name:<8}{seconds * 1000:>9.3f}{len(body):>9}"
+                f"{len(gzip.compress(body, compresslevel=GZIP_LEVEL)):>8}"
+            )
+            if brotli:
+                line += f"{len(brotli.compress(body, quality=BROTLI_QUALITY)):>8}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Compare the LSH similarity index against the old full SequenceMatcher scan.
+
+Run from the backend directory:
+    python -m benchmarks.similarity_benchmark --decisions 5000 --queries 50
+"""
+import argparse
+import random
+import statistics
+import time
+from difflib import SequenceMatcher
+
+from app.services.similarity import SimilarityIndex
+
+SUBJECTS = [
+    "quit my job", "move to another city", "buy a new car", "adopt a dog", "go back to school",
+    "start a business", "break up with my partner", "learn to code", "sell my house", "travel solo",
+    "ask for a raise", "get a tattoo", "run a marathon", "dye my hair", "switch careers",
+]
+FRAMES = [
+    "Should I {s}?", "Thinking about whether to {s} this year", "Is it a good idea to {s}",
+    "I really want to {s} but I'm scared", "Would you {s} if you were me?", "{s} or wait another year",
+]
+
+
+def make_text(rng: random.Random) -> str:
+    text = rng.choice(FRAMES).format(s=rng.choice(SUBJECTS))
+    if rng.random() < 0.5:
+        text += " " + rng.choice(["honestly", "right now", "before summer", "at 30", "with no savings"])
+    return text
+
+
+def brute_force(corpus, text, threshold):
+    lowered = text.lower()
+    scored = [
+        (decision_id, SequenceMatcher(None, lowered, content.lower()).ratio())
+        for decision_id, content in corpus.items()
+    ]
+    scored = [item for item in scored if item[1] > threshold]
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--decisions", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--threshold", type=float, default=0.3)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    corpus = {i: make_text(rng) for i in range(1, args.decisions + 1)}
+    queries = [make_text(rng) for _ in range(args.queries)]
+
+    index = SimilarityIndex()
+    start = time.perf_counter()
+    for decision_id, content in corpus.items():
+        index.add(decision_id, content)
+    build_seconds = time.perf_counter() - start
+
+    scan_times, index_times, recalls = [], [], []
+    for text in queries:
+        start = time.perf_counter()
+        expected = brute_force(corpus, text, args.threshold)[:args.top_k]
+        scan_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        found = index.query(text, min_similarity=args.threshold)[:args.top_k]
+        index_times.append(time.perf_counter() - start)
+
+        if expected:
+            # Count hits by score so ties between equal texts don't count as misses
+            cutoff = expected[-1][1]
+            hits = sum(1 for _, score in found if score >= cutoff)
+            recalls.append(min(hits, len(expected)) / len(expected))
+
+    print(f"decisions={args.decisions} queries={args.queries} top_k={args.top_k}")
+    print(f"index build: {build_seconds * 1000:.0f} ms ({build_seconds / args.decisions * 1e6:.0f} us/decision)")
+    print(f"full scan:   p50 {statistics.median(scan_times) * 1000:.1f} ms  max {max(scan_times) * 1000:.1f} ms")
+    print(f"lsh index:   p50 {statistics.median(index_times) * 1000:.1f} ms  max {max(index_times) * 1000:.1f} ms")
+    if recalls:
+        print(f"recall@{args.top_k}: mean {statistics.mean(recalls):.3f}  min {min(recalls):.3f}")
+
+
+if __name__ == "__main__":
+    main()
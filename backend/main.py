@@ -3,8 +3,18 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 import os
-from app.database import create_db_and_tables
+from sqlmodel import Session
+from app.database import create_db_and_tables, engine, async_engine
+from app.services.similarity import similarity_index
+from app.services.jobs import job_queue
+from app.services.vote_buffer import vote_buffer
+from app.services.leaderboards import leaderboards
+from app.services.trending import trending
+from app.services.timelines import timelines
+from app.services.live_counts import vote_hub
 from app.routers import decisions, votes, users, leaderboard, about, comments
+from app.responses import ORJSONResponse
+from app.compression import CompressionMiddleware
 
 # Lifecycle event to create DB on startup
 from contextlib import asynccontextmanager
@@ -12,13 +22,33 @@ from contextlib import asynccontextmanager
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
+    with Session(engine) as session:
+        similarity_index.rebuild(session)
+        leaderboards.rebuild(session)
+        trending.refresh(session)
+        timelines.refresh_large_authors(session)
+    await job_queue.start()
+    await vote_buffer.start()
+    await leaderboards.start()
+    await trending.start()
+    await timelines.start()
+    await vote_hub.start()
     yield
+    # Flush buffered votes before the engine goes away
+    await vote_buffer.stop()
+    await leaderboards.stop()
+    await trending.stop()
+    await timelines.stop()
+    await vote_hub.stop()
+    await job_queue.stop()
+    await async_engine.dispose()
 
 app = FastAPI(
     title="Parallel API",
     description="Decision-making social platform API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Mount static files from frontend build directory if it exists
@@ -35,6 +65,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Brotli or gzip for larger responses (feed pages, comment threads)
+app.add_middleware(CompressionMiddleware)
+
 app.include_router(decisions.router, prefix="/api")
 app.include_router(votes.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
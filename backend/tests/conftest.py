@@ -0,0 +1,64 @@
+"""
+Shared fixtures. The app reads its settings at import time, so the test
+database and cheap password hashing are configured before anything from
+app/ is imported.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ["GEMINI_API_KEY"] = ""
+os.environ["ARGON2_TIME_COST"] = "1"
+os.environ["ARGON2_MEMORY_COST_KIB"] = "1024"
+os.environ["ARGON2_PARALLELISM"] = "1"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import async_engine, engine
+from main import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def make_user(client):
+    """Register a user and return (user_id, auth headers)."""
+    def make(username: str):
+        response = client.post(
+            "/api/auth/register",
+            json={"username": username, "email": f"{username}@example.com", "password": "password"}
+        )
+        assert response.status_code == 200, response.text
+        token = client.post(
+            "/api/auth/login", json={"username": username, "password": "password"}
+        ).json()["access_token"]
+        return response.json()["id"], {"Authorization": f"Bearer {token}"}
+    return make
+
+
+@pytest.fixture(scope="session")
+def count_statements():
+    """Context manager counting SQL statements on both engines; yields a one-item list."""
+    @contextmanager
+    def counting():
+        count = [0]
+
+        def on_execute(*args):
+            count[0] += 1
+
+        engines = (engine, async_engine.sync_engine)
+        for target in engines:
+            event.listen(target, "before_cursor_execute", on_execute)
+        try:
+            yield count
+        finally:
+            for target in engines:
+                event.remove(target, "before_cursor_execute", on_execute)
+    return counting
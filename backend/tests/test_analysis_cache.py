@@ -0,0 +1,34 @@
+"""Background analysis refreshes (services/analysis_cache.py)."""
+import json
+
+from sqlmodel import Session
+
+from app.database import async_engine, engine
+from app.models import Decision
+from app.services import analysis_cache, gemini
+
+
+def test_refresh_stores_result_without_holding_a_connection(client, make_user, monkeypatch):
+    user_id, _ = make_user("analysis_user")
+    with Session(engine) as session:
+        session.add(Decision(user_id=user_id, content="Move abroad for a year?", option_a="Go", option_b="Stay"))
+        session.commit()
+
+    calls = []
+
+    async def fake_personality(recent_texts, history_summary):
+        # No pool connection is checked out while the model runs
+        calls.append(async_engine.pool.checkedout())
+        return "An explorer at heart"
+
+    monkeypatch.setattr(gemini, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(gemini, "predict_personality", fake_personality)
+
+    first = client.portal.call(analysis_cache.refresh_analysis, user_id, "personality")
+    second = client.portal.call(analysis_cache.refresh_analysis, user_id, "personality")
+
+    assert first == second == "An explorer at heart"
+    assert calls == [0]  # The second refresh found the stored result
+    with Session(engine) as session:
+        stored = analysis_cache.get_latest_analysis(session, user_id, "personality")
+        assert json.loads(stored.result) == first
@@ -0,0 +1,50 @@
+"""Token resolution and the authenticated-user cache (app/auth.py)."""
+import pytest
+
+from app.auth import create_access_token
+
+
+@pytest.fixture(scope="module")
+def account(make_user):
+    return make_user("auth_account")
+
+
+def me(client, token):
+    return client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+
+def test_uid_and_sub_must_agree(client, account, make_user):
+    user_id, headers = account
+    other_id, _ = make_user("auth_other")
+    # Warm the cache for user_id so the mismatch is checked on a hit as well as a miss
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+
+    for token in (
+        create_access_token({"sub": "auth_other", "uid": user_id}),
+        create_access_token({"sub": "auth_account", "uid": other_id}),
+        create_access_token({"sub": "auth_account", "uid": str(user_id)}),
+        create_access_token({"uid": user_id}),
+    ):
+        assert me(client, token).status_code == 401
+
+
+def test_legacy_token_with_only_sub_resolves(client, account):
+    user_id, _ = account
+    response = me(client, create_access_token({"sub": "auth_account"}))
+    assert response.status_code == 200
+    assert response.json()["id"] == user_id
+
+    assert me(client, create_access_token({"sub": "auth_nobody"})).status_code == 401
+
+
+def test_profile_update_evicts_cached_user(client, account):
+    user_id, headers = account
+    legacy = create_access_token({"sub": "auth_account"})
+    assert client.get("/api/auth/me", headers=headers).json()["bio"] is None
+    assert me(client, legacy).json()["bio"] is None
+
+    assert client.put("/api/auth/me", params={"bio": "Fresh bio"}, headers=headers).status_code == 200
+
+    # Both cache keys (by id and by username) are dropped
+    assert client.get("/api/auth/me", headers=headers).json()["bio"] == "Fresh bio"
+    assert me(client, legacy).json()["bio"] == "Fresh bio"
@@ -0,0 +1,72 @@
+"""Multi-get endpoints: /votes/counts and /users/batch (app/batching.py)."""
+import pytest
+
+from app.batching import BATCH_MAX_IDS
+
+MISSING_ID = 10 ** 9
+
+
+@pytest.fixture(scope="module")
+def decisions(client, make_user):
+    author_id, headers = make_user("batch_author")
+    voter_id, _ = make_user("batch_voter")
+    ids = [
+        client.post(
+            "/api/decisions/",
+            json={"user_id": author_id, "content": f"Batch decision {i}", "option_a": "Yes", "option_b": "No"},
+            headers=headers
+        ).json()["id"]
+        for i in range(2)
+    ]
+    client.post("/api/votes/", json={"user_id": voter_id, "decision_id": ids[0], "choice": "option_b"})
+    return author_id, voter_id, ids
+
+
+@pytest.mark.parametrize("url", ["/api/votes/counts", "/api/users/batch"])
+@pytest.mark.parametrize("ids, detail", [
+    (",".join(str(i) for i in range(1, BATCH_MAX_IDS + 2)), f"At most {BATCH_MAX_IDS} ids per request"),
+    ("1,two,3", "ids must be comma-separated integers"),
+    ("1,2.5", "ids must be comma-separated integers"),
+])
+def test_rejected_id_lists(client, url, ids, detail):
+    response = client.get(url, params={"ids": ids})
+    assert response.status_code == 400
+    assert response.json()["detail"] == detail
+
+
+@pytest.mark.parametrize("url", ["/api/votes/counts", "/api/users/batch"])
+def test_limit_counts_distinct_ids(client, url):
+    # BATCH_MAX_IDS distinct ids, each sent twice, is within the limit
+    ids = ",".join(str(i) for i in list(range(1, BATCH_MAX_IDS + 1)) * 2)
+    assert client.get(url, params={"ids": ids}).status_code == 200
+
+
+def test_vote_counts_batch(client, decisions):
+    _, _, (voted, unvoted) = decisions
+    response = client.get("/api/votes/counts", params={"ids": f"{voted},{MISSING_ID},{unvoted},{voted}, ,"})
+    assert response.status_code == 200
+    assert response.json() == {
+        "items": {
+            str(voted): {"option_a": 0, "option_b": 1, "total": 1},
+            str(unvoted): {"option_a": 0, "option_b": 0, "total": 0},
+        },
+        "missing": [MISSING_ID],
+    }
+
+
+def test_users_batch(client, decisions):
+    author_id, voter_id, _ = decisions
+    response = client.get("/api/users/batch", params={"ids": f"{voter_id},{MISSING_ID},{author_id},{voter_id}"})
+    assert response.status_code == 200
+    body = response.json()
+    assert list(body["items"]) == [str(voter_id), str(author_id)]
+    assert body["items"][str(author_id)]["username"] == "batch_author"
+    assert "password_hash" not in body["items"][str(author_id)]
+    assert body["missing"] == [MISSING_ID]
+
+
+def test_duplicates_do_not_change_the_validator(client, decisions):
+    _, _, (voted, unvoted) = decisions
+    etag = client.get("/api/votes/counts", params={"ids": f"{voted},{unvoted}"}).headers["etag"]
+    again = client.get("/api/votes/counts", params={"ids": f"{voted},{unvoted},{voted}"}, headers={"If-None-Match": etag})
+    assert again.status_code == 304
@@ -0,0 +1,123 @@
+"""Caching primitives (services/cache.py) and the consensus recommendation cache built on them."""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.routers import decisions as decisions_router
+from app.services.cache import SingleFlight, TTLCache
+from app.services.gemini import CONSENSUS_FALLBACK
+
+QUESTION = "Should I adopt a rescue cat this winter"
+
+
+def test_lru_eviction_keeps_recently_used_entries():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c"), len(cache)) == (1, 3, 2)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_entries_expire_after_their_ttl():
+    cache = TTLCache(maxsize=10, ttl=0.05)
+    cache.set("default", 1)
+    cache.set("short", 2, ttl=0.01)
+    cache.set("long", 3, ttl=60)
+    time.sleep(0.02)
+    assert (cache.get("default"), cache.get("short"), cache.get("long")) == (1, None, 3)
+    time.sleep(0.05)
+    assert (cache.get("default", "gone"), cache.get("long")) == ("gone", 3)
+
+
+def test_single_flight_shares_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    async def run():
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(10)))
+        assert len(flight) == 0
+        errors = await asyncio.gather(*(flight.do("bad", failing) for _ in range(3)), return_exceptions=True)
+        return results, errors
+
+    results, errors = asyncio.run(run())
+    assert results == ["done"] * 10
+    assert calls == [1]
+    assert all(isinstance(error, RuntimeError) for error in errors)
+
+
+@pytest.fixture(scope="module")
+def voted_question(client, make_user):
+    """A voted decision matching QUESTION, so there is a consensus to summarize; returns auth headers."""
+    author_id, headers = make_user("consensus_author")
+    voter_id, _ = make_user("consensus_voter")
+    decision_id = client.post(
+        "/api/decisions/",
+        json={"user_id": author_id, "content": QUESTION, "option_a": "Adopt", "option_b": "Wait"},
+        headers=headers
+    ).json()["id"]
+    client.post("/api/votes/", json={"user_id": voter_id, "decision_id": decision_id, "choice": "option_a"})
+    return headers
+
+
+@pytest.fixture
+def model(voted_question):
+    """Calls made to the test's stand-in model; each test starts with an empty cache."""
+    decisions_router.consensus_cache.clear()
+    return []
+
+
+def recommend(client, headers):
+    response = client.get(f"/api/decisions/recommend/{QUESTION}", headers=headers)
+    assert response.status_code == 200
+    return response.json()["recommendation"]
+
+
+def test_concurrent_identical_requests_make_one_model_call(client, voted_question, model, monkeypatch):
+    async def slow_model(decision_text, similar_decisions):
+        model.append(decision_text)
+        await asyncio.sleep(0.3)
+        return "Adopt the cat"
+
+    monkeypatch.setattr(decisions_router, "generate_consensus_recommendation", slow_model)
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(lambda _: recommend(client, voted_question), range(5)))
+
+    assert results == ["Adopt the cat"] * 5
+    assert model == [QUESTION]
+    # Later requests are served from the cache
+    assert recommend(client, voted_question) == "Adopt the cat"
+    assert len(model) == 1
+
+
+def test_fallback_expires_after_failure_ttl(client, voted_question, model, monkeypatch):
+    answers = iter([CONSENSUS_FALLBACK, "Adopt the cat"])
+
+    async def recovering_model(decision_text, similar_decisions):
+        model.append(decision_text)
+        return next(answers)
+
+    monkeypatch.setattr(decisions_router, "generate_consensus_recommendation", recovering_model)
+    monkeypatch.setattr(decisions_router, "CONSENSUS_FAILURE_TTL", 0.05)
+
+    assert recommend(client, voted_question) == CONSENSUS_FALLBACK
+    assert recommend(client, voted_question) == CONSENSUS_FALLBACK
+    assert len(model) == 1
+    time.sleep(0.1)
+    assert recommend(client, voted_question) == "Adopt the cat"
+    assert recommend(client, voted_question) == "Adopt the cat"
+    assert len(model) == 2
@@ -0,0 +1,93 @@
+"""Streamed consequence predictions: the partial JSON reader (services/gemini.py) and the stored replay."""
+import json
+
+import pytest
+from sqlmodel import Session
+
+from app.database import engine
+from app.models import DecisionPrediction
+from app.services import gemini
+from app.services.gemini import _partial_json_string
+
+MODEL_OUTPUT = json.dumps({
+    "good": 'You find a "hidden" café',
+    "bad": "Jet lag \U0001F634 for a week",
+    "weird": "A pigeon follows you\nhome",
+})
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"good": ', None),
+    ('{"bad": "Rain", "weird": "Hel', None),
+    ('{"good": "Hel', ("Hel", False)),
+    ('{"good" : "Hello", "bad": "', ("Hello", True)),
+    ('{"good": "say \\"hi\\" now"', ('say "hi" now', True)),
+    ('{"good": "line\\nbreak', ("line\nbreak", False)),
+    # Cut off inside an escape: the partial escape is held back
+    ('{"good": "a\\', ("a", False)),
+    ('{"good": "caf\\u00', ("caf", False)),
+    ('{"good": "caf\\u00e9', ("café", False)),
+    # Half a surrogate pair waits for the other half
+    ('{"good": "zz \\ud83d', ("zz ", False)),
+    ('{"good": "zz \\ud83d\\ude3', ("zz ", False)),
+    ('{"good": "zz \\ud83d\\ude34', ("zz \U0001F634", False)),
+])
+def test_partial_json_string(text, expected):
+    assert _partial_json_string(text, "good") == expected
+
+
+def test_every_prefix_decodes_to_a_prefix_of_the_value():
+    value = json.loads(MODEL_OUTPUT)["bad"]
+    for end in range(len(MODEL_OUTPUT) + 1):
+        partial = _partial_json_string(MODEL_OUTPUT[:end], "bad")
+        if partial is not None:
+            assert value.startswith(partial[0])
+    assert _partial_json_string(MODEL_OUTPUT, "bad") == (value, True)
+
+
+class FakeStreamingClient:
+    def __init__(self, chunk_size: int = 5):
+        self.chunk_size = chunk_size
+        self.calls = 0
+
+    async def stream(self, prompt):
+        self.calls += 1
+        for start in range(0, len(MODEL_OUTPUT), self.chunk_size):
+            yield MODEL_OUTPUT[start:start + self.chunk_size]
+
+
+def read_events(client, decision_id):
+    response = client.get(f"/api/decisions/{decision_id}/consequences/stream")
+    assert response.status_code == 200
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_second_request_replays_the_stored_prediction(client, make_user, monkeypatch):
+    author_id, headers = make_user("consequence_author")
+    decision_id = client.post(
+        "/api/decisions/",
+        json={"user_id": author_id, "content": "Travel solo for a month?", "option_a": "Go", "option_b": "Stay"},
+        headers=headers
+    ).json()["id"]
+    fake = FakeStreamingClient()
+    monkeypatch.setattr(gemini, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(gemini, "gemini_client", fake)
+    expected = json.loads(MODEL_OUTPUT)
+
+    first = read_events(client, decision_id)
+    streamed = {key: "" for key in expected}
+    for event, data in first:
+        if event == "delta":
+            streamed[data["field"]] += data["text"]
+    assert streamed == expected
+    assert first[-2:] == [("result", {**expected, "cached": False, "fallback": False}), ("done", {})]
+    with Session(engine) as session:
+        assert session.get(DecisionPrediction, decision_id).bad == expected["bad"]
+
+    second = read_events(client, decision_id)
+    assert second == [("result", {**expected, "cached": True}), ("done", {})]
+    assert fake.calls == 1
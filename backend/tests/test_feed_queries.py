@@ -0,0 +1,44 @@
+"""Feed pages cost a fixed number of statements, whatever their size (see services/hydration.py)."""
+import pytest
+
+
+@pytest.fixture(scope="module")
+def feed(client, make_user):
+    authors = [make_user(f"feed_author{i}") for i in range(3)]
+    reader_id, reader_headers = make_user("feed_reader")
+    for author_id, _ in authors:
+        assert client.post(f"/api/users/{reader_id}/follow/{author_id}").status_code == 200
+
+    decision_ids = []
+    for i in range(30):
+        author_id, headers = authors[i % len(authors)]
+        response = client.post(
+            "/api/decisions/",
+            json={"user_id": author_id, "content": f"Feed decision {i}", "option_a": "Yes", "option_b": "No"},
+            headers=headers
+        )
+        decision_ids.append(response.json()["id"])
+    for decision_id in decision_ids[:10]:
+        client.post("/api/votes/", json={"user_id": reader_id, "decision_id": decision_id, "choice": "option_a"})
+        client.post("/api/comments/", json={"decision_id": decision_id, "content": "Go for it"}, headers=reader_headers)
+    return authors[0][0], reader_id
+
+
+@pytest.mark.parametrize("path", [
+    "/api/decisions/?limit={limit}",
+    "/api/decisions/?limit={limit}&cursor=",
+    "/api/users/{author_id}/decisions?limit={limit}",
+    "/api/decisions/?following_user_id={reader_id}&limit={limit}",
+])
+def test_feed_statement_count_is_constant(client, count_statements, feed, path):
+    author_id, reader_id = feed
+    counts = []
+    for limit in (5, 10):
+        url = path.format(limit=limit, author_id=author_id, reader_id=reader_id)
+        with count_statements() as count:
+            response = client.get(url)
+        assert response.status_code == 200, response.text
+        items = response.json()
+        assert len(items["items"] if isinstance(items, dict) else items) == limit
+        counts.append(count[0])
+    assert counts[0] == counts[1]
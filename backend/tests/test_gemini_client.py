@@ -0,0 +1,81 @@
+"""Circuit breaker accounting in GeminiClient, against a fake model."""
+import asyncio
+
+import pytest
+
+from app.services.gemini_client import CircuitBreaker, CircuitOpenError, GeminiBusyError, GeminiClient
+
+
+class FakeResponse:
+    text = "ok"
+
+
+class FakeModel:
+    def __init__(self, delay: float = 0.0, error: Exception = None):
+        self.delay = delay
+        self.error = error
+
+    async def generate_content_async(self, prompt, stream=False):
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return FakeResponse()
+
+
+def make_client(model: FakeModel, max_concurrency: int = 1, timeout: float = 0.05, failures: int = 2) -> GeminiClient:
+    client = GeminiClient(
+        model_name="fake", max_concurrency=max_concurrency, timeout=timeout,
+        breaker=CircuitBreaker(failure_threshold=failures, reset_timeout=60)
+    )
+    client._models["fake"] = model
+    return client
+
+
+def test_waiting_for_a_slot_does_not_trip_the_breaker():
+    client = make_client(FakeModel())
+
+    async def run():
+        # Every slot taken by calls still in flight
+        semaphore = client._get_semaphore()
+        await semaphore.acquire()
+        results = await asyncio.gather(*(client.generate("queued") for _ in range(3)), return_exceptions=True)
+        semaphore.release()
+        return results, await client.generate("after")
+
+    results, after = asyncio.run(run())
+    assert all(isinstance(result, GeminiBusyError) for result in results)
+    assert after == "ok"
+    assert client.busy == 3
+    assert client.failures == client.timeouts == 0
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_model_timeouts_count_toward_the_breaker():
+    client = make_client(FakeModel(delay=0.2), timeout=0.05, failures=1)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(client.generate("slow"))
+    assert client.timeouts == 1
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+
+def test_model_failures_open_the_breaker():
+    client = make_client(FakeModel(error=RuntimeError("upstream down")))
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await client.generate("prompt")
+        with pytest.raises(CircuitOpenError):
+            await client.generate("prompt")
+
+    asyncio.run(run())
+    assert client.failures == 2
+    assert client.rejected == 1
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+
+def test_success_resets_failures():
+    client = make_client(FakeModel())
+    client.breaker.record_failure()
+    assert asyncio.run(client.generate("prompt")) == "ok"
+    assert client.breaker.consecutive_failures == 0
@@ -0,0 +1,44 @@
+"""Rolling decision-history summaries (services/history.py)."""
+import asyncio
+
+from sqlmodel import Session
+
+from app.database import engine
+from app.models import Decision, UserHistorySummary
+from app.services import history
+
+
+def test_concurrent_builds_summarize_once(client, make_user, monkeypatch):
+    user_id, _ = make_user("history_user")
+    with Session(engine) as session:
+        session.add_all([
+            Decision(user_id=user_id, content=f"Decision {i}: " + "weighing it up " * 30, option_a="Yes", option_b="No")
+            for i in range(30)
+        ])
+        session.commit()
+
+    folded = []
+
+    async def fake_summarize(previous_summary, decision_texts, max_words):
+        folded.append(len(decision_texts))
+        await asyncio.sleep(0.01)  # Let the other build run into the lock
+        return f"Summary of {sum(folded)} decisions"
+
+    monkeypatch.setattr(history, "summarize_decisions", fake_summarize)
+
+    async def build_twice():
+        # What the personality and life-areas refreshes do after a new decision
+        return await asyncio.gather(
+            history.build_decision_history(user_id), history.build_decision_history(user_id)
+        )
+
+    first, second = client.portal.call(build_twice)
+
+    assert folded, "history should have been over budget"
+    assert first == second
+    assert not history._user_locks
+    with Session(engine) as session:
+        state = session.get(UserHistorySummary, user_id)
+        assert state.folded_count == sum(folded)
+        assert state.summary == first[1]
+        assert state.folded_count + len(first[0]) == 30
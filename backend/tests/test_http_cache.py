@@ -0,0 +1,93 @@
+"""Conditional GETs (app/http_cache.py) and the validators of the routes that use them."""
+import pytest
+
+
+@pytest.fixture(scope="module")
+def author(make_user):
+    return make_user("cache_author")
+
+
+@pytest.fixture(scope="module")
+def decision_id(client, author):
+    author_id, headers = author
+    return client.post(
+        "/api/decisions/",
+        json={"user_id": author_id, "content": "Cache this?", "option_a": "Yes", "option_b": "No"},
+        headers=headers
+    ).json()["id"]
+
+
+def revalidate(client, url, **headers):
+    return client.get(url, headers={name.replace("_", "-"): value for name, value in headers.items()})
+
+
+@pytest.mark.parametrize("url, cache_control", [
+    ("/api/decisions/{decision_id}", "no-cache"),
+    ("/api/votes/{decision_id}", "no-cache"),
+    ("/api/users/{author_id}", "no-cache"),
+    ("/api/leaderboard/", "public, max-age=10"),
+    ("/api/about/", "public, max-age=3600"),
+])
+def test_if_none_match_is_304_with_cache_control(client, author, decision_id, url, cache_control):
+    url = url.format(decision_id=decision_id, author_id=author[0])
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == cache_control
+
+    response = revalidate(client, url, if_none_match=first.headers["etag"])
+    assert response.status_code == 304
+    assert response.headers["cache-control"] == cache_control
+    assert response.headers["etag"] == first.headers["etag"]
+    assert response.content == b""
+
+    # The strong form of a weak validator matches too; anything else doesn't
+    assert revalidate(client, url, if_none_match=first.headers["etag"][2:]).status_code == 304
+    assert revalidate(client, url, if_none_match='W/"stale"').status_code == 200
+
+
+def test_if_modified_since(client, author):
+    url = f"/api/users/{author[0]}"
+    last_modified = client.get(url).headers["last-modified"]
+
+    response = revalidate(client, url, if_modified_since=last_modified)
+    assert response.status_code == 304
+    assert response.headers["cache-control"] == "no-cache"
+    assert revalidate(client, url, if_modified_since="Mon, 01 Jan 2001 00:00:00 GMT").status_code == 200
+    assert revalidate(client, url, if_modified_since="not a date").status_code == 200
+    # If-None-Match wins over If-Modified-Since
+    assert revalidate(client, url, if_none_match='W/"stale"', if_modified_since=last_modified).status_code == 200
+
+
+def test_vote_changes_decision_and_count_validators(client, make_user, decision_id):
+    voter_id, _ = make_user("cache_voter")
+    urls = (f"/api/decisions/{decision_id}", f"/api/votes/{decision_id}")
+    before = [client.get(url).headers["etag"] for url in urls]
+
+    client.post("/api/votes/", json={"user_id": voter_id, "decision_id": decision_id, "choice": "option_a"})
+
+    for url, etag in zip(urls, before):
+        assert revalidate(client, url, if_none_match=etag).status_code == 200
+
+
+def test_follow_and_unfollow_change_both_profiles(client, make_user, author):
+    follower_id, _ = make_user("cache_follower")
+    urls = (f"/api/users/{author[0]}", f"/api/users/{follower_id}")
+
+    for method in ("post", "delete"):
+        before = [client.get(url).headers["etag"] for url in urls]
+        assert getattr(client, method)(f"/api/users/{follower_id}/follow/{author[0]}").status_code == 200
+        for url, etag in zip(urls, before):
+            assert revalidate(client, url, if_none_match=etag).status_code == 200
+
+
+def test_profile_edit_changes_profile_and_decision_validators(client, author, decision_id):
+    author_id, headers = author
+    urls = (f"/api/users/{author_id}", f"/api/decisions/{decision_id}", f"/api/users/batch?ids={author_id}")
+    before = [client.get(url).headers["etag"] for url in urls]
+
+    assert client.put("/api/auth/me", params={"bio": "Cached no more"}, headers=headers).status_code == 200
+
+    for url, etag in zip(urls, before):
+        response = revalidate(client, url, if_none_match=etag)
+        assert response.status_code == 200
+    assert client.get(urls[0]).json()["bio"] == "Cached no more"
@@ -0,0 +1,33 @@
+"""Background job helpers (services/jobs.py)."""
+import asyncio
+
+from app.services.jobs import PeriodicTask
+
+
+def test_periodic_task_survives_failed_runs():
+    runs = []
+
+    async def flaky():
+        runs.append(len(runs))
+        if len(runs) == 1:
+            raise RuntimeError("database away")
+
+    async def run():
+        task = PeriodicTask("Flaky refresh", flaky)
+        await task.start(0.01)
+        while len(runs) < 3:
+            await asyncio.sleep(0.01)
+        await task.stop()
+        return task.running
+
+    assert asyncio.run(run()) is False
+    assert len(runs) >= 3
+
+
+def test_periodic_task_with_no_interval_stays_off():
+    async def run():
+        task = PeriodicTask("Disabled refresh", lambda: asyncio.sleep(0))
+        await task.start(0)
+        return task.running
+
+    assert asyncio.run(run()) is False
@@ -0,0 +1,66 @@
+"""In-memory leaderboards (services/leaderboards.py)."""
+import asyncio
+import threading
+
+from sqlmodel import Session, func, select
+
+from app.database import engine
+from app.models import Decision
+from app.services.leaderboards import LeaderboardEngine, RankedScores
+
+
+def test_top_pages_through_ties():
+    scores = RankedScores()
+    for user_id, score in [(1, 5), (2, 3), (3, 3), (4, 3), (5, 1), (6, 1)]:
+        scores.increment(user_id, score)
+
+    assert scores.top(10) == [(1, 1, 5), (2, 2, 3), (2, 3, 3), (2, 4, 3), (5, 5, 1), (5, 6, 1)]
+    assert scores.top(2, offset=2) == [(2, 3, 3), (2, 4, 3)]
+    assert scores.top(3, offset=4) == [(5, 5, 1), (5, 6, 1)]
+    assert scores.rank(4) == 2
+
+
+def add_decision(user_id: int, content: str) -> int:
+    with Session(engine) as session:
+        decision = Decision(user_id=user_id, content=content, option_a="Yes", option_b="No")
+        session.add(decision)
+        session.commit()
+        return decision.id
+
+
+def test_rebuild_keeps_events_recorded_during_its_queries(client, make_user, monkeypatch):
+    author_id, _ = make_user("leaderboard_author")
+    boards = LeaderboardEngine()
+    with Session(engine) as session:
+        boards.rebuild(session)
+
+    # Committed before the rebuild's snapshot, recorded while it runs: counted once
+    before_snapshot = add_decision(author_id, "Committed before the snapshot")
+    snapshot_taken = threading.Event()
+    resume = threading.Event()
+
+    def load(session):
+        # Runs in the rebuild's worker thread; pauses after querying
+        loaded = LeaderboardEngine._load(session)
+        snapshot_taken.set()
+        resume.wait(5)
+        return loaded
+
+    monkeypatch.setattr(boards, "_load", load)
+
+    async def rebuild_with_concurrent_events():
+        rebuild = asyncio.create_task(boards.rebuild_async())
+        await asyncio.to_thread(snapshot_taken.wait, 5)
+        boards.record_decision(before_snapshot, author_id)
+        # Committed after the snapshot: only the replay can count it
+        boards.record_decision(add_decision(author_id, "Committed after the snapshot"), author_id)
+        resume.set()
+        await rebuild
+
+    client.portal.call(rebuild_with_concurrent_events)
+
+    with Session(engine) as session:
+        stored = session.exec(select(func.count(Decision.id)).where(Decision.user_id == author_id)).one()
+    assert stored == 2
+    assert boards.rank("decisions", "all", author_id)[1] == 2
+    assert boards.rank("decisions", "day", author_id)[1] == 2
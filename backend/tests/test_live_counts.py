@@ -0,0 +1,66 @@
+"""The live vote count hub (services/live_counts.py), driven tick by tick on the app's event loop (client.portal)."""
+import pytest
+
+from app.services.live_counts import VoteCountHub
+
+A_VOTE = {"option_a": 1, "total": 1}
+
+
+@pytest.fixture
+def decision_id(client, make_user, request):
+    author_id, headers = make_user(f"live_author_{request.node.name}")
+    response = client.post(
+        "/api/decisions/",
+        json={"user_id": author_id, "content": "Go live?", "option_a": "Yes", "option_b": "No"},
+        headers=headers
+    )
+    return response.json()["id"]
+
+
+def vote(client, make_user, decision_id, username):
+    voter_id, _ = make_user(username)
+    client.post("/api/votes/", json={"user_id": voter_id, "decision_id": decision_id, "choice": "option_a"})
+
+
+def test_publishes_within_a_tick_coalesce(client, decision_id):
+    hub = VoteCountHub()
+    subscriptions = [hub.subscribe() for _ in range(3)]
+    for subscription in subscriptions:
+        client.portal.call(hub.add, subscription, [decision_id])
+        assert client.portal.call(subscription.next_update) == {decision_id: {"option_a": 0, "option_b": 0, "total": 0}}
+
+    for _ in range(25):
+        hub.publish(decision_id, A_VOTE)
+    assert hub.flush_deltas() == 1
+
+    for subscription in subscriptions:
+        assert client.portal.call(subscription.next_update) == {decision_id: {"option_a": 25, "option_b": 0, "total": 25}}
+    assert hub.metrics()["published"] == 25
+    assert hub.metrics()["updates_sent"] == len(subscriptions)
+    # Nothing new: the next tick sends nothing
+    assert hub.flush_deltas() == 0
+
+
+def test_resync_rereads_channels_published_to_during_its_load(client, make_user, decision_id):
+    hub = VoteCountHub()
+    subscription = hub.subscribe()
+    client.portal.call(hub.add, subscription, [decision_id])
+    client.portal.call(subscription.next_update)
+
+    # The snapshot is read, then a vote is stored and published before the load returns
+    load = hub._load
+    stale = client.portal.call(load, [decision_id])
+    vote(client, make_user, decision_id, "live_late_voter")
+
+    async def load_overtaken_by_a_vote(ids):
+        hub.publish(decision_id, A_VOTE)
+        return stale
+
+    hub._load = load_overtaken_by_a_vote
+    client.portal.call(hub.resync)
+    hub._load = load
+
+    assert decision_id in hub._needs_resync
+    assert hub.flush_deltas() == 0
+    assert client.portal.call(hub.resync, [decision_id]) == 1
+    assert client.portal.call(subscription.next_update) == {decision_id: {"option_a": 1, "option_b": 0, "total": 1}}
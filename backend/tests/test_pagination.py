@@ -0,0 +1,122 @@
+"""Keyset (cursor) and offset paging of the feeds (app/pagination.py)."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, select, update
+
+from app.database import engine
+from app.models import Comment, Decision, DecisionScore
+
+ROWS = 13
+PAGE = 4
+
+
+@pytest.fixture(scope="module")
+def paged(client, make_user):
+    """An author with ROWS decisions and a decision with ROWS comments; several rows share a created_at."""
+    author_id, headers = make_user("paging_author")
+    decision_ids = [
+        client.post(
+            "/api/decisions/",
+            json={"user_id": author_id, "content": f"Paging decision {i}", "option_a": "Yes", "option_b": "No"},
+            headers=headers
+        ).json()["id"]
+        for i in range(ROWS)
+    ]
+    commented = decision_ids[0]
+    for i in range(ROWS):
+        client.post("/api/comments/", json={"decision_id": commented, "content": f"Comment {i}"}, headers=headers)
+
+    # Ties across page boundaries: the id tiebreaker is all that orders these
+    base = datetime(2024, 5, 1, 12, 0, 0)
+    with Session(engine) as session:
+        for model, ids in (
+            (Decision, decision_ids),
+            (Comment, session.exec(select(Comment.id).where(Comment.decision_id == commented)).all()),
+        ):
+            for position, row_id in enumerate(ids):
+                created_at = base if 3 <= position <= 9 else base + timedelta(minutes=position)
+                session.exec(update(model).where(model.id == row_id).values(created_at=created_at))
+        session.commit()
+    return author_id, commented
+
+
+def newest_first(model, **filters):
+    with Session(engine) as session:
+        query = select(model.id).order_by(model.created_at.desc(), model.id.desc())
+        for column, value in filters.items():
+            query = query.where(getattr(model, column) == value)
+        return list(session.exec(query).all())
+
+
+def walk(client, url, **params):
+    """Follow next_cursor from the first page to the last; returns the ids in order and the page count."""
+    ids, pages, cursor = [], 0, ""
+    while True:
+        response = client.get(url, params={**params, "limit": PAGE, "cursor": cursor})
+        assert response.status_code == 200, response.text
+        page = response.json()
+        ids += [item["id"] for item in page["items"]]
+        pages += 1
+        if page["next_cursor"] is None:
+            return ids, pages
+        assert len(page["items"]) == PAGE
+        cursor = page["next_cursor"]
+
+
+@pytest.mark.parametrize("endpoint", ["feed", "user_decisions", "comments"])
+def test_cursor_walk_visits_every_row_once(client, paged, endpoint):
+    author_id, commented = paged
+    url, params, expected = {
+        "feed": ("/api/decisions/", {"user_id": author_id}, newest_first(Decision, user_id=author_id)),
+        "user_decisions": (f"/api/users/{author_id}/decisions", {}, newest_first(Decision, user_id=author_id)),
+        "comments": (f"/api/comments/{commented}", {}, newest_first(Comment, decision_id=commented)),
+    }[endpoint]
+
+    ids, pages = walk(client, url, **params)
+
+    assert ids == expected
+    assert len(set(ids)) == ROWS
+    assert pages == -(-ROWS // PAGE)
+
+
+def test_hot_cursor_walk_visits_every_row_once(client, paged):
+    author_id, _ = paged
+    decision_ids = newest_first(Decision, user_id=author_id)
+    # Tied scores across page boundaries, and floats that only repr round-trips
+    scores = [0.1 + 0.2, 1 / 3, 1 / 3, 1 / 3, 1 / 3, 1 / 3, 7.0, 7.0, 2.5e-7, 0.0, 0.0, 12.75, 1 / 3]
+    with Session(engine) as session:
+        for decision_id, score in zip(decision_ids, scores):
+            session.exec(update(DecisionScore).where(DecisionScore.decision_id == decision_id).values(score=score))
+        session.commit()
+    expected = [decision_id for _, decision_id in sorted(zip(scores, decision_ids), reverse=True)]
+
+    ids, pages = walk(client, "/api/decisions/", user_id=author_id, sort="hot")
+
+    assert ids == expected
+    assert pages == -(-ROWS // PAGE)
+    offset_page = client.get("/api/decisions/", params={"user_id": author_id, "sort": "hot", "limit": PAGE, "offset": PAGE})
+    assert [item["id"] for item in offset_page.json()] == expected[PAGE:2 * PAGE]
+
+
+@pytest.mark.parametrize("url", [
+    "/api/decisions/?cursor=not-a-cursor",
+    "/api/decisions/?sort=hot&cursor=bm90fDE",
+    "/api/users/1/decisions?cursor=not-a-cursor",
+    "/api/comments/{commented}?cursor=bm90fGEtY3Vyc29y",
+])
+def test_malformed_cursor_is_400(client, paged, url):
+    response = client.get(url.format(commented=paged[1]))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_offset_paging_returns_a_plain_list(client, paged):
+    author_id, commented = paged
+    expected = newest_first(Decision, user_id=author_id)
+
+    response = client.get(f"/api/users/{author_id}/decisions", params={"limit": PAGE, "offset": PAGE})
+    assert [item["id"] for item in response.json()] == expected[PAGE:2 * PAGE]
+
+    comments = client.get(f"/api/comments/{commented}", params={"limit": PAGE, "offset": 0}).json()
+    assert isinstance(comments, list) and len(comments) == PAGE
@@ -0,0 +1,37 @@
+"""Decision search through GET /decisions/?search= (services/search.py)."""
+import pytest
+
+from app.services import search
+
+
+@pytest.fixture(scope="module")
+def searchable(client, make_user):
+    author_id, headers = make_user("search_author")
+    for content in ("Should I learn the saxophone?", "Quit my job to sail?"):
+        client.post(
+            "/api/decisions/",
+            json={"user_id": author_id, "content": content, "option_a": "Yes", "option_b": "No"},
+            headers=headers
+        )
+
+
+def test_full_text_results_carry_snippets(client, searchable):
+    assert search.FTS_ENABLED
+    results = client.get("/api/decisions/?search=saxophone").json()
+    assert [result["snippet"] for result in results] == ["Should I learn the <mark>saxophone</mark>?"]
+
+
+def test_fallback_without_index_returns_plain_items(client, searchable, monkeypatch):
+    # As on Postgres, where no FTS index is set up
+    monkeypatch.setattr(search, "FTS_ENABLED", False)
+    response = client.get("/api/decisions/?search=sail")
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["content"] for result in results] == ["Quit my job to sail?"]
+    assert "snippet" not in results[0]
+
+
+def test_punctuation_only_query_falls_back(client, searchable):
+    response = client.get("/api/decisions/", params={"search": "?"})
+    assert response.status_code == 200
+    assert {result["content"] for result in response.json()} >= {"Should I learn the saxophone?", "Quit my job to sail?"}
@@ -0,0 +1,160 @@
+"""
+The vote write buffer's durability modes (services/vote_buffer.py), driven
+with small batches. Buffers run on the app's event loop (client.portal),
+where the async engine lives.
+"""
+import asyncio
+
+import pytest
+from sqlmodel import Session, func, select
+
+from app.database import engine
+from app.models import Vote, VoteTally
+from app.routers import votes as votes_router
+from app.services.vote_buffer import VoteBuffer
+
+
+@pytest.fixture(scope="module")
+def voters(make_user):
+    return [make_user(f"buffer_voter{i}")[0] for i in range(4)]
+
+
+@pytest.fixture
+def decision_id(client, make_user, request):
+    author_id, headers = make_user(f"buffer_author_{request.node.name}")
+    response = client.post(
+        "/api/decisions/",
+        json={"user_id": author_id, "content": "Learn the cello?", "option_a": "Yes", "option_b": "No"},
+        headers=headers
+    )
+    return response.json()["id"]
+
+
+@pytest.fixture
+def use_buffer(client, monkeypatch):
+    """Route POST /votes/ and the count overlays through a buffer built by the test."""
+    buffers = []
+
+    def install(**settings) -> VoteBuffer:
+        buffer = VoteBuffer(**settings)
+        client.portal.call(buffer.start)
+        monkeypatch.setattr(votes_router, "vote_buffer", buffer)
+        buffers.append(buffer)
+        return buffer
+
+    yield install
+    for buffer in buffers:
+        client.portal.call(buffer.stop)
+
+
+def stored_counts(decision_id):
+    """(tally row, counts recomputed from the vote table), which must agree."""
+    with Session(engine) as session:
+        tally = session.get(VoteTally, decision_id)
+        by_choice = dict(session.exec(
+            select(Vote.choice, func.count(Vote.id)).where(Vote.decision_id == decision_id).group_by(Vote.choice)
+        ).all())
+    counted = {
+        "option_a": by_choice.get("option_a", 0),
+        "option_b": by_choice.get("option_b", 0),
+        "total": sum(by_choice.values()),
+    }
+    return {"option_a": tally.option_a, "option_b": tally.option_b, "total": tally.total}, counted
+
+
+def post_vote(client, user_id, decision_id, choice="option_a"):
+    return client.post("/api/votes/", json={"user_id": user_id, "decision_id": decision_id, "choice": choice})
+
+
+def test_committed_mode_answers_after_commit(client, use_buffer, voters, decision_id):
+    buffer = use_buffer(mode="committed", flush_interval=0.02, batch_size=2, max_pending=10)
+
+    response = post_vote(client, voters[0], decision_id)
+
+    assert response.status_code == 200
+    assert response.json()["choice"] == "option_a"
+    tally, counted = stored_counts(decision_id)
+    assert tally == counted == {"option_a": 1, "option_b": 0, "total": 1}
+    assert buffer.flushed == 1
+
+
+def test_queued_mode_overlays_and_flushes_on_stop(client, use_buffer, voters, decision_id):
+    # A flush interval long enough that only stop() writes
+    buffer = use_buffer(mode="queued", flush_interval=60, batch_size=10, max_pending=10)
+
+    for voter_id in voters[:3]:
+        response = post_vote(client, voter_id, decision_id)
+        assert response.status_code == 202
+        assert response.json()["status"] == "queued"
+
+    # Read-your-writes: served counts include the queued votes
+    assert client.get(f"/api/votes/{decision_id}").json()["option_a"] == 3
+    assert stored_counts(decision_id)[0]["total"] == 0
+
+    client.portal.call(buffer.stop)
+
+    tally, counted = stored_counts(decision_id)
+    assert tally == counted == {"option_a": 3, "option_b": 0, "total": 3}
+    assert buffer.metrics()["pending"] == 0
+
+
+def test_full_buffer_answers_503_with_retry_after(client, use_buffer, voters, decision_id):
+    buffer = use_buffer(mode="queued", flush_interval=60, batch_size=10, max_pending=2)
+
+    assert [post_vote(client, voter_id, decision_id).status_code for voter_id in voters[:2]] == [202, 202]
+    response = post_vote(client, voters[2], decision_id)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert buffer.rejected == 1
+
+    client.portal.call(buffer.stop)
+    tally, counted = stored_counts(decision_id)
+    assert tally == counted == {"option_a": 2, "option_b": 0, "total": 2}
+
+
+def test_votes_are_group_committed(client, voters, decision_id):
+    buffer = VoteBuffer(mode="committed", flush_interval=60, batch_size=len(voters), max_pending=10)
+
+    async def vote_together():
+        await buffer.start()
+        # A full batch wakes the flush loop without waiting out the interval
+        futures = [buffer.submit(voter_id, decision_id, "option_b", None) for voter_id in voters]
+        stored = await asyncio.gather(*futures)
+        await buffer.stop()
+        return stored
+
+    stored = client.portal.call(vote_together)
+
+    assert [vote.user_id for vote in stored] == voters
+    assert buffer.batches == 1
+    tally, counted = stored_counts(decision_id)
+    assert tally == counted == {"option_a": 0, "option_b": len(voters), "total": len(voters)}
+
+
+def test_vote_replaced_while_its_batch_is_writing(client, voters, decision_id):
+    buffer = VoteBuffer(mode="queued", flush_interval=60, batch_size=10, max_pending=10)
+    voter_id = voters[0]
+
+    async def change_mid_flush():
+        await buffer.start()
+        buffer.submit(voter_id, decision_id, "option_a", None)
+        flushing = asyncio.create_task(buffer.flush())
+        while not buffer._flushing:
+            await asyncio.sleep(0)
+
+        # What the router does: the pending vote is the baseline for the new one
+        has_pending, previous_column = buffer.pending_column(voter_id, decision_id)
+        assert (has_pending, previous_column) == (True, "option_a")
+        buffer.submit(voter_id, decision_id, "option_b", previous_column)
+        overlay = buffer.overlay_counts({decision_id: {"option_a": 0, "option_b": 0, "total": 0}})[decision_id]
+
+        await flushing
+        await buffer.stop()
+        return overlay
+
+    overlay = client.portal.call(change_mid_flush)
+
+    assert overlay == {"option_a": 0, "option_b": 1, "total": 1}
+    tally, counted = stored_counts(decision_id)
+    assert tally == counted == {"option_a": 0, "option_b": 1, "total": 1}
@@ -0,0 +1,62 @@
+"""Voting and the stored tallies (routers/votes.py, services/tallies.py)."""
+from datetime import datetime
+
+import pytest
+from sqlmodel import Session
+
+from app.database import engine
+from app.models import VoteTally
+from app.services import tallies
+
+
+@pytest.fixture
+def decision_id(client, make_user, request):
+    author_id, headers = make_user(f"author_{request.node.name}")
+    response = client.post(
+        "/api/decisions/",
+        json={"user_id": author_id, "content": "Adopt a dog?", "option_a": "Yes", "option_b": "No"},
+        headers=headers
+    )
+    return response.json()["id"]
+
+
+def vote(client, user_id, decision_id, choice):
+    return client.post("/api/votes/", json={"user_id": user_id, "decision_id": decision_id, "choice": choice})
+
+
+def test_vote_change_moves_one_count(client, make_user, decision_id):
+    voter_id, _ = make_user("voter_change")
+    votes_cast = client.get(f"/api/leaderboard/rank/{voter_id}?metric=votes_cast").json()["votes_cast_count"]
+
+    assert vote(client, voter_id, decision_id, "option_a").status_code == 200
+    assert vote(client, voter_id, decision_id, "option_a").status_code == 400
+    assert vote(client, voter_id, decision_id, "option_b").status_code == 200
+
+    assert client.get(f"/api/votes/{decision_id}").json() == {"decision_id": decision_id, "option_a": 0, "option_b": 1}
+    rank = client.get(f"/api/leaderboard/rank/{voter_id}?metric=votes_cast").json()
+    assert rank["votes_cast_count"] == votes_cast + 1
+
+
+def test_vote_change_detected_when_timestamps_collide(client, make_user, decision_id, monkeypatch):
+    # Every write in this test happens "at the same moment"
+    class FrozenDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime(2024, 1, 1, 12, 0, 0)
+
+    monkeypatch.setattr(tallies, "datetime", FrozenDatetime)
+    voter_id, _ = make_user("voter_frozen")
+
+    assert vote(client, voter_id, decision_id, "option_a").status_code == 200
+    assert vote(client, voter_id, decision_id, "option_b").status_code == 200
+
+    with Session(engine) as session:
+        tally = session.get(VoteTally, decision_id)
+        assert (tally.option_a, tally.option_b, tally.total) == (0, 1, 1)
+
+
+def test_vote_on_missing_decision_is_404(client, make_user):
+    voter_id, _ = make_user("voter_missing")
+    assert vote(client, voter_id, 987654, "option_a").status_code == 404
+    with Session(engine) as session:
+        assert session.get(VoteTally, 987654) is None
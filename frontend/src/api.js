@@ -44,6 +44,8 @@ export const api = {
   // Legacy Users (deprecated)
   createUser: (userData) => axiosInstance.post('/users/', userData),
   getUser: (userId) => axiosInstance.get(`/users/${userId}`),
+  // One request for many users: { items: { [id]: user }, missing: [ids] }
+  getUsersBatch: (userIds) => axiosInstance.get('/users/batch', { params: { ids: userIds.join(',') } }),
   searchUsers: (query) => axiosInstance.get('/users/', { params: { q: query } }),
   getUserPersonality: (userId) => axiosInstance.get(`/users/${userId}/personality`),
   getUserLifeAreas: (userId) => axiosInstance.get(`/users/${userId}/life-areas`),
@@ -61,10 +63,14 @@ export const api = {
   getDecisions: (params = {}) => axiosInstance.get('/decisions/', { params }),
   getDecision: (id) => axiosInstance.get(`/decisions/${id}`),
   getConsensusRecommendation: (decisionText) => axiosInstance.get(`/decisions/recommend/${encodeURIComponent(decisionText)}`),
+  // Server-Sent Events: listen for 'delta', 'result' and 'done' events
+  streamConsequences: (id) => new EventSource(`${API_BASE}/decisions/${id}/consequences/stream`),
 
   // Votes
   createVote: (voteData) => axiosInstance.post('/votes/', voteData),
   getVoteCounts: (decisionId) => axiosInstance.get(`/votes/${decisionId}`),
+  // One request for many decisions: { items: { [id]: counts }, missing: [ids] }
+  getVoteCountsBatch: (decisionIds) => axiosInstance.get('/votes/counts', { params: { ids: decisionIds.join(',') } }),
 
   // Comments
   createComment: (commentData) => axiosInstance.post('/comments/', commentData),
@@ -77,3 +83,73 @@ export const api = {
   // About
   getAbout: () => axiosInstance.get('/about/')
 };
+
+// Live vote counts: one shared WebSocket for every decision on screen.
+// subscribe() returns an unsubscribe function; callbacks get { option_a, option_b, total }.
+const liveListeners = new Map();
+let liveSocket = null;
+let reconnectTimer = null;
+
+function liveSocketUrl() {
+  const base = new URL(API_BASE, window.location.href);
+  base.protocol = base.protocol === 'https:' ? 'wss:' : 'ws:';
+  return `${base.href.replace(/\/$/, '')}/votes/live`;
+}
+
+function sendLive(message) {
+  if (liveSocket?.readyState === WebSocket.OPEN) {
+    liveSocket.send(JSON.stringify(message));
+  }
+}
+
+function openLiveSocket() {
+  const socket = new WebSocket(liveSocketUrl());
+  liveSocket = socket;
+  socket.onopen = () => {
+    sendLive({ subscribe: [...liveListeners.keys()] });
+  };
+  socket.onmessage = (event) => {
+    const message = JSON.parse(event.data);
+    if (message.type !== 'counts') return;
+    Object.entries(message.counts).forEach(([decisionId, counts]) => {
+      liveListeners.get(Number(decisionId))?.forEach((callback) => callback(counts));
+    });
+  };
+  socket.onclose = () => {
+    if (liveSocket !== socket) return;
+    liveSocket = null;
+    // Reconnect (and resubscribe) while anything is still on screen
+    if (liveListeners.size > 0 && !reconnectTimer) {
+      reconnectTimer = setTimeout(() => {
+        reconnectTimer = null;
+        if (liveListeners.size > 0 && !liveSocket) openLiveSocket();
+      }, 3000);
+    }
+  };
+}
+
+export const liveVoteCounts = {
+  subscribe(decisionId, callback) {
+    let callbacks = liveListeners.get(decisionId);
+    if (!callbacks) {
+      callbacks = new Set();
+      liveListeners.set(decisionId, callbacks);
+      if (liveSocket) sendLive({ subscribe: [decisionId] });
+      else openLiveSocket();
+    }
+    callbacks.add(callback);
+
+    return () => {
+      callbacks.delete(callback);
+      if (callbacks.size === 0) {
+        liveListeners.delete(decisionId);
+        sendLive({ unsubscribe: [decisionId] });
+      }
+      if (liveListeners.size === 0 && liveSocket) {
+        const socket = liveSocket;
+        liveSocket = null;
+        socket.close();
+      }
+    };
+  }
+};
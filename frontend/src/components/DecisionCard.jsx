@@ -1,10 +1,11 @@
 import { Link } from 'react-router-dom'
 import { useState, useEffect } from 'react'
-import { api } from '../api'
+import { api, liveVoteCounts } from '../api'
 import './DecisionCard.css'
 
 function DecisionCard({ decision, currentUserId, onVote }) {
-  const voteCounts = decision.vote_counts || { option_a: 0, option_b: 0 }
+  const [liveCounts, setLiveCounts] = useState(null)
+  const voteCounts = liveCounts || decision.vote_counts || { option_a: 0, option_b: 0 }
   const user = decision.user || {}
   const totalVotes = voteCounts.option_a + voteCounts.option_b
   const optionAPercentage = totalVotes > 0 ? Math.round((voteCounts.option_a / totalVotes) * 100) : 0
@@ -16,6 +17,9 @@ function DecisionCard({ decision, currentUserId, onVote }) {
   const [loadingComments, setLoadingComments] = useState(false)
   const [postingComment, setPostingComment] = useState(false)
 
+  // Keep the tallies current while the card is on screen
+  useEffect(() => liveVoteCounts.subscribe(decision.id, setLiveCounts), [decision.id])
+
   const loadComments = async () => {
     if (comments.length > 0) return // Already loaded
 